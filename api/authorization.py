@@ -0,0 +1,28 @@
+from django.db.models import F
+from django.shortcuts import get_object_or_404
+from projects.roles import roles
+
+
+class ProjectRoleMixin:
+    """
+    Viewset mixin fetching the object of the detail actions along with the id of its project, and setting the
+    `role` of the request user in that project on it, read from the role matrix: the object permissions are
+    checked without any further query.
+    """
+
+    # path from the object to the id of its project, joined in the object query when it crosses a relation
+    project_id_field = "project_id"
+
+    def get_object(self):
+
+        queryset = self.filter_queryset(self.get_queryset())
+        queryset = queryset.annotate(role_project_id=F(self.project_id_field))
+
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        obj = get_object_or_404(queryset, **{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+
+        obj.role = roles.get_role(self.request.user.pk, obj.role_project_id)
+
+        self.check_object_permissions(self.request, obj)
+
+        return obj
@@ -0,0 +1,216 @@
+import io
+import json
+import re
+from contextlib import ExitStack
+from urllib.parse import urlsplit
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import transaction
+from django.urls import Resolver404, resolve
+from rest_framework import permissions, serializers
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.views import APIView
+from projects.roles import roles
+from sharding.shards import get_databases
+
+DEFAULTS = {
+    # operations accepted in a single batch
+    'MAX_OPERATIONS': 25,
+}
+
+METHODS = ["GET", "POST", "PUT", "PATCH", "DELETE"]
+
+# request metadata inherited by the operations from the batch request
+INHERITED_META = ["SERVER_NAME", "SERVER_PORT", "HTTP_HOST", "REMOTE_ADDR", "HTTP_ACCEPT_LANGUAGE"]
+
+# `{{<index or name>.<key>.<key>}}`: a value of the response of an earlier operation
+REFERENCE = re.compile(r"\{\{\s*([\w-]+)((?:\.[\w-]+)*)\s*\}\}")
+
+
+def get_setting(name):
+    return getattr(settings, 'BATCH', {}).get(name, DEFAULTS[name])
+
+
+class UnresolvedReference(Exception):
+    pass
+
+
+class OperationSerializer(serializers.Serializer):
+
+    method = serializers.ChoiceField(choices=METHODS)
+    path = serializers.RegexField(r"^/", max_length=2000)
+    body = serializers.JSONField(required=False, default=None)
+    # referenced by the next operations instead of its index
+    name = serializers.SlugField(required=False, max_length=50)
+
+
+class BatchSerializer(serializers.Serializer):
+
+    operations = OperationSerializer(many=True, allow_empty=False)
+    atomic = serializers.BooleanField(default=False)
+
+    def validate_operations(self, operations):
+
+        if len(operations) > get_setting('MAX_OPERATIONS'):
+            raise serializers.ValidationError(f"at most {get_setting('MAX_OPERATIONS')} operations can be run at once")
+
+        names = [operation["name"] for operation in operations if "name" in operation]
+
+        if len(names) != len(set(names)):
+            raise serializers.ValidationError("the operation names must be unique")
+
+        return operations
+
+
+def resolve_reference(match, results: list, names: dict):
+
+    key, path = match.group(1), match.group(2)
+    index = int(key) if key.isdigit() else names.get(key)
+
+    if index is None or index >= len(results):
+        raise UnresolvedReference(f"{match.group(0)} does not refer to an earlier operation")
+
+    value = results[index]["body"]
+
+    for part in path.split(".")[1:]:
+        try:
+            value = value[int(part)] if isinstance(value, list) else value[part]
+        except (KeyError, IndexError, TypeError, ValueError):
+            raise UnresolvedReference(f"{match.group(0)} is not in the response of the operation {index}")
+
+    return value
+
+
+def substitute(value, results: list, names: dict):
+    """
+    Replace the references to the earlier responses: a string made of a single reference takes the referred
+    value as is, a number stays a number, otherwise the values are formatted into the string
+    """
+
+    if isinstance(value, dict):
+        return {key: substitute(item, results, names) for key, item in value.items()}
+
+    if isinstance(value, list):
+        return [substitute(item, results, names) for item in value]
+
+    if not isinstance(value, str):
+        return value
+
+    match = REFERENCE.fullmatch(value)
+
+    if match is not None:
+        return resolve_reference(match, results, names)
+
+    return REFERENCE.sub(lambda match: str(resolve_reference(match, results, names)), value)
+
+
+def build_request(request, method: str, path: str, body) -> WSGIRequest:
+    """
+    Operation request, authenticated as the batch request: the authentication is not run again
+    """
+
+    url = urlsplit(path)
+    payload = b"" if body is None else json.dumps(body, cls=JSONEncoder).encode()
+
+    environ = {key: request.META[key] for key in INHERITED_META if key in request.META}
+    environ.update({
+        "REQUEST_METHOD": method,
+        "PATH_INFO": url.path,
+        "QUERY_STRING": url.query,
+        "CONTENT_TYPE": "application/json",
+        "CONTENT_LENGTH": str(len(payload)),
+        "HTTP_ACCEPT": "application/json",
+        "wsgi.input": io.BytesIO(payload),
+        "wsgi.url_scheme": request.scheme,
+    })
+
+    operation_request = WSGIRequest(environ)
+    # see rest_framework.request.Request, which then skips the authentication classes
+    operation_request._force_auth_user = request.user
+    operation_request._force_auth_token = request.auth
+
+    return operation_request
+
+
+class BatchView(APIView):
+    """
+    Run an ordered list of operations on the other endpoints, in process and under the authentication of the batch.
+
+    An operation may refer to the response of an earlier one, by index or by name, with `{{0.id}}` in its path or
+    body. The batch stops at the first failed operation; an atomic batch is run in a single transaction on every
+    database, rolled back when an operation fails. The operations go through the permission checks and the rate
+    limits of their endpoint.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        atomic = serializer.validated_data["atomic"]
+        databases = get_databases()
+        results, names, failed = [], {}, None
+        committed = False
+
+        try:
+            with ExitStack() as stack:
+
+                if atomic:
+                    for database in databases:
+                        stack.enter_context(transaction.atomic(using=database))
+
+                for index, operation in enumerate(serializer.validated_data["operations"]):
+
+                    result = self.run_operation(request, operation, results, names)
+                    results.append(result)
+
+                    if "name" in operation:
+                        names[operation["name"]] = index
+
+                    if result["status"] >= 400:
+                        failed = index
+                        break
+
+                if atomic and failed is not None:
+
+                    for database in databases:
+                        transaction.set_rollback(True, using=database)
+
+            committed = failed is None
+
+        finally:
+            if atomic and not committed:
+                # rolled back by a failed operation or an exception: the matrix may have read the rolled back
+                # projects and contributors
+                roles.reload()
+
+        return Response({"results": results, "failed": failed, "rolled_back": atomic and failed is not None})
+
+    def run_operation(self, request, operation: dict, results: list, names: dict) -> dict:
+
+        method = operation["method"]
+
+        try:
+            path = substitute(operation["path"], results, names)
+            body = substitute(operation["body"], results, names)
+        except UnresolvedReference as error:
+            return {"method": method, "path": operation["path"], "status": 400, "body": {"detail": str(error)}}
+
+        result = {"method": method, "path": path}
+
+        try:
+            match = resolve(urlsplit(path).path)
+        except Resolver404:
+            return {**result, "status": 404, "body": {"detail": "Not found."}}
+
+        view_class = getattr(match.func, "cls", None)
+
+        if view_class is None or not issubclass(view_class, APIView) or issubclass(view_class, BatchView):
+            return {**result, "status": 400, "body": {"detail": "not an endpoint that can be batched"}}
+
+        response = match.func(build_request(request, method, path, body), *match.args, **match.kwargs)
+
+        return {**result, "status": response.status_code, "body": getattr(response, "data", None)}
@@ -0,0 +1,65 @@
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from api.fast_list import get_row_serializer
+
+# largest primary key, beyond which the database driver overflows
+MAX_ID = 2 ** 63 - 1
+
+
+class BatchRetrieveMixin:
+    """
+    Viewset mixin retrieving several objects at once with `?ids=1,2,3`.
+
+    The visibility is checked in the same query as the lookup, through `get_queryset()`. The results follow
+    the requested order, and the unknown or forbidden ids are reported in `missing` instead of failing the batch.
+    """
+
+    batch_max_ids = 100
+
+    def list(self, request, *args, **kwargs):
+
+        if "ids" not in request.GET:
+            return super().list(request, *args, **kwargs)
+
+        ids = self.get_batch_ids(request.GET["ids"])
+        queryset = self.filter_queryset(self.get_queryset()).filter(pk__in=ids)
+
+        found = self.serialize_batch(queryset)
+
+        return Response({
+            "results": [found[pk] for pk in ids if pk in found],
+            "missing": [pk for pk in ids if pk not in found],
+        })
+
+    def get_batch_ids(self, value: str) -> list:
+
+        try:
+            # deduplicated, in the requested order
+            ids = list(dict.fromkeys(int(pk) for pk in value.split(",") if pk.strip()))
+        except ValueError:
+            raise ValidationError({"ids": ["expected a comma separated list of integers"]})
+
+        if any(not 1 <= pk <= MAX_ID for pk in ids):
+            raise ValidationError({"ids": [f"expected ids between 1 and {MAX_ID}"]})
+
+        if len(ids) > self.batch_max_ids:
+            raise ValidationError({"ids": [f"at most {self.batch_max_ids} ids can be requested at once"]})
+
+        return ids
+
+    def serialize_batch(self, queryset) -> dict:
+        """
+        Return the serialized objects, indexed by primary key
+        """
+
+        serializer_class = self.get_serializer_class()
+        row_serializer = get_row_serializer(serializer_class)
+
+        if row_serializer is not None:
+            tuples = list(queryset.values_list(*row_serializer.columns))
+            return dict(zip((values[0] for values in tuples), row_serializer.serialize(tuples)))
+
+        instances = list(queryset)
+        serializer = self.get_serializer(instances, many=True)
+
+        return dict(zip((instance.pk for instance in instances), serializer.data))
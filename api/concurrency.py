@@ -0,0 +1,79 @@
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+
+class VersionConflict(APIException):
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = "the resource was changed by another request, read it again before changing it"
+    default_code = "version_conflict"
+
+
+def to_etag(version: int) -> str:
+    return f'"{version}"'
+
+
+def parse_if_match(value: str):
+    """
+    Versions listed by an If-Match header, None for `*`. The weak tags never match, as required for If-Match
+    """
+
+    tags = [tag.strip() for tag in value.split(",") if tag.strip()]
+
+    if "*" in tags:
+        return None
+
+    versions = set()
+
+    for tag in tags:
+
+        if tag.startswith("W/"):
+            continue
+
+        try:
+            versions.add(int(tag.strip('"')))
+        except ValueError:
+            raise ValidationError({"If-Match": ["expected a list of entity tags, as given by the ETag header"]})
+
+    return versions
+
+
+class ConditionalUpdateMixin:
+    """
+    Viewset mixin for the VersionedModel (see api.models): the detail responses carry the version of the object
+    as ETag, and the updates and deletions sent with an `If-Match` header only apply to one of the listed
+    versions, otherwise they fail with a 412. The updates also fail when the object changed after it was read
+    by the request, without any lock.
+    """
+
+    def get_object(self):
+
+        obj = super().get_object()
+        value = self.request.headers.get("If-Match")
+
+        if value is None or self.request.method not in ("PUT", "PATCH", "DELETE"):
+            return obj
+
+        versions = parse_if_match(value)
+
+        if versions is not None and obj.version not in versions:
+            raise VersionConflict()
+
+        if self.request.method == "DELETE":
+            # the deletion does not go through save(): the concurrent updates of this version fail from now on
+            obj.claim_version()
+
+        return obj
+
+    def finalize_response(self, request, response, *args, **kwargs):
+
+        response = super().finalize_response(request, response, *args, **kwargs)
+
+        if (
+            getattr(self, "action", None) in ("retrieve", "update", "partial_update")
+            and response.status_code == status.HTTP_200_OK
+            and isinstance(response.data, dict)
+            and "version" in response.data
+        ):
+            response["ETag"] = to_etag(response.data["version"])
+
+        return response
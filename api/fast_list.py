@@ -0,0 +1,162 @@
+from functools import lru_cache
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.response import Response
+
+# fields whose representation is the database value itself
+PASSTHROUGH_FIELDS = (
+    serializers.CharField,
+    serializers.ChoiceField,
+    serializers.IntegerField,
+    serializers.BooleanField,
+    serializers.PrimaryKeyRelatedField,
+)
+
+# fields converted by their own (bound) DRF field
+CONVERTED_FIELDS = (
+    serializers.DateTimeField,
+)
+
+
+class RowSerializer:
+    """
+    Read-only fast path of a ModelSerializer: reads `values_list()` tuples, and maps them straight to the
+    output dicts through a row function built once per serializer class, without model instances nor
+    field objects walk. The output is the one of the serializer.
+
+    Nested serializers, declared as `Meta.fast_nested = {field_name: serializer_class}` on the serializers
+    which override `to_representation()` to nest them, are fetched with one query per page.
+    """
+
+    def __init__(self, serializer_class, columns, names, converters, nested):
+
+        self.serializer_class = serializer_class
+        self.model = serializer_class.Meta.model
+        # the primary key always comes first, to index the nested rows
+        self.columns = ["pk"] + columns
+        self.nested = nested
+
+        self.row = self.build(names, converters)
+
+    @staticmethod
+    def build(names, converters):
+
+        fields = list(zip(names, converters))
+
+        def row(values):
+            # values[0] is the primary key
+            return {
+                name: value if convert is None or value is None else convert(value)
+                for (name, convert), value in zip(fields, values[1:])
+            }
+
+        return row
+
+    def serialize(self, tuples) -> list:
+
+        row = self.row
+        rows = [row(values) for values in tuples]
+
+        for name, nested in self.nested.items():
+
+            ids = {data[name] for data in rows if data[name] is not None}
+            nested_rows = nested.fetch(ids)
+
+            for data in rows:
+                if data[name] is not None:
+                    data[name] = nested_rows[data[name]]
+
+        return rows
+
+    def fetch(self, ids) -> dict:
+        """
+        Return the rows of the given primary keys, indexed by primary key
+        """
+
+        tuples = list(self.model.objects.filter(pk__in=ids).values_list(*self.columns))
+
+        return dict(zip((values[0] for values in tuples), self.serialize(tuples)))
+
+
+@lru_cache(maxsize=None)
+def get_row_serializer(serializer_class):
+    """
+    Build the fast path of a serializer class, None if some of its fields are not supported
+    """
+
+    meta = serializer_class.Meta
+    fast_nested = getattr(meta, "fast_nested", {})
+
+    if serializer_class.to_representation is not serializers.ModelSerializer.to_representation and not fast_nested:
+        # custom representation, not described by its fields
+        return None
+
+    model = meta.model
+    columns, names, converters, nested = [], [], [], {}
+
+    for name, field in serializer_class().fields.items():
+
+        if field.write_only:
+            continue
+
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            # computed attribute
+            return None
+
+        if name in fast_nested:
+            nested[name] = get_row_serializer(fast_nested[name])
+
+            if nested[name] is None:
+                return None
+
+            converter = None
+
+        elif isinstance(field, CONVERTED_FIELDS):
+            converter = field.to_representation
+
+        elif isinstance(field, PASSTHROUGH_FIELDS):
+            converter = None
+
+        else:
+            return None
+
+        columns.append(model_field.attname if model_field.is_relation else model_field.name)
+        names.append(name)
+        converters.append(converter)
+
+    return RowSerializer(serializer_class, columns, names, converters, nested)
+
+
+class FastListMixin:
+    """
+    Viewset mixin serving the list action through the serializer fast path, when it supports the serializer
+    """
+
+    def list(self, request, *args, **kwargs):
+
+        serializer_class = self.get_serializer_class()
+
+        if get_row_serializer(serializer_class) is None:
+            return super().list(request, *args, **kwargs)
+
+        return self.fast_list(self.filter_queryset(self.get_queryset()), serializer_class)
+
+    def fast_list(self, queryset, serializer_class):
+        """
+        Return the paginated response of the queryset, None if the serializer is not supported
+        """
+
+        row_serializer = get_row_serializer(serializer_class)
+
+        if row_serializer is None:
+            return None
+
+        tuples = queryset.values_list(*row_serializer.columns)
+        page = self.paginate_queryset(tuples)
+
+        if page is None:
+            return Response(row_serializer.serialize(tuples))
+
+        return self.get_paginated_response(row_serializer.serialize(page))
@@ -0,0 +1,183 @@
+import hashlib
+import json
+import threading
+import time
+import zlib
+from datetime import timedelta
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+from api.models import IdempotencyKey
+
+DEFAULTS = {
+    # how long a response is replayed to the retries
+    'TTL': timedelta(hours=24),
+    # seconds between two purges of the expired keys, per process
+    'PURGE_INTERVAL': 300,
+    # how long a request keeps its key, after which a retry takes it over: longer than any request
+    'LOCK_TIMEOUT': timedelta(seconds=60),
+}
+
+_last_purge = 0
+_purge_lock = threading.Lock()
+
+
+def get_setting(name):
+    return getattr(settings, 'IDEMPOTENCY', {}).get(name, DEFAULTS[name])
+
+
+class RequestInProgress(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "a request with the same Idempotency-Key is being processed"
+    default_code = "idempotency_key_in_progress"
+
+
+class KeyReused(APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = "the Idempotency-Key was already used for a different request"
+    default_code = "idempotency_key_reused"
+
+
+def get_scope(request) -> str:
+
+    if request.user and request.user.is_authenticated:
+        return f"user:{request.user.pk}"
+
+    return f"address:{request.META.get('REMOTE_ADDR')}"
+
+
+def get_fingerprint(request) -> str:
+
+    data = request.data
+    data = {key: values for key, values in data.lists()} if hasattr(data, "lists") else data
+    content = json.dumps([request.method, request.path, data], sort_keys=True, cls=JSONEncoder)
+
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def purge_expired_keys(now):
+
+    global _last_purge
+
+    with _purge_lock:
+
+        if time.monotonic() - _last_purge < get_setting('PURGE_INTERVAL'):
+            return
+
+        _last_purge = time.monotonic()
+
+    expired = IdempotencyKey.objects.filter(expires_time__lte=now)
+    expired._raw_delete(expired.db)
+
+
+def run_once(request, key: str, create):
+    """
+    Run the create action once per key: the retries get the stored response back, without running it again
+    """
+
+    if not key or len(key) > 255:
+        raise ValidationError({"Idempotency-Key": ["expected a non empty key of at most 255 characters"]})
+
+    scope = get_scope(request)
+    fingerprint = get_fingerprint(request)
+    now = timezone.now()
+
+    purge_expired_keys(now)
+
+    record = IdempotencyKey.objects.filter(scope=scope, key=key).first()
+
+    if record is not None and record.expires_time <= now:
+        record.delete()
+        record = None
+
+    if record is not None and not take_over(record, fingerprint, now):
+        return replay(record, fingerprint)
+
+    if record is None:
+        try:
+            with transaction.atomic():
+                record = IdempotencyKey.objects.create(
+                    scope=scope,
+                    key=key,
+                    fingerprint=fingerprint,
+                    expires_time=now + get_setting('TTL'),
+                    locked_until=now + get_setting('LOCK_TIMEOUT')
+                )
+        except IntegrityError:
+            # a concurrent request with the same key was first
+            raise RequestInProgress()
+
+    try:
+        response = create()
+    except Exception:
+        # nothing was created, the client may retry
+        record.delete()
+        raise
+
+    if response.status_code >= 500:
+        record.delete()
+        return response
+
+    record.status_code = response.status_code
+    record.response = zlib.compress(json.dumps(response.data, cls=JSONEncoder).encode())
+    record.locked_until = None
+    record.save(update_fields=["status_code", "response", "locked_until"])
+
+    return response
+
+
+def take_over(record: IdempotencyKey, fingerprint: str, now) -> bool:
+    """
+    Take the key of a request whose lease is past, and which never stored its response (the process died)
+    """
+
+    if record.status_code is not None or record.fingerprint != fingerprint:
+        return False
+
+    if record.locked_until is not None and record.locked_until > now:
+        return False
+
+    # a single retry wins the lease
+    taken = IdempotencyKey.objects.filter(
+        pk=record.pk,
+        status_code__isnull=True,
+        locked_until=record.locked_until
+    ).update(locked_until=now + get_setting('LOCK_TIMEOUT'))
+
+    return taken == 1
+
+
+def replay(record: IdempotencyKey, fingerprint: str) -> Response:
+
+    if record.fingerprint != fingerprint:
+        raise KeyReused()
+
+    if record.status_code is None:
+        raise RequestInProgress()
+
+    data = json.loads(zlib.decompress(record.response))
+
+    return Response(data, status=record.status_code, headers={"Idempotent-Replayed": "true"})
+
+
+class IdempotentCreateMixin:
+    """
+    View mixin replaying the response of a create action to the retries carrying the same `Idempotency-Key`
+    header, for IDEMPOTENCY['TTL']. A key reused for another request is refused with a 422, and a retry sent
+    while the first request is still processed with a 409. A retry sent after IDEMPOTENCY['LOCK_TIMEOUT'] runs
+    the request again, when the first one never completed.
+    """
+
+    def create(self, request, *args, **kwargs):
+
+        key = request.headers.get("Idempotency-Key")
+        create = super().create
+
+        if key is None:
+            return create(request, *args, **kwargs)
+
+        return run_once(request, key, lambda: create(request, *args, **kwargs))
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-19 13:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdempotencyKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(max_length=64)),
+                ('key', models.CharField(max_length=255)),
+                ('fingerprint', models.CharField(max_length=64)),
+                ('status_code', models.PositiveSmallIntegerField(null=True)),
+                ('response', models.BinaryField(null=True)),
+                ('expires_time', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['expires_time'], name='idempotencykey_expires_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='idempotencykey',
+            constraint=models.UniqueConstraint(fields=('scope', 'key'), name='idempotencykey_scope_key_uniq'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 14:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='idempotencykey',
+            name='locked_until',
+            field=models.DateTimeField(null=True),
+        ),
+    ]
@@ -0,0 +1,94 @@
+from django.db import models
+from django.db.models import F
+from api.concurrency import VersionConflict
+
+
+class VersionedModel(models.Model):
+    """
+    Model updated by compare and swap: each save checks and increments the version read along with the
+    instance, in the UPDATE statement itself, and fails with a VersionConflict when another write came first,
+    the deletion included. The activity counters, updated in place by the signals, do not change the version:
+    they are not written back by the save either, see projects.models.saved_fields.
+    """
+
+    version = models.PositiveIntegerField(
+        default=1,
+        editable=False
+    )
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+
+        if self._state.adding:
+            # a new row whose id was allocated beforehand, see sharding.shards
+            return super()._do_update(base_qs, using, pk_val, values, update_fields, forced_update)
+
+        field = self._meta.get_field("version")
+        values = [value for value in values if value[0] is not field] + [(field, None, self.version + 1)]
+
+        if base_qs.filter(pk=pk_val, version=self.version)._update(values) == 0:
+            # changed or deleted meanwhile: never inserted again
+            raise VersionConflict()
+
+        self.version += 1
+
+        return True
+
+    def claim_version(self):
+        """
+        Increment the version if it is still the one read, for the writes which do not go through save()
+        """
+
+        queryset = type(self)._base_manager.using(self._state.db).filter(pk=self.pk, version=self.version)
+
+        if not queryset.update(version=F("version") + 1):
+            raise VersionConflict()
+
+        self.version += 1
+
+    class Meta:
+        abstract = True
+
+
+class IdempotencyKey(models.Model):
+    """
+    Response of a create request, replayed to the retries carrying the same Idempotency-Key, see api.idempotency
+    """
+
+    # "user:<id>", or "address:<ip>" for the anonymous requests
+    scope = models.CharField(
+        max_length=64
+    )
+
+    key = models.CharField(
+        max_length=255
+    )
+
+    # sha256 of the method, path and data of the request
+    fingerprint = models.CharField(
+        max_length=64
+    )
+
+    # null while the request is being processed
+    status_code = models.PositiveSmallIntegerField(
+        null=True
+    )
+
+    # zlib compressed JSON of the response data
+    response = models.BinaryField(
+        null=True
+    )
+
+    expires_time = models.DateTimeField()
+
+    # lease of the request being processed, taken over by a retry once past
+    locked_until = models.DateTimeField(
+        null=True
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["scope", "key"], name="idempotencykey_scope_key_uniq"),
+        ]
+        indexes = [
+            models.Index(fields=["expires_time"], name="idempotencykey_expires_idx"),
+        ]
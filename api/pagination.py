@@ -0,0 +1,196 @@
+import hashlib
+import json
+from functools import partial
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from rest_framework.pagination import PageNumberPagination
+
+DEFAULTS = {
+    # seconds a count is reused for the same user and filters
+    'CACHE_TTL': 30,
+    # above this number of rows, the count is estimated instead of counted
+    'ESTIMATE_THRESHOLD': 10000,
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'PAGINATION_COUNT', {}).get(name, DEFAULTS[name])
+
+
+def generation_key(model) -> str:
+    return f"pagination-count-generation:{model._meta.label_lower}"
+
+
+def get_generation(model) -> int:
+    return cache.get_or_set(generation_key(model), 0, timeout=None)
+
+
+def invalidate_counts(model):
+    """
+    Invalidate all the cached counts of a model, called on create and delete (see api.signals)
+    """
+
+    try:
+        cache.incr(generation_key(model))
+    except ValueError:
+        # never counted yet
+        pass
+
+
+class EstimatedCountPage(Page):
+    """
+    Page of an estimated count: whether a next page exists is known by reading one extra row
+    """
+
+    def __init__(self, object_list, number, paginator, peeked_next: bool):
+        super().__init__(object_list, number, paginator)
+        self.peeked_next = peeked_next
+
+    def has_next(self):
+        return self.peeked_next
+
+
+class CachedCountPaginator(Paginator):
+    """
+    Paginator whose count is cached under `count_key`, and estimated above the threshold
+    """
+
+    def __init__(self, object_list, per_page, count_key=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_key = count_key
+        self.estimated = False
+
+    @cached_property
+    def count(self):
+
+        cached = cache.get(self.count_key) if self.count_key else None
+
+        if cached is None:
+            cached = self.compute_count()
+
+            if self.count_key:
+                cache.set(self.count_key, cached, get_setting('CACHE_TTL'))
+
+        count, self.estimated = cached
+
+        return count
+
+    def compute_count(self):
+        """
+        Return the count and whether it is estimated: the exact count is bounded to the threshold
+        """
+
+        count = getattr(self.object_list, "count", None)
+
+        if count is None:
+            return len(self.object_list), False
+
+        threshold = get_setting('ESTIMATE_THRESHOLD')
+        bounded_count = self.object_list[:threshold + 1].count()
+
+        if bounded_count <= threshold:
+            return bounded_count, False
+
+        estimate = self.planner_estimate()
+
+        if estimate is None:
+            # cached like any other count
+            return self.object_list.count(), False
+
+        return max(bounded_count, estimate), True
+
+    def planner_estimate(self):
+        """
+        Row estimate of the query planner, summed over the shards of a merged queryset (see sharding.query).
+        Only PostgreSQL exposes one: None when a database is of another vendor, such as SQLite, whose large
+        lists are then counted exactly
+        """
+
+        estimate = 0
+
+        for queryset in getattr(self.object_list, "querysets", [self.object_list]):
+
+            if connections[queryset.db].vendor != "postgresql":
+                return None
+
+            plan = json.loads(queryset.explain(format="json"))
+            estimate += int(plan[0]["Plan"]["Plan Rows"])
+
+        return estimate
+
+    def validate_number(self, number):
+
+        if not self.count or not self.estimated:
+            return super().validate_number(number)
+
+        # the number of pages is unknown: only the lower bound is checked
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger("That page number is not an integer")
+
+        if number < 1:
+            raise EmptyPage("That page number is less than 1")
+
+        return number
+
+    def page(self, number):
+
+        number = self.validate_number(number)
+
+        if not self.estimated:
+            return super().page(number)
+
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+
+        if not rows and number > 1:
+            raise EmptyPage("That page contains no results")
+
+        return EstimatedCountPage(rows[:self.per_page], number, self, peeked_next=len(rows) > self.per_page)
+
+
+class CachedCountPagination(PageNumberPagination):
+    """
+    Page number pagination which does not run a full COUNT(*) on each page: the count is cached per user and
+    filters for a short time, invalidated on create and delete, and estimated above a threshold on PostgreSQL.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+
+        self.django_paginator_class = partial(CachedCountPaginator, count_key=self.get_count_key(queryset, request))
+
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_count_key(self, queryset, request):
+
+        model = getattr(queryset, "model", None)
+
+        if model is None:
+            return None
+
+        from projects.models import Contributor
+
+        params = sorted(
+            (key, value) for key, value in request.GET.lists()
+            if key not in (self.page_query_param, self.page_size_query_param)
+        )
+
+        # the visibility of the rows depends on the contributors
+        generations = f"{get_generation(model)}.{get_generation(Contributor)}"
+        digest = hashlib.sha1(repr((request.path, params)).encode()).hexdigest()
+
+        return f"pagination-count:{model._meta.label_lower}:{generations}:{request.user.pk}:{digest}"
+
+    def get_paginated_response(self, data):
+
+        response = super().get_paginated_response(data)
+
+        if self.page.paginator.estimated:
+            response.data["count_is_estimate"] = True
+
+        return response
+
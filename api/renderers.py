@@ -0,0 +1,168 @@
+import struct
+from rest_framework import renderers
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+# optional accelerated backends, a pure python implementation is used when missing
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    """
+    Drop-in replacement of the DRF JSONRenderer, backed by orjson when installed.
+
+    orjson is only used for the compact, unicode and strict default settings, the types it would format
+    differently (datetimes) are passed to the DRF encoder, and any data it refuses (non string keys, big
+    integers) is rendered by the DRF renderer: the output is the one of the DRF renderer, except for the floats.
+    orjson writes their shortest form (`1e-7` where DRF writes `1e-07`, `1e16` for `1e+16`), the same values
+    once parsed, and renders NaN and the infinities as `null` where the strict DRF renderer raises a ValueError.
+    None of the models has a float field.
+    """
+
+    use_orjson = orjson is not None and api_settings.COMPACT_JSON and api_settings.UNICODE_JSON and api_settings.STRICT_JSON
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+
+        if data is None or not self.use_orjson:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=JSONEncoder().default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # same javascript subset escaping as the DRF renderer
+        if b"\xe2\x80" in ret:
+            ret = ret.replace("\u2028".encode(), b"\\u2028").replace("\u2029".encode(), b"\\u2029")
+
+        return ret
+
+
+class MessagePackRenderer(renderers.BaseRenderer):
+    """
+    Compact binary representation, negotiated with `Accept: application/msgpack`.
+
+    Backed by msgpack when installed, by a pure python packer producing the same bytes otherwise.
+    """
+
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+
+        if data is None:
+            return b""
+
+        default = JSONEncoder().default
+
+        if msgpack is not None:
+            return msgpack.packb(data, default=default, use_bin_type=True)
+
+        return packb(data, default)
+
+
+def packb(obj, default) -> bytes:
+    """
+    Pure python MessagePack packer, same output as msgpack.packb(obj, use_bin_type=True)
+    """
+
+    out = bytearray()
+    _pack(obj, out, default)
+
+    return bytes(out)
+
+
+def _pack(obj, out: bytearray, default):
+
+    if obj is None:
+        out.append(0xc0)
+
+    elif obj is True:
+        out.append(0xc3)
+
+    elif obj is False:
+        out.append(0xc2)
+
+    elif isinstance(obj, int):
+        _pack_int(obj, out)
+
+    elif isinstance(obj, float):
+        out.append(0xcb)
+        out += struct.pack(">d", obj)
+
+    elif isinstance(obj, str):
+        raw = obj.encode("utf-8")
+        _pack_header(len(raw), out, 0xa0, 32, 0xd9, 0xda, 0xdb)
+        out += raw
+
+    elif isinstance(obj, (bytes, bytearray, memoryview)):
+        raw = bytes(obj)
+        _pack_header(len(raw), out, None, 0, 0xc4, 0xc5, 0xc6)
+        out += raw
+
+    elif isinstance(obj, (list, tuple)):
+        _pack_header(len(obj), out, 0x90, 16, None, 0xdc, 0xdd)
+        for item in obj:
+            _pack(item, out, default)
+
+    elif isinstance(obj, dict):
+        _pack_header(len(obj), out, 0x80, 16, None, 0xde, 0xdf)
+        for key, value in obj.items():
+            _pack(key, out, default)
+            _pack(value, out, default)
+
+    else:
+        _pack(default(obj), out, default)
+
+
+def _pack_header(length: int, out: bytearray, fix, fix_limit: int, code8, code16, code32):
+
+    if fix is not None and length < fix_limit:
+        out.append(fix | length)
+    elif code8 is not None and length < 0x100:
+        out += struct.pack(">BB", code8, length)
+    elif length < 0x10000:
+        out += struct.pack(">BH", code16, length)
+    elif length < 0x100000000:
+        out += struct.pack(">BI", code32, length)
+    else:
+        raise ValueError("object too large for MessagePack")
+
+
+def _pack_int(value: int, out: bytearray):
+
+    if 0 <= value < 0x80:
+        out.append(value)
+    elif -0x20 <= value < 0:
+        out += struct.pack(">b", value)
+    elif 0 <= value < 0x100:
+        out += struct.pack(">BB", 0xcc, value)
+    elif 0 <= value < 0x10000:
+        out += struct.pack(">BH", 0xcd, value)
+    elif 0 <= value < 0x100000000:
+        out += struct.pack(">BI", 0xce, value)
+    elif 0 <= value < 0x10000000000000000:
+        out += struct.pack(">BQ", 0xcf, value)
+    elif -0x80 <= value < 0:
+        out += struct.pack(">Bb", 0xd0, value)
+    elif -0x8000 <= value < 0:
+        out += struct.pack(">Bh", 0xd1, value)
+    elif -0x80000000 <= value < 0:
+        out += struct.pack(">Bi", 0xd2, value)
+    elif -0x8000000000000000 <= value < 0:
+        out += struct.pack(">Bq", 0xd3, value)
+    else:
+        raise OverflowError("integer out of MessagePack range")
@@ -0,0 +1,22 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from api.pagination import invalidate_counts
+from issues.models import Comment, Issue
+from projects.models import Contributor, Project
+from user.models import SoftdeskUser
+
+COUNTED_MODELS = (Project, Contributor, Issue, Comment, SoftdeskUser)
+
+
+@receiver(post_save)
+def invalidate_created(sender, instance, created, **kwargs):
+
+    if created and sender in COUNTED_MODELS:
+        invalidate_counts(sender)
+
+
+@receiver(post_delete)
+def invalidate_deleted(sender, instance, **kwargs):
+
+    if sender in COUNTED_MODELS:
+        invalidate_counts(sender)
@@ -0,0 +1,547 @@
+import json
+import os
+from multiprocessing import resource_tracker
+from unittest import skipIf
+from unittest.mock import patch
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import AccessToken
+from api import renderers, throttling
+from api.throttling import MemoryBuckets, SharedMemoryBuckets
+from api.renderers import FastJSONRenderer, MessagePackRenderer, packb
+from api.fast_list import get_row_serializer
+from user.models import SoftdeskUser
+from user.serializers import SoftdeskUserSerializer
+from projects.models import Project, Contributor
+from projects.roles import roles
+from projects.serializers import ProjectSerializer, ContributorSerializer
+from issues.models import Issue, Comment
+from issues.serializers import IssueSerializer, CommentSerializer, ArchivedIssueSerializer
+from datetime import datetime, timezone
+from decimal import Decimal
+
+DATA = {
+    "count": 2,
+    "next": None,
+    "results": [
+        {"id": 1, "title": "é\u2028", "time": datetime(2023, 7, 14, 12, 58, 1, 123456, tzinfo=timezone.utc)},
+        {"id": 2 ** 40, "ratio": 0.1, "price": Decimal("1.50"), "tags": ("BUG", "TASK"), "done": False},
+    ],
+    "sizes": [-1, -33, -200, -40000, -3000000000, 200, 40000, 3000000000, 2 ** 63],
+    "text": "x" * 40 + "y" * 300,
+    "blob": b"\x00" * 300,
+    "big": {str(i): i for i in range(20)},
+}
+
+
+class TestRenderers(SimpleTestCase):
+
+    def test_json_output_is_drf_compatible(self):
+
+        data = dict(DATA)
+        del data["blob"]
+
+        expected = JSONRenderer().render(data)
+
+        self.assertEqual(FastJSONRenderer().render(data), expected)
+
+        # data refused by the accelerated backend
+        self.assertEqual(FastJSONRenderer().render({1: 2 ** 70}), JSONRenderer().render({1: 2 ** 70}))
+
+        # pretty printing
+        self.assertEqual(
+            FastJSONRenderer().render(data, "application/json; indent=4"),
+            JSONRenderer().render(data, "application/json; indent=4")
+        )
+
+    @skipIf(renderers.orjson is None, "orjson is not installed")
+    def test_json_floats(self):
+
+        floats = [1e-7, 1e16, 0.1, -2.5, 1 / 3]
+
+        # formatted differently, parsed to the same values
+        self.assertEqual(FastJSONRenderer().render(floats[:2]), b"[1e-7,1e16]")
+        self.assertEqual(JSONRenderer().render(floats[:2]), b"[1e-07,1e+16]")
+        self.assertEqual(json.loads(FastJSONRenderer().render(floats)), json.loads(JSONRenderer().render(floats)))
+
+        self.assertEqual(FastJSONRenderer().render([float("nan")]), b"[null]")
+
+        with self.assertRaises(ValueError):
+            JSONRenderer().render([float("nan")])
+
+    @skipIf(renderers.msgpack is None, "msgpack is not installed")
+    def test_pure_python_msgpack_is_compatible(self):
+
+        expected = renderers.msgpack.packb(DATA, default=renderers.JSONEncoder().default, use_bin_type=True)
+
+        self.assertEqual(packb(DATA, renderers.JSONEncoder().default), expected)
+
+        with patch("api.renderers.msgpack", None):
+            self.assertEqual(MessagePackRenderer().render(DATA), expected)
+
+
+class TestContentNegotiation(APITestCase):
+
+    def setUp(self) -> None:
+
+        self.user = SoftdeskUser.objects.create_user(
+            username="user",
+            password="password",
+            age=27,
+        )
+
+        self.project = Project.objects.create(
+            description="project",
+            type="FRONT",
+            author=self.user
+        )
+
+        Issue.objects.create(
+            tag="BUG",
+            title="BUG Issue",
+            project=self.project,
+            author=self.user
+        )
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+
+    def test_msgpack(self):
+
+        response = self.client.get("/issues/", HTTP_ACCEPT="application/msgpack")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/msgpack")
+
+        json_response = self.client.get("/issues/", HTTP_ACCEPT="application/json")
+
+        self.assertEqual(response.content, packb(json_response.json(), None))
+
+    def test_json(self):
+
+        response = self.client.get("/issues/", HTTP_ACCEPT="application/json")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertEqual(response.json()["count"], 1)
+
+
+class TestFastList(TestCase):
+
+    def setUp(self) -> None:
+
+        self.user = SoftdeskUser.objects.create_user(
+            username="user",
+            password="password",
+            age=27,
+            can_be_contacted=True,
+        )
+
+        self.other_user = SoftdeskUser.objects.create_user(
+            username="other_user",
+            password="password",
+            age=42,
+        )
+
+        for i in range(3):
+
+            project = Project.objects.create(
+                description=f"project{i}",
+                type="BACK",
+                author=self.user
+            )
+
+            Contributor.objects.create(
+                project=project,
+                user=self.other_user
+            )
+
+            issue = Issue.objects.create(
+                tag="BUG",
+                title=f"issue{i}",
+                project=project,
+                author=self.user,
+                assigned_user=self.other_user if i % 2 else None
+            )
+
+            Comment.objects.create(
+                issue=issue,
+                author=self.other_user,
+                description=f"comment{i}"
+            )
+
+    def test_same_output_as_serializers(self):
+
+        for serializer_class in [
+            IssueSerializer,
+            CommentSerializer,
+            ProjectSerializer,
+            ContributorSerializer,
+            SoftdeskUserSerializer
+        ]:
+
+            row_serializer = get_row_serializer(serializer_class)
+            queryset = serializer_class.Meta.model.objects.order_by("pk")
+
+            self.assertIsNotNone(row_serializer, serializer_class)
+
+            fast_data = row_serializer.serialize(queryset.values_list(*row_serializer.columns))
+            data = serializer_class(queryset, many=True).data
+
+            self.assertEqual(JSONRenderer().render(fast_data), JSONRenderer().render(data), serializer_class)
+
+    def test_unsupported_serializers(self):
+        self.assertIsNone(get_row_serializer(ArchivedIssueSerializer))
+
+
+class TestBatchRetrieve(APITestCase):
+
+    def setUp(self) -> None:
+
+        self.user = SoftdeskUser.objects.create_user(
+            username="user",
+            password="password",
+            age=27,
+        )
+
+        self.other_user = SoftdeskUser.objects.create_user(
+            username="other_user",
+            password="password",
+            age=27,
+        )
+
+        self.issues = []
+
+        for user in [self.user, self.other_user, self.user]:
+
+            project = Project.objects.create(
+                description="project",
+                type="FRONT",
+                author=user
+            )
+
+            issue = Issue.objects.create(
+                tag="BUG",
+                title="BUG Issue",
+                project=project,
+                author=user
+            )
+
+            Comment.objects.create(
+                issue=issue,
+                author=user,
+                description="comment"
+            )
+
+            self.issues.append(issue)
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+
+    def test_batch_retrieve(self):
+
+        # the second project, issue, comment and contributor are not visible to the user
+        for resource in ["issues", "comments", "projects", "contributors"]:
+
+            response = self.client.get(f"/{resource}/?ids=3,2,1,999")
+
+            self.assertEqual(response.status_code, 200, resource)
+            self.assertEqual([item["id"] for item in response.json()["results"]], [3, 1], resource)
+            self.assertEqual(response.json()["missing"], [2, 999], resource)
+
+        response = self.client.get("/users/?ids=2,1,2")
+
+        self.assertEqual([item["id"] for item in response.json()["results"]], [2, 1])
+        self.assertEqual(response.json()["missing"], [])
+
+    def test_batch_retrieve_invalid_ids(self):
+
+        response = self.client.get("/issues/?ids=1,a")
+        self.assertEqual(response.status_code, 400)
+
+        for ids in ["99999999999999999999999", f"1,{2 ** 63}", "0", "1,-2"]:
+            response = self.client.get(f"/issues/?ids={ids}")
+            self.assertEqual(response.status_code, 400, ids)
+
+        response = self.client.get(f"/issues/?ids={','.join(str(i) for i in range(1, 102))}")
+        self.assertEqual(response.status_code, 400)
+
+
+class TestCachedCount(APITestCase):
+
+    def setUp(self) -> None:
+
+        self.user = SoftdeskUser.objects.create_user(
+            username="user",
+            password="password",
+            age=27,
+        )
+
+        self.project = Project.objects.create(
+            description="project",
+            type="FRONT",
+            author=self.user
+        )
+
+        for i in range(15):
+            Issue.objects.create(
+                tag="BUG",
+                title=f"Issue {i}",
+                project=self.project,
+                author=self.user
+            )
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+
+    def count_queries(self, url) -> int:
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+
+        self.assertEqual(response.status_code, 200)
+
+        return len([query for query in context.captured_queries if "COUNT(" in query["sql"]])
+
+    def test_count_is_cached(self):
+
+        self.assertEqual(self.count_queries("/issues/"), 1)
+        self.assertEqual(self.count_queries("/issues/?page=2"), 0)
+
+        # other filters, other count
+        self.assertEqual(self.count_queries("/issues/?tag=BUG"), 1)
+
+        response = self.client.get("/issues/?page=2")
+        self.assertEqual(response.json()["count"], 15)
+        self.assertNotIn("count_is_estimate", response.json())
+
+    def test_count_is_invalidated(self):
+
+        self.assertEqual(self.client.get("/issues/").json()["count"], 15)
+
+        Issue.objects.create(tag="BUG", title="new", project=self.project, author=self.user)
+        self.assertEqual(self.client.get("/issues/").json()["count"], 16)
+
+        Issue.objects.filter(title="new").delete()
+        self.assertEqual(self.client.get("/issues/").json()["count"], 15)
+
+    @override_settings(PAGINATION_COUNT={"ESTIMATE_THRESHOLD": 12})
+    def test_exact_count_without_planner_estimate(self):
+
+        # SQLite has no row estimate: the count is exact, and cached
+        self.assertEqual(self.count_queries("/issues/"), 2)
+        self.assertEqual(self.count_queries("/issues/?page=2"), 0)
+
+        response = self.client.get("/issues/").json()
+
+        self.assertEqual(response["count"], 15)
+        self.assertNotIn("count_is_estimate", response)
+
+    @override_settings(PAGINATION_COUNT={"ESTIMATE_THRESHOLD": 12})
+    @patch("api.pagination.CachedCountPaginator.planner_estimate", return_value=14)
+    def test_estimated_count(self, planner_estimate):
+
+        response = self.client.get("/issues/").json()
+
+        self.assertTrue(response["count_is_estimate"])
+        self.assertEqual(response["count"], 14)
+        self.assertIsNotNone(response["next"])
+
+        # the last page is detected by reading one more row
+        response = self.client.get("/issues/?page=2").json()
+
+        self.assertEqual(len(response["results"]), 5)
+        self.assertIsNone(response["next"])
+
+        self.assertEqual(self.client.get("/issues/?page=3").status_code, 404)
+
+
+class TestThrottling(APITestCase):
+
+    def setUp(self) -> None:
+
+        self.user = SoftdeskUser.objects.create_user(
+            username="user",
+            password="password",
+            age=27,
+        )
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+
+        patcher = patch.object(throttling, "_buckets", MemoryBuckets())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @override_settings(THROTTLING={"RATES": {"issue.list": "2/min"}})
+    def test_token_bucket(self):
+
+        response = self.client.get("/issues/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-RateLimit-Limit"], "2")
+        self.assertEqual(response["X-RateLimit-Remaining"], "1")
+
+        self.assertEqual(self.client.get("/issues/").status_code, 200)
+
+        response = self.client.get("/issues/")
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["X-RateLimit-Remaining"], "0")
+        self.assertEqual(response["Retry-After"], "30")
+
+        # other endpoints have their own budget
+        response = self.client.get("/projects/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-RateLimit-Limit"], "600")
+
+    def test_refill(self):
+
+        buckets = MemoryBuckets()
+
+        self.assertEqual(buckets.take("key", 2, 1.0, now=0), 1)
+        self.assertEqual(buckets.take("key", 2, 1.0, now=0), 0)
+        self.assertLess(buckets.take("key", 2, 1.0, now=0.5), 0)
+        self.assertEqual(buckets.take("key", 2, 1.0, now=1), 0)
+
+    @skipIf(not hasattr(os, "fork"), "POSIX only")
+    def test_shared_memory_buckets(self):
+
+        name = f"softdesk-throttling-test-{os.getpid()}"
+        buckets = SharedMemoryBuckets(name, 64)
+
+        # unregistered from the resource tracker by SharedMemoryBuckets
+        self.addCleanup(buckets.memory.unlink)
+        self.addCleanup(resource_tracker.register, buckets.memory._name, "shared_memory")
+
+        self.assertEqual(buckets.take("key", 2, 1.0, now=0), 1)
+
+        # the state is shared with the other attached processes
+        other_buckets = SharedMemoryBuckets(name, 64)
+
+        self.assertEqual(other_buckets.take("key", 2, 1.0, now=0), 0)
+        self.assertLess(buckets.take("key", 2, 1.0, now=0), 0)
+        self.assertEqual(buckets.take("other", 2, 1.0, now=0), 1)
+
+
+class TestBatch(APITestCase):
+
+    def setUp(self) -> None:
+
+        self.user = SoftdeskUser.objects.create_user(username="user", password="password", age=27)
+        self.other_user = SoftdeskUser.objects.create_user(username="other_user", password="password", age=27)
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+
+    def test_dependent_operations(self):
+
+        operations = [
+            {"method": "POST", "path": "/projects/", "name": "project", "body": {
+                "description": "project", "type": "BACK", "author": self.user.pk
+            }},
+            {"method": "POST", "path": "/contributors/", "body": {
+                "project": "{{project.id}}", "user": self.other_user.pk
+            }},
+            {"method": "POST", "path": "/issues/", "body": {
+                "title": "issue", "tag": "BUG", "project": "{{project.id}}", "author": self.user.pk
+            }},
+            {"method": "POST", "path": "/comments/", "body": {
+                "description": "comment on {{2.title}}", "issue": "{{2.id}}", "author": self.user.pk
+            }},
+            {"method": "GET", "path": "/issues/{{2.id}}/"},
+        ]
+
+        # authenticated once for the whole batch
+        with patch.object(JWTAuthentication, "get_user", autospec=True, side_effect=JWTAuthentication.get_user) as get_user:
+            response = self.client.post("/batch/", data={"operations": operations}, format="json")
+
+        self.assertEqual(get_user.call_count, 1)
+        self.assertEqual(response.status_code, 200, response.json())
+
+        results = response.json()["results"]
+
+        self.assertEqual([result["status"] for result in results], [201, 201, 201, 201, 200])
+        self.assertIsNone(response.json()["failed"])
+
+        project = Project.objects.get()
+        issue = Issue.objects.get()
+
+        self.assertTrue(Contributor.objects.filter(project=project, user=self.other_user).exists())
+        self.assertEqual(Comment.objects.get().description, "comment on issue")
+        self.assertEqual(results[4]["path"], f"/issues/{issue.pk}/")
+        self.assertEqual(results[4]["body"]["comment_count"], 1)
+
+    def test_atomic_batch_rolled_back(self):
+
+        operations = [
+            {"method": "POST", "path": "/projects/", "body": {"description": "project", "type": "BACK", "author": self.user.pk}},
+            {"method": "POST", "path": "/issues/", "body": {"title": "issue", "project": "{{0.id}}", "author": self.user.pk}},
+            {"method": "GET", "path": "/projects/"},
+        ]
+
+        response = self.client.post("/batch/", data={"operations": operations, "atomic": True}, format="json")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([result["status"] for result in response.json()["results"]], [201, 400])
+        self.assertEqual(response.json()["failed"], 1)
+        self.assertTrue(response.json()["rolled_back"])
+        self.assertFalse(Project.objects.exists())
+
+        # the rolled back project is not visible anymore
+        self.assertEqual(self.client.get("/projects/").json()["count"], 0)
+
+        response = self.client.post("/batch/", data={"operations": operations}, format="json")
+
+        self.assertEqual(response.json()["failed"], 1)
+        self.assertFalse(response.json()["rolled_back"])
+        self.assertTrue(Project.objects.exists())
+
+    def test_atomic_batch_raising_operation(self):
+
+        project = Project.objects.create(description="project", type="BACK", author=self.user)
+
+        operations = [
+            {"method": "POST", "path": "/contributors/", "body": {"project": project.pk, "user": self.other_user.pk}},
+            {"method": "GET", "path": "/projects/"},
+        ]
+
+        def failing_list(*args, **kwargs):
+            # reads the matrix, and its contributor of the transaction, before failing
+            roles.get_role(self.other_user.pk, project.pk)
+            raise RuntimeError("server error")
+
+        with patch("projects.views.ProjectViewSet.list", side_effect=failing_list):
+            with self.assertRaises(RuntimeError):
+                self.client.post("/batch/", data={"operations": operations, "atomic": True}, format="json")
+
+        self.assertFalse(Contributor.objects.filter(user=self.other_user).exists())
+        # the matrix read the contributor before the rollback
+        self.assertIsNone(roles.get_role(self.other_user.pk, project.pk))
+
+    def test_invalid_operations(self):
+
+        with override_settings(BATCH={"MAX_OPERATIONS": 2}):
+            response = self.client.post("/batch/", data={"operations": [{"method": "GET", "path": "/projects/"}] * 3}, format="json")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("operations", response.json())
+
+        response = self.client.post("/batch/", data={"operations": [{"method": "TRACE", "path": "/projects/"}]}, format="json")
+        self.assertEqual(response.status_code, 400)
+
+        for path, status in [("/unknown/", 404), ("/batch/", 400), ("/events/", 400), ("/issues/{{3.id}}/", 400)]:
+
+            response = self.client.post("/batch/", data={"operations": [{"method": "GET", "path": path}]}, format="json")
+
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()["results"][0]["status"], status, path)
+
+        # the permissions of each endpoint apply
+        project = Project.objects.create(description="project", type="BACK", author=self.other_user)
+
+        response = self.client.post("/batch/", data={"operations": [{"method": "GET", "path": f"/projects/{project.pk}/"}]}, format="json")
+        self.assertIn(response.json()["results"][0]["status"], (403, 404))
+
+        self.client.credentials()
+        self.assertEqual(self.client.post("/batch/", data={"operations": []}, format="json").status_code, 401)
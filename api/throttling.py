@@ -0,0 +1,213 @@
+import hashlib
+import os
+import struct
+import tempfile
+import threading
+import time
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.throttling import BaseThrottle
+
+DEFAULTS = {
+    # budget of the endpoints without their own rate, None to disable the throttling
+    'DEFAULT_RATE': '600/min',
+    # budgets per endpoint, keyed by "<viewset basename>.<action>" or by view class name
+    'RATES': {},
+    # "memory": buckets of the current process, "shared_memory": buckets shared by the workers of the host
+    'BACKEND': 'memory',
+    # name and number of slots of the shared memory segment
+    'SHARED_MEMORY_NAME': 'softdesk-throttling',
+    'SHARED_MEMORY_SLOTS': 65536,
+    # the idle full buckets are dropped above this number of buckets in memory
+    'MAX_BUCKETS': 100000,
+}
+
+PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def get_setting(name):
+    return getattr(settings, 'THROTTLING', {}).get(name, DEFAULTS[name])
+
+
+def parse_rate(rate: str):
+    """
+    "<requests>/<period>" to the bucket capacity and its refill rate, in tokens per second
+    """
+
+    count, period = rate.split("/")
+
+    return int(count), int(count) / PERIODS[period[0]]
+
+
+class MemoryBuckets:
+    """
+    Token buckets of the current process: key -> (tokens, last update, time when full)
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.buckets = {}
+
+    def take(self, key: str, capacity: int, refill_rate: float, now: float) -> float:
+        """
+        Take one token if any, and return the tokens left: negative when the request is refused
+        """
+
+        with self.lock:
+
+            tokens = self.refill(self.buckets.get(key), capacity, refill_rate, now) - 1
+
+            if tokens >= 0:
+                self.buckets[key] = (tokens, now, now + (capacity - tokens) / refill_rate)
+
+            if len(self.buckets) > get_setting('MAX_BUCKETS'):
+                self.prune(now)
+
+        return tokens
+
+    @staticmethod
+    def refill(bucket, capacity: int, refill_rate: float, now: float) -> float:
+
+        if bucket is None:
+            return capacity
+
+        return min(capacity, bucket[0] + (now - bucket[1]) * refill_rate)
+
+    def prune(self, now: float):
+
+        self.buckets = {key: bucket for key, bucket in self.buckets.items() if bucket[2] > now}
+
+
+class SharedMemoryBuckets:
+    """
+    Token buckets shared by the processes of the host, in a fixed size shared memory table.
+
+    Each slot holds the hash of its key, the tokens and the last update time. A key whose slot is taken by
+    another key starts a full bucket over it, which only makes the limit more lenient. Updates are serialized
+    by an exclusive lock on a file next to the segment.
+    """
+
+    SLOT = struct.Struct("Qdd")
+
+    def __init__(self, name: str, slots: int):
+
+        try:
+            import fcntl
+            from multiprocessing import resource_tracker, shared_memory
+        except ImportError:  # pragma: no cover
+            raise ImproperlyConfigured("the shared_memory throttling backend needs a POSIX system")
+
+        self.fcntl = fcntl
+        self.slots = slots
+        self.thread_lock = threading.Lock()
+
+        try:
+            self.memory = shared_memory.SharedMemory(name=name, create=True, size=slots * self.SLOT.size)
+        except FileExistsError:
+            self.memory = shared_memory.SharedMemory(name=name)
+
+        # the segment outlives the worker which created it
+        resource_tracker.unregister(self.memory._name, "shared_memory")
+
+        self.lock_file = os.open(os.path.join(tempfile.gettempdir(), f"{name}.lock"), os.O_RDWR | os.O_CREAT)
+
+    def take(self, key: str, capacity: int, refill_rate: float, now: float) -> float:
+
+        key_hash = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little")
+        offset = (key_hash % self.slots) * self.SLOT.size
+
+        with self.thread_lock:
+
+            self.fcntl.flock(self.lock_file, self.fcntl.LOCK_EX)
+
+            try:
+                slot_hash, tokens, updated = self.SLOT.unpack_from(self.memory.buf, offset)
+
+                if slot_hash != key_hash:
+                    tokens = capacity
+                else:
+                    tokens = min(capacity, tokens + (now - updated) * refill_rate)
+
+                tokens -= 1
+
+                if tokens >= 0:
+                    self.SLOT.pack_into(self.memory.buf, offset, key_hash, tokens, now)
+
+            finally:
+                self.fcntl.flock(self.lock_file, self.fcntl.LOCK_UN)
+
+        return tokens
+
+
+_buckets = None
+_buckets_lock = threading.Lock()
+
+
+def get_buckets():
+
+    global _buckets
+
+    if _buckets is None:
+
+        with _buckets_lock:
+
+            if _buckets is None:
+
+                backend = get_setting('BACKEND')
+
+                if backend == 'memory':
+                    _buckets = MemoryBuckets()
+                elif backend == 'shared_memory':
+                    _buckets = SharedMemoryBuckets(get_setting('SHARED_MEMORY_NAME'), get_setting('SHARED_MEMORY_SLOTS'))
+                else:
+                    raise ImproperlyConfigured(f"unknown throttling backend: {backend}")
+
+    return _buckets
+
+
+def get_endpoint(view) -> str:
+
+    basename = getattr(view, "basename", None)
+
+    if basename is None:
+        return view.__class__.__name__
+
+    return f"{basename}.{view.action}"
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Per user and per endpoint token bucket: a client can burst up to the whole budget, then is limited to its
+    refill rate. The anonymous requests are limited per client address.
+
+    The state of the bucket is returned in the X-RateLimit-* headers of every throttled endpoint.
+    """
+
+    def allow_request(self, request, view):
+
+        endpoint = get_endpoint(view)
+        rate = get_setting('RATES').get(endpoint, get_setting('DEFAULT_RATE'))
+
+        if rate is None:
+            return True
+
+        capacity, refill_rate = parse_rate(rate)
+
+        if request.user and request.user.is_authenticated:
+            ident = f"user:{request.user.pk}"
+        else:
+            ident = f"address:{self.get_ident(request)}"
+
+        tokens = get_buckets().take(f"{ident}:{endpoint}", capacity, refill_rate, time.monotonic())
+
+        # seconds until the next token, or until the bucket is full again
+        self.wait_time = (-tokens) / refill_rate if tokens < 0 else None
+
+        view.headers["X-RateLimit-Limit"] = str(capacity)
+        view.headers["X-RateLimit-Remaining"] = str(max(int(tokens), 0))
+        view.headers["X-RateLimit-Reset"] = str(int((capacity - max(tokens, 0)) / refill_rate + 0.999))
+
+        return tokens >= 0
+
+    def wait(self):
+        return self.wait_time
@@ -0,0 +1,20 @@
+import time
+from django.core.management.base import BaseCommand
+from deletion.worker import run_pending_jobs
+
+
+class Command(BaseCommand):
+    help = "Process the scheduled project and user deletions, by bounded chunks"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="keep polling for new jobs")
+        parser.add_argument("--interval", type=float, default=5, help="seconds between two polls")
+
+    def handle(self, *args, **options):
+
+        # the jobs left running by a dead worker are resumed: chunked deletes are idempotent
+        run_pending_jobs(resume=True)
+
+        while options["loop"]:
+            time.sleep(options["interval"])
+            run_pending_jobs()
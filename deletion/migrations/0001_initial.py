@@ -0,0 +1,31 @@
+# Generated by Django 4.2.30 on 2026-10-19 12:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeletionJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resource', models.CharField(choices=[('PROJECT', 'project'), ('USER', 'user')], max_length=10)),
+                ('resource_id', models.BigIntegerField()),
+                ('requested_by', models.BigIntegerField()),
+                ('state', models.CharField(choices=[('PENDING', 'pending'), ('RUNNING', 'running'), ('DONE', 'done'), ('FAILED', 'failed')], default='PENDING', max_length=10)),
+                ('total_count', models.IntegerField(default=0)),
+                ('deleted_count', models.IntegerField(default=0)),
+                ('created_time', models.DateTimeField(auto_now_add=True)),
+                ('updated_time', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['state', 'created_time'], name='deletionjob_state_created_idx')],
+            },
+        ),
+    ]
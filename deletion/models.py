@@ -0,0 +1,55 @@
+from django.utils.translation import gettext_lazy as _
+from django.db import models
+
+
+class DeletionJob(models.Model):
+    """
+    Background deletion of a project or a user, processed in bounded chunks by deletion.worker
+    """
+
+    class ResourceType(models.TextChoices):
+        PROJECT = "PROJECT", _("project")
+        USER = "USER", _("user")
+
+    class JobState(models.TextChoices):
+        PENDING = "PENDING", _("pending")
+        RUNNING = "RUNNING", _("running")
+        DONE = "DONE", _("done")
+        FAILED = "FAILED", _("failed")
+
+    resource = models.CharField(
+        max_length=10,
+        choices=ResourceType.choices
+    )
+
+    # plain ids: the referenced rows are deleted by the job
+    resource_id = models.BigIntegerField()
+
+    requested_by = models.BigIntegerField()
+
+    state = models.CharField(
+        max_length=10,
+        choices=JobState.choices,
+        default=JobState.PENDING
+    )
+
+    total_count = models.IntegerField(
+        default=0
+    )
+
+    deleted_count = models.IntegerField(
+        default=0
+    )
+
+    created_time = models.DateTimeField(
+        auto_now_add=True
+    )
+
+    updated_time = models.DateTimeField(
+        auto_now=True
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["state", "created_time"], name="deletionjob_state_created_idx"),
+        ]
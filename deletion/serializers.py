@@ -0,0 +1,9 @@
+from rest_framework import serializers
+from deletion.models import DeletionJob
+
+
+class DeletionJobSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = DeletionJob
+        fields = "__all__"
@@ -0,0 +1,118 @@
+from django.test import override_settings
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+from user.models import SoftdeskUser
+from projects.models import Project, Contributor
+from issues.models import Issue, Comment
+from sync.models import Tombstone
+from deletion.models import DeletionJob
+from deletion.worker import run_pending_jobs
+
+
+@override_settings(DELETION={'CHUNK_SIZE': 2, 'IN_PROCESS_WORKER': False})
+class TestDeletion(APITestCase):
+
+    def setUp(self) -> None:
+
+        self.project_author = SoftdeskUser.objects.create_user(
+            username="project_author",
+            password="password",
+            age=27,
+        )
+
+        self.project_contributor = SoftdeskUser.objects.create_user(
+            username="project_contributor",
+            password="password",
+            age=27,
+        )
+
+        self.project = Project.objects.create(
+            description="project",
+            type="FRONT",
+            author=self.project_author
+        )
+
+        Contributor.objects.create(
+            project=self.project,
+            user=self.project_contributor
+        )
+
+        for i in range(3):
+            issue = Issue.objects.create(
+                tag="BUG",
+                title=f"issue{i}",
+                project=self.project,
+                author=self.project_contributor
+            )
+
+            for j in range(2):
+                Comment.objects.create(
+                    issue=issue,
+                    author=self.project_author,
+                    description=f"comment{j}"
+                )
+
+    def authenticate(self, user):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+
+    def test_async_project_deletion(self):
+
+        self.authenticate(self.project_author)
+
+        response = self.client.delete(f"/projects/{self.project.pk}/?async=true")
+
+        self.assertEqual(response.status_code, 202, response.json())
+        self.assertEqual(response.json()["state"], "PENDING")
+
+        # the project is hidden immediately
+        self.assertEqual(self.client.get(f"/projects/{self.project.pk}/").status_code, 404)
+        self.assertEqual(self.client.get("/issues/").json()["count"], 0)
+        self.assertTrue(Project.objects.filter(pk=self.project.pk).exists())
+
+        run_pending_jobs()
+
+        job = self.client.get(f"/deletions/{response.json()['id']}/").json()
+
+        self.assertEqual(job["state"], "DONE")
+        self.assertEqual(job["deleted_count"], 6 + 3 + 2 + 1)
+        self.assertEqual(job["total_count"], job["deleted_count"])
+
+        self.assertFalse(Project.objects.exists())
+        self.assertFalse(Issue.objects.exists())
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(Contributor.objects.exists())
+
+        # the content is implied by the project tombstone
+        self.assertEqual(Tombstone.objects.filter(resource="PROJECT").count(), 1)
+        self.assertFalse(Tombstone.objects.filter(resource__in=["ISSUE", "COMMENT"]).exists())
+
+    def test_async_project_deletion_from_non_author(self):
+
+        self.authenticate(self.project_contributor)
+
+        response = self.client.delete(f"/projects/{self.project.pk}/?async=true")
+
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(DeletionJob.objects.exists())
+
+    def test_async_user_deletion(self):
+
+        self.authenticate(self.project_contributor)
+
+        response = self.client.delete(f"/users/{self.project_contributor.pk}/?async=true")
+
+        self.assertEqual(response.status_code, 202, response.json())
+
+        # the user is deactivated immediately
+        self.authenticate(self.project_author)
+        self.assertEqual(self.client.get(f"/users/{self.project_contributor.pk}/").status_code, 404)
+
+        run_pending_jobs()
+
+        job = DeletionJob.objects.get()
+
+        self.assertEqual(job.state, DeletionJob.JobState.DONE)
+        self.assertFalse(SoftdeskUser.objects.filter(pk=self.project_contributor.pk).exists())
+        self.assertFalse(Issue.objects.exists())
+        self.assertFalse(Comment.objects.exists())
+        self.assertTrue(Project.objects.filter(pk=self.project.pk).exists())
@@ -0,0 +1,16 @@
+from rest_framework import viewsets, permissions
+from deletion.models import DeletionJob
+from deletion.serializers import DeletionJobSerializer
+
+
+class DeletionJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Progress of the background deletions requested by the user
+    """
+
+    queryset = DeletionJob.objects.all().order_by("created_time")
+    serializer_class = DeletionJobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return DeletionJob.objects.filter(requested_by=self.request.user.pk).order_by("created_time")
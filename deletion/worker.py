@@ -0,0 +1,228 @@
+import logging
+import threading
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from api.pagination import invalidate_counts
+from user.models import SoftdeskUser
+from projects.models import Project, Contributor
+from projects.roles import roles
+from issues.models import Issue, Comment, ArchivedIssue, ArchivedComment
+from deletion.models import DeletionJob
+from sharding.shards import get_shards
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    # rows deleted per transaction, keeps the write lock short
+    'CHUNK_SIZE': 500,
+    # process the jobs in a daemon thread as soon as they are scheduled,
+    # disable it when the `process_deletions` command runs as a dedicated worker
+    'IN_PROCESS_WORKER': True,
+}
+
+_worker_lock = threading.Lock()
+
+
+def get_setting(name):
+    return getattr(settings, 'DELETION', {}).get(name, DEFAULTS[name])
+
+
+def schedule_project_deletion(project: Project, requested_by) -> DeletionJob:
+    """
+    Hide the project immediately, and delete its content in background
+    """
+
+    with transaction.atomic():
+        # a concurrent save of the project, which would show it again, fails on its version, see api.models
+        Project.objects.filter(pk=project.pk).update(deletion_requested=True, version=F("version") + 1)
+        roles.invalidate(project.pk)
+        # the visible rows of all the resources depend on the contributions
+        transaction.on_commit(lambda: invalidate_counts(Contributor))
+
+        job = DeletionJob.objects.create(
+            resource=DeletionJob.ResourceType.PROJECT,
+            resource_id=project.pk,
+            requested_by=requested_by.pk
+        )
+
+        transaction.on_commit(start_worker)
+
+    return job
+
+
+def schedule_user_deletion(user: SoftdeskUser, requested_by) -> DeletionJob:
+    """
+    Deactivate the user and hide its projects immediately, and delete its content in background
+    """
+
+    with transaction.atomic():
+        SoftdeskUser.objects.filter(pk=user.pk).update(is_active=False)
+        Project.objects.filter(author_id=user.pk).update(deletion_requested=True, version=F("version") + 1)
+        roles.forget_user(user.pk)
+        transaction.on_commit(lambda: (invalidate_counts(SoftdeskUser), invalidate_counts(Contributor)))
+
+        job = DeletionJob.objects.create(
+            resource=DeletionJob.ResourceType.USER,
+            resource_id=user.pk,
+            requested_by=requested_by.pk
+        )
+
+        transaction.on_commit(start_worker)
+
+    return job
+
+
+def start_worker():
+    if get_setting('IN_PROCESS_WORKER'):
+        threading.Thread(target=_work, name="deletion-worker", daemon=True).start()
+
+
+def _work():
+    try:
+        run_pending_jobs()
+    finally:
+        connections.close_all()
+
+
+def run_pending_jobs(resume: bool = False):
+    """
+    Process the pending jobs until none is left; with `resume`, also restart the jobs left running by a dead worker
+    """
+
+    states = [DeletionJob.JobState.PENDING]
+
+    if resume:
+        states.append(DeletionJob.JobState.RUNNING)
+
+    # a single worker per process, the writes of concurrent workers would only contend on the database lock
+    while _worker_lock.acquire(blocking=False):
+
+        try:
+            while (job := claim_next_job(states)) is not None:
+                run_job(job)
+
+        finally:
+            _worker_lock.release()
+
+        # a job may have been scheduled while the lock was being released
+        if not DeletionJob.objects.filter(state=DeletionJob.JobState.PENDING).exists():
+            break
+
+
+def claim_next_job(states) -> DeletionJob:
+
+    for job in DeletionJob.objects.filter(state__in=states).order_by("created_time"):
+
+        claimed = DeletionJob.objects.filter(pk=job.pk, state=job.state).update(state=DeletionJob.JobState.RUNNING)
+
+        if claimed:
+            job.refresh_from_db()
+            return job
+
+    return None
+
+
+def project_steps(project_id):
+    """
+    Querysets to delete, in dependency order, and whether they can be deleted without signals.
+
+    The issues and comments of a deleted project are implied by its tombstone (see sync.signals), so they
+    are deleted raw: no object collection, no per row signal. The contributors still send their signals,
+    this is how the former contributors learn that they lost access to the project. Filtered on the project,
+    the querysets read the shard of the project (see sharding.query).
+    """
+
+    return [
+        (Comment.objects.filter(project_id=project_id), True),
+        (Issue.objects.filter(project_id=project_id), True),
+        (ArchivedComment.objects.filter(issue__project_id=project_id), True),
+        (ArchivedIssue.objects.filter(project_id=project_id), True),
+        (Contributor.objects.filter(project_id=project_id), False),
+        (Project.objects.filter(pk=project_id), False),
+    ]
+
+
+def user_steps(user_id):
+
+    steps = []
+
+    for project_id in Project.objects.filter(author_id=user_id).values_list("pk", flat=True):
+        steps += project_steps(project_id)
+
+    user_issues = Q(author_id=user_id) | Q(assigned_user_id=user_id)
+
+    # the rows of the user in the projects of others, on every shard
+    for shard in get_shards():
+
+        issues, archived_issues = Issue.objects.using(shard), ArchivedIssue.objects.using(shard)
+
+        steps += [
+            (Comment.objects.using(shard).filter(author_id=user_id), False),
+            (Comment.objects.using(shard).filter(issue__in=issues.filter(user_issues)), False),
+            (issues.filter(user_issues), False),
+            (ArchivedComment.objects.using(shard).filter(author_id=user_id), False),
+            (ArchivedComment.objects.using(shard).filter(issue__in=archived_issues.filter(user_issues)), False),
+            (archived_issues.filter(user_issues), False),
+            (Contributor.objects.using(shard).filter(user_id=user_id), False),
+        ]
+
+    return steps + [
+        (SoftdeskUser.objects.filter(pk=user_id), False),
+    ]
+
+
+def run_job(job: DeletionJob):
+
+    if job.resource == DeletionJob.ResourceType.PROJECT:
+        steps = project_steps(job.resource_id)
+    else:
+        steps = user_steps(job.resource_id)
+
+    try:
+        DeletionJob.objects.filter(pk=job.pk).update(
+            total_count=F("deleted_count") + sum(queryset.count() for queryset, _ in steps),
+            updated_time=timezone.now()
+        )
+
+        for queryset, raw in steps:
+            delete_in_chunks(job, queryset, raw)
+
+    except Exception:
+        logger.exception("deletion job %s failed", job.pk)
+        DeletionJob.objects.filter(pk=job.pk).update(state=DeletionJob.JobState.FAILED, updated_time=timezone.now())
+
+    else:
+        DeletionJob.objects.filter(pk=job.pk).update(state=DeletionJob.JobState.DONE, updated_time=timezone.now())
+
+
+def delete_in_chunks(job: DeletionJob, queryset, raw: bool):
+    """
+    Delete the queryset rows by chunks, each chunk in its own short transaction, and report the progress
+    """
+
+    chunk_size = get_setting('CHUNK_SIZE')
+
+    while True:
+
+        # on the database of the queryset, the shard of its project for the project scoped rows
+        with transaction.atomic(using=queryset.db):
+
+            pks = list(queryset.values_list("pk", flat=True)[:chunk_size])
+
+            if not pks:
+                return
+
+            chunk = queryset.model.objects.using(queryset.db).filter(pk__in=pks)
+
+            if raw:
+                chunk._raw_delete(chunk.db)
+                invalidate_counts(queryset.model)
+            else:
+                chunk.delete()
+
+            DeletionJob.objects.filter(pk=job.pk).update(
+                deleted_count=F("deleted_count") + len(pks),
+                updated_time=timezone.now()
+            )
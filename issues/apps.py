@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class IssuesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'issues'
+
+    def ready(self):
+        # keep the activity counters of the issues and projects up to date
+        from issues import signals  # noqa: F401
@@ -0,0 +1,118 @@
+from collections import Counter
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from api.pagination import invalidate_counts
+from issues.models import Issue, Comment, ArchivedIssue, ArchivedComment
+from projects.models import Project
+from sharding.shards import get_shards
+
+DEFAULTS = {
+    # released issues untouched for longer than this are archived
+    'RELEASED_AGE': timedelta(days=90),
+    'COMPRESS': True,
+    # issues moved per transaction, with all their comments
+    'CHUNK_SIZE': 200,
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'ARCHIVE', {}).get(name, DEFAULTS[name])
+
+
+def archivable_issues(age: timedelta = None, using: str = None):
+    """
+    Released issues older than the given age (created_time is refreshed on each save), of one shard
+    """
+
+    cutoff = timezone.now() - (age or get_setting('RELEASED_AGE'))
+
+    return Issue.objects.using(using).filter(state=Issue.IssueState.RELEASED, created_time__lt=cutoff)
+
+
+def archive_released_issues(age: timedelta = None, compress: bool = None, chunk_size: int = None) -> int:
+    """
+    Move the archivable issues, along with their comments, to the archive tables. Return the number of archived issues
+    """
+
+    compress = get_setting('COMPRESS') if compress is None else compress
+    chunk_size = chunk_size or get_setting('CHUNK_SIZE')
+
+    archived = 0
+
+    # the archive of an issue lives on the shard of its project, like the issue
+    for shard in get_shards():
+
+        while True:
+
+            with transaction.atomic(using=shard):
+
+                issues = list(archivable_issues(age, using=shard).order_by("pk")[:chunk_size])
+
+                if not issues:
+                    break
+
+                archive_chunk(issues, compress, shard)
+
+            archived += len(issues)
+
+    return archived
+
+
+def archive_chunk(issues, compress: bool, using: str = None):
+
+    issue_ids = [issue.pk for issue in issues]
+    comments = Comment.objects.using(using).filter(issue_id__in=issue_ids)
+
+    archived_issues = []
+
+    for issue in issues:
+        archived_issue = ArchivedIssue(
+            id=issue.pk,
+            version=issue.version,
+            created_time=issue.created_time,
+            tag=issue.tag,
+            state=issue.state,
+            title=issue.title,
+            priority=issue.priority,
+            project_id=issue.project_id,
+            author_id=issue.author_id,
+            assigned_user_id=issue.assigned_user_id,
+            comment_count=issue.comment_count,
+            last_activity=issue.last_activity,
+        )
+        archived_issue.set_description(issue.description, compress)
+        archived_issues.append(archived_issue)
+
+    archived_comments = []
+
+    for comment in comments:
+        archived_comment = ArchivedComment(
+            id=comment.pk,
+            version=comment.version,
+            issue_id=comment.issue_id,
+            project_id=comment.project_id,
+            author_id=comment.author_id,
+            created_time=comment.created_time,
+        )
+        archived_comment.set_description(comment.description, compress)
+        archived_comments.append(archived_comment)
+
+    ArchivedIssue.objects.using(using).bulk_create(archived_issues)
+    ArchivedComment.objects.using(using).bulk_create(archived_comments)
+
+    # raw deletes: archived rows are not deleted for the clients, they only leave the hot tables
+    comments._raw_delete(comments.db)
+
+    issues = Issue.objects.using(using).filter(pk__in=issue_ids)
+    issues._raw_delete(issues.db)
+
+    # the archived issues leave the issue counters of their projects
+    for project_id, count in Counter(issue.project_id for issue in archived_issues).items():
+        Project.objects.filter(pk=project_id).update(issue_count=Greatest(F("issue_count") - count, 0))
+
+    # no delete signal is sent by the raw deletes
+    transaction.on_commit(lambda: (invalidate_counts(Issue), invalidate_counts(Comment)), using=using)
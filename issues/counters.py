@@ -0,0 +1,126 @@
+from functools import partial
+from django.db import transaction
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+from django.conf import settings
+from projects.models import Project
+from issues.models import Issue, Comment
+from sharding.shards import get_shards, group_by_shard, is_enabled
+
+DEFAULTS = {
+    # rows recomputed per transaction
+    'CHUNK_SIZE': 1000,
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'COUNTERS', {}).get(name, DEFAULTS[name])
+
+
+def aggregate(queryset, outer_field: str, function):
+    """
+    Correlated subquery of a single aggregate over the rows pointing to the outer row
+    """
+
+    return Subquery(
+        queryset.filter(**{outer_field: OuterRef("pk")}).order_by().values(outer_field).annotate(
+            value=function
+        ).values("value")
+    )
+
+
+def issue_counters() -> dict:
+    """
+    Counters of an issue, computed from its comments: the last activity is its last save, or the one of its
+    last comment
+    """
+
+    last_comment = aggregate(Comment.objects.all(), "issue", Max("created_time"))
+
+    return {
+        "comment_count": Coalesce(aggregate(Comment.objects.all(), "issue", Count("pk")), 0),
+        "last_activity": Greatest("created_time", Coalesce(last_comment, "created_time")),
+    }
+
+
+def project_counters() -> dict:
+    """
+    Counters of a project, computed from its issues: to be repaired after the ones of the issues
+    """
+
+    return {
+        "issue_count": Coalesce(aggregate(Issue.objects.all(), "project", Count("pk")), 0),
+        "last_activity": aggregate(Issue.objects.all(), "project", Max("last_activity")),
+    }
+
+
+def update_counters(counters, chunk) -> int:
+    return chunk.update(**counters())
+
+
+def update_sharded_project_counters(chunk) -> int:
+    """
+    Recompute the counters of the projects from the shards of their issues, which the primary can not join
+    """
+
+    projects = list(chunk)
+    counters = {}
+
+    for shard, project_ids in group_by_shard([project.pk for project in projects]).items():
+
+        counters.update(
+            (project_id, (count, last_activity))
+            for project_id, count, last_activity in Issue.objects.using(shard).filter(
+                project_id__in=project_ids
+            ).order_by().values("project_id").annotate(
+                count=Count("pk"), last_activity=Max("last_activity")
+            ).values_list("project_id", "count", "last_activity")
+        )
+
+    for project in projects:
+        project.issue_count, project.last_activity = counters.get(project.pk, (0, None))
+
+    return Project.objects.bulk_update(projects, ["issue_count", "last_activity"])
+
+
+def repair_in_chunks(model, repair, chunk_size: int, using: str = None) -> int:
+    """
+    Recompute the counters of the model rows by primary key ranges, each range in its own short transaction,
+    with `repair(chunk)`. Return the number of updated rows
+    """
+
+    queryset = model.objects.using(using).order_by("pk")
+    repaired = 0
+    last_pk = 0
+
+    while True:
+
+        with transaction.atomic(using=queryset.db):
+
+            pks = list(queryset.filter(pk__gt=last_pk).values_list("pk", flat=True)[:chunk_size])
+
+            if not pks:
+                return repaired
+
+            repaired += repair(queryset.filter(pk__gte=pks[0], pk__lte=pks[-1]))
+
+        last_pk = pks[-1]
+
+
+def repair_counters(chunk_size: int = None) -> dict:
+    """
+    Recompute the activity counters of all the issues, shard by shard, then of all the projects
+    """
+
+    chunk_size = chunk_size or get_setting('CHUNK_SIZE')
+
+    issues = sum(
+        repair_in_chunks(Issue, partial(update_counters, issue_counters), chunk_size, shard) for shard in get_shards()
+    )
+
+    if is_enabled():
+        projects = repair_in_chunks(Project, update_sharded_project_counters, chunk_size)
+    else:
+        projects = repair_in_chunks(Project, partial(update_counters, project_counters), chunk_size)
+
+    return {"issues": issues, "projects": projects}
@@ -0,0 +1,20 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from issues.archive import archive_released_issues
+
+
+class Command(BaseCommand):
+    help = "Move the old released issues, and their comments, to the archive tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, help="age of the released issues to archive (default: ARCHIVE['RELEASED_AGE'])")
+        parser.add_argument("--compress", action="store_true", default=None, help="compress the archived descriptions")
+        parser.add_argument("--no-compress", action="store_false", dest="compress")
+
+    def handle(self, *args, **options):
+
+        age = timedelta(days=options["days"]) if options["days"] is not None else None
+
+        archived = archive_released_issues(age=age, compress=options["compress"])
+
+        self.stdout.write(f"{archived} issues archived")
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from issues.counters import repair_counters
+
+
+class Command(BaseCommand):
+    help = "Recompute the activity counters of the issues and projects from their rows"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, help="rows recomputed per transaction (default: COUNTERS['CHUNK_SIZE'])")
+
+    def handle(self, *args, **options):
+
+        repaired = repair_counters(chunk_size=options["chunk_size"])
+
+        self.stdout.write(f"{repaired['issues']} issues and {repaired['projects']} projects repaired")
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-19 12:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('issues', '0002_comment'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['issue', 'created_time'], name='comment_issue_created_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-19 12:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('issues', '0003_comment_issue_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='issue',
+            index=models.Index(fields=['project', 'created_time'], name='issue_project_created_idx'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 4.2.30 on 2026-10-19 12:32
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0007_project_deletion_requested'),
+        ('user', '0001_initial'),
+        ('issues', '0004_issue_project_created_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedIssue',
+            fields=[
+                ('description', models.CharField(default='', max_length=2000)),
+                ('compressed_description', models.BinaryField(null=True)),
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('created_time', models.DateTimeField()),
+                ('tag', models.CharField(choices=[('BUG', 'bug'), ('TASK', 'task'), ('FEATURE', 'feature')], max_length=10)),
+                ('state', models.CharField(choices=[('TODO', 'todo'), ('INWORK', 'in_work'), ('RELEASED', 'released')], max_length=10)),
+                ('title', models.CharField(max_length=100)),
+                ('priority', models.CharField(choices=[('LOW', 'low'), ('MEDIUM', 'medium'), ('HIGH', 'high')], max_length=10)),
+                ('assigned_user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='archived_issue_assigned_user', to='user.softdeskuser')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_issue_author', to='user.softdeskuser')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='projects.project')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedComment',
+            fields=[
+                ('description', models.CharField(default='', max_length=2000)),
+                ('compressed_description', models.BinaryField(null=True)),
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('created_time', models.DateTimeField()),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='user.softdeskuser')),
+                ('issue', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='issues.archivedissue')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='archivedissue',
+            index=models.Index(fields=['project', 'created_time'], name='archivedissue_project_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedcomment',
+            index=models.Index(fields=['issue', 'created_time'], name='archivedcomment_issue_idx'),
+        ),
+    ]
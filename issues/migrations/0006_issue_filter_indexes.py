@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-19 12:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('issues', '0005_archived_issue_archived_comment'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='issue',
+            index=models.Index(fields=['project', 'state', 'created_time'], name='issue_project_state_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='issue',
+            index=models.Index(fields=['assigned_user', 'state', 'created_time'], name='issue_assigned_state_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='issue',
+            index=models.Index(fields=['author', 'created_time'], name='issue_author_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='issue',
+            index=models.Index(condition=models.Q(('state', 'RELEASED'), _negated=True), fields=['assigned_user', 'created_time'], name='issue_open_assigned_idx'),
+        ),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 4.2.30 on 2026-10-19 13:16
+
+from django.db import migrations, models
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+
+def backfill_counters(apps, schema_editor):
+    """
+    Same computation as issues.counters, at once: see `manage.py repair_counters` for the chunked one
+    """
+
+    Project = apps.get_model('projects', 'Project')
+    Issue = apps.get_model('issues', 'Issue')
+    Comment = apps.get_model('issues', 'Comment')
+
+    def aggregate(model, outer_field, function):
+        return Subquery(
+            model.objects.filter(**{outer_field: OuterRef("pk")}).order_by().values(outer_field).annotate(
+                value=function
+            ).values("value")
+        )
+
+    Issue.objects.update(
+        comment_count=Coalesce(aggregate(Comment, "issue", Count("pk")), 0),
+        last_activity=Greatest("created_time", Coalesce(aggregate(Comment, "issue", Max("created_time")), "created_time")),
+    )
+
+    Project.objects.update(
+        issue_count=Coalesce(aggregate(Issue, "project", Count("pk")), 0),
+        last_activity=aggregate(Issue, "project", Max("last_activity")),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('issues', '0006_issue_filter_indexes'),
+        ('projects', '0008_project_activity_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedissue',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='archivedissue',
+            name='last_activity',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AddField(
+            model_name='issue',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='issue',
+            name='last_activity',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AddIndex(
+            model_name='issue',
+            index=models.Index(fields=['project', 'last_activity'], name='issue_project_activity_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='issue',
+            index=models.Index(fields=['project', 'comment_count'], name='issue_project_comments_idx'),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.30 on 2026-10-19 14:02
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.db.models.deletion
+
+
+def copy_issue_projects(apps, schema_editor):
+
+    Issue = apps.get_model('issues', 'Issue')
+    Comment = apps.get_model('issues', 'Comment')
+
+    Comment.objects.update(project_id=Subquery(Issue.objects.filter(pk=OuterRef("issue_id")).values("project_id")))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0008_project_activity_counters'),
+        ('issues', '0007_activity_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='project',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, to='projects.project'),
+        ),
+        migrations.RunPython(copy_issue_projects, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='comment',
+            name='project',
+            field=models.ForeignKey(editable=False, on_delete=django.db.models.deletion.CASCADE, to='projects.project'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['project', 'created_time'], name='comment_project_created_idx'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 4.2.30 on 2026-10-19 13:45
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0001_initial'),
+        ('projects', '0008_project_activity_counters'),
+        ('issues', '0008_comment_project'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='archivedcomment',
+            name='author',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to='user.softdeskuser'),
+        ),
+        migrations.AlterField(
+            model_name='archivedissue',
+            name='assigned_user',
+            field=models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='archived_issue_assigned_user', to='user.softdeskuser'),
+        ),
+        migrations.AlterField(
+            model_name='archivedissue',
+            name='author',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='archived_issue_author', to='user.softdeskuser'),
+        ),
+        migrations.AlterField(
+            model_name='archivedissue',
+            name='project',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to='projects.project'),
+        ),
+        migrations.AlterField(
+            model_name='comment',
+            name='author',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to='user.softdeskuser'),
+        ),
+        migrations.AlterField(
+            model_name='comment',
+            name='project',
+            field=models.ForeignKey(db_constraint=False, editable=False, on_delete=django.db.models.deletion.CASCADE, to='projects.project'),
+        ),
+        migrations.AlterField(
+            model_name='issue',
+            name='assigned_user',
+            field=models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='issue_assigned_user', to='user.softdeskuser'),
+        ),
+        migrations.AlterField(
+            model_name='issue',
+            name='author',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='issue_author', to='user.softdeskuser'),
+        ),
+        migrations.AlterField(
+            model_name='issue',
+            name='project',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to='projects.project'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.30 on 2026-10-19 14:50
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.db.models.deletion
+
+
+def copy_archived_issue_projects(apps, schema_editor):
+
+    ArchivedIssue = apps.get_model('issues', 'ArchivedIssue')
+    ArchivedComment = apps.get_model('issues', 'ArchivedComment')
+    database = schema_editor.connection.alias
+
+    ArchivedComment.objects.using(database).update(
+        project_id=Subquery(ArchivedIssue.objects.using(database).filter(pk=OuterRef("issue_id")).values("project_id"))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0010_version'),
+        ('issues', '0010_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedcomment',
+            name='project',
+            field=models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.CASCADE, to='projects.project'),
+        ),
+        migrations.RunPython(copy_archived_issue_projects, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='archivedcomment',
+            name='project',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to='projects.project'),
+        ),
+    ]
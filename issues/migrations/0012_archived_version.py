@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-19 14:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('issues', '0011_archivedcomment_project'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedcomment',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='archivedissue',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
@@ -1,10 +1,14 @@
+import zlib
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
-from django.db import models
-from projects.models import Project
+from django.db import models, router, transaction
+from projects.models import Project, saved_fields
 from user.models import SoftdeskUser
+from sharding.query import ShardedQuerySet
+from api.models import VersionedModel
 
 
-class Issue(models.Model):
+class Issue(VersionedModel):
 
     class IssueTag(models.TextChoices):
         BUG = "BUG", _("bug")
@@ -49,35 +53,109 @@ class Issue(models.Model):
         default=IssuePriority.LOW
     )
 
+    # the users and the projects live on the primary, the issues on the shard of their project
+    # (see sharding.shards): no database constraint across them
     project = models.ForeignKey(
         to=Project,
-        on_delete=models.CASCADE
+        on_delete=models.CASCADE,
+        db_constraint=False
     )
 
     author = models.ForeignKey(
         to=SoftdeskUser,
         on_delete=models.CASCADE,
-        related_name='issue_author'
+        related_name='issue_author',
+        db_constraint=False
     )
 
     assigned_user = models.ForeignKey(
         to=SoftdeskUser,
         on_delete=models.CASCADE,
         null=True,
-        related_name='issue_assigned_user'
+        related_name='issue_assigned_user',
+        db_constraint=False
+    )
+
+    # activity counters, kept up to date by issues.signals and repaired by `manage.py repair_counters`
+    comment_count = models.PositiveIntegerField(
+        default=0
     )
 
+    # last save of the issue or of one of its comments
+    last_activity = models.DateTimeField(
+        null=True
+    )
+
+    # the last activity is set by save() itself
+    counter_fields = ["comment_count"]
+
+    objects = ShardedQuerySet.as_manager()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+
+        issue = super().from_db(db, field_names, values)
+
+        # compared on save to notify the new assignees, see notifications.signals
+        issue.loaded_assigned_user_id = issue.__dict__.get("assigned_user_id")
+
+        return issue
+
+    def save(self, *args, **kwargs):
+        """
+        Override default save method, in order to update the activity counters in the same transaction
+        """
+
+        self.last_activity = timezone.now()
+
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = saved_fields(self, self.counter_fields)
+
+        if kwargs.get("update_fields") is not None:
+            kwargs["update_fields"] = {*kwargs["update_fields"], "last_activity"}
 
-class Comment(models.Model):
+        with transaction.atomic(using=kwargs.get("using") or router.db_for_write(Issue, instance=self)):
+            return super().save(*args, **kwargs)
+
+    class Meta:
+        indexes = [
+            # serves the project scoped issue listing, ordered by creation time
+            models.Index(fields=["project", "created_time"], name="issue_project_created_idx"),
+            # serves the triage boards, see IssueViewSet.filter_issues
+            models.Index(fields=["project", "state", "created_time"], name="issue_project_state_idx"),
+            models.Index(fields=["assigned_user", "state", "created_time"], name="issue_assigned_state_idx"),
+            models.Index(fields=["author", "created_time"], name="issue_author_created_idx"),
+            # serves the default "assigned to me" queue, see IssueViewSet.assigned
+            models.Index(
+                fields=["assigned_user", "created_time"],
+                condition=~models.Q(state="RELEASED"),
+                name="issue_open_assigned_idx"
+            ),
+            # serve the "most active" orderings of the project scoped listing
+            models.Index(fields=["project", "last_activity"], name="issue_project_activity_idx"),
+            models.Index(fields=["project", "comment_count"], name="issue_project_comments_idx"),
+        ]
+
+
+class Comment(VersionedModel):
 
     issue = models.ForeignKey(
         to=Issue,
         on_delete=models.CASCADE
     )
 
+    # project of the issue, copied on creation to read the project activity through an index, see projects.activity
+    project = models.ForeignKey(
+        to=Project,
+        on_delete=models.CASCADE,
+        editable=False,
+        db_constraint=False
+    )
+
     author = models.ForeignKey(
         to=SoftdeskUser,
-        on_delete=models.CASCADE
+        on_delete=models.CASCADE,
+        db_constraint=False
     )
 
     description = models.CharField(
@@ -87,3 +165,178 @@ class Comment(models.Model):
     created_time = models.DateTimeField(
         auto_now=True
     )
+
+    objects = ShardedQuerySet.as_manager()
+
+    def save(self, *args, **kwargs):
+        """
+        Override default save method, in order to update the activity counters in the same transaction
+        """
+
+        if self.project_id is None:
+            # the project of an issue can not be updated, see IssueSerializer.validate_project
+            self.project_id = self.issue.project_id
+
+        with transaction.atomic(using=kwargs.get("using") or router.db_for_write(Comment, instance=self)):
+            return super().save(*args, **kwargs)
+
+    class Meta:
+        indexes = [
+            # serves the issue scoped comment listing, ordered by creation time
+            models.Index(fields=["issue", "created_time"], name="comment_issue_created_idx"),
+            # serves the project activity timeline
+            models.Index(fields=["project", "created_time"], name="comment_project_created_idx"),
+        ]
+
+
+class ArchivedDescription(models.Model):
+    """
+    Description storage of the archived rows, optionally zlib compressed
+    """
+
+    description = models.CharField(
+        max_length=2000,
+        default=""
+    )
+
+    compressed_description = models.BinaryField(
+        null=True
+    )
+
+    @property
+    def full_description(self) -> str:
+
+        if self.compressed_description is not None:
+            return zlib.decompress(self.compressed_description).decode()
+
+        return self.description
+
+    def set_description(self, description: str, compress: bool):
+
+        if compress:
+            self.description = ""
+            self.compressed_description = zlib.compress(description.encode())
+
+        else:
+            self.description = description
+            self.compressed_description = None
+
+    class Meta:
+        abstract = True
+
+
+class ArchivedIssue(ArchivedDescription):
+    """
+    Released issue moved out of the hot tables, see issues.archive
+    """
+
+    # keeps the id of the original issue
+    id = models.BigIntegerField(
+        primary_key=True
+    )
+
+    # last version of the original issue, the archived rows are never written
+    version = models.PositiveIntegerField(
+        default=1
+    )
+
+    created_time = models.DateTimeField()
+
+    tag = models.CharField(
+        max_length=10,
+        choices=Issue.IssueTag.choices
+    )
+
+    state = models.CharField(
+        max_length=10,
+        choices=Issue.IssueState.choices
+    )
+
+    title = models.CharField(
+        max_length=100
+    )
+
+    priority = models.CharField(
+        max_length=10,
+        choices=Issue.IssuePriority.choices
+    )
+
+    project = models.ForeignKey(
+        to=Project,
+        on_delete=models.CASCADE,
+        db_constraint=False
+    )
+
+    author = models.ForeignKey(
+        to=SoftdeskUser,
+        on_delete=models.CASCADE,
+        related_name='archived_issue_author',
+        db_constraint=False
+    )
+
+    assigned_user = models.ForeignKey(
+        to=SoftdeskUser,
+        on_delete=models.CASCADE,
+        null=True,
+        related_name='archived_issue_assigned_user',
+        db_constraint=False
+    )
+
+    # activity counters at archival time
+    comment_count = models.PositiveIntegerField(
+        default=0
+    )
+
+    last_activity = models.DateTimeField(
+        null=True
+    )
+
+    objects = ShardedQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["project", "created_time"], name="archivedissue_project_idx"),
+        ]
+
+
+class ArchivedComment(ArchivedDescription):
+    """
+    Comment of an archived issue
+    """
+
+    # keeps the id of the original comment
+    id = models.BigIntegerField(
+        primary_key=True
+    )
+
+    # last version of the original comment
+    version = models.PositiveIntegerField(
+        default=1
+    )
+
+    issue = models.ForeignKey(
+        to=ArchivedIssue,
+        on_delete=models.CASCADE
+    )
+
+    # project of the issue, copied from the hot comment, see issues.archive
+    project = models.ForeignKey(
+        to=Project,
+        on_delete=models.CASCADE,
+        db_constraint=False
+    )
+
+    author = models.ForeignKey(
+        to=SoftdeskUser,
+        on_delete=models.CASCADE,
+        db_constraint=False
+    )
+
+    created_time = models.DateTimeField()
+
+    objects = ShardedQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["issue", "created_time"], name="archivedcomment_issue_idx"),
+        ]
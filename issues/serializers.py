@@ -1,6 +1,7 @@
-from issues.models import Issue, Comment
+from issues.models import Issue, Comment, ArchivedIssue, ArchivedComment
 from projects.models import Contributor
 from rest_framework import serializers
+from sharding.fields import ShardedPrimaryKeyRelatedField
 
 
 class IssueSerializer(serializers.ModelSerializer):
@@ -41,10 +42,14 @@ class IssueSerializer(serializers.ModelSerializer):
     class Meta:
         model = Issue
         fields = "__all__"
+        # kept up to date by issues.signals
+        read_only_fields = ["comment_count", "last_activity"]
 
 
 class CommentSerializer(serializers.ModelSerializer):
 
+    issue = ShardedPrimaryKeyRelatedField(queryset=Issue.objects.all())
+
     def validate_issue(self, value):
         if self.instance:
             raise serializers.ValidationError("the issue of a comment cant be modified")
@@ -60,3 +65,51 @@ class CommentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Comment
         fields = "__all__"
+
+
+class ArchivedIssueSerializer(serializers.ModelSerializer):
+    """
+    Read only, same representation as IssueSerializer
+    """
+
+    description = serializers.CharField(source="full_description", read_only=True)
+
+    class Meta:
+        model = ArchivedIssue
+        fields = [
+            'id',
+            'version',
+            'created_time',
+            'tag',
+            'state',
+            'title',
+            'description',
+            'priority',
+            'project',
+            'author',
+            'assigned_user',
+            'comment_count',
+            'last_activity'
+        ]
+        read_only_fields = fields
+
+
+class ArchivedCommentSerializer(serializers.ModelSerializer):
+    """
+    Read only, same representation as CommentSerializer
+    """
+
+    description = serializers.CharField(source="full_description", read_only=True)
+
+    class Meta:
+        model = ArchivedComment
+        fields = [
+            'id',
+            'version',
+            'description',
+            'created_time',
+            'issue',
+            'project',
+            'author'
+        ]
+        read_only_fields = fields
@@ -0,0 +1,68 @@
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from projects.models import Project
+from issues.models import Issue, Comment
+from sync.signals import deleted_through
+
+
+def decrement(field: str):
+    # the counters may be behind until repaired, never below zero
+    return Greatest(F(field) - 1, 0)
+
+
+@receiver(post_save, sender=Issue)
+def issue_saved(sender, instance: Issue, created, raw=False, **kwargs):
+    """
+    Runs in the transaction of Issue.save(), with last_activity set by it; the project lives on the primary,
+    outside of that transaction when the issue is on another shard
+    """
+
+    if raw:
+        # loaded fixtures carry their own counters
+        return
+
+    updates = {"last_activity": instance.last_activity}
+
+    if created:
+        updates["issue_count"] = F("issue_count") + 1
+
+    Project.objects.filter(pk=instance.project_id).update(**updates)
+
+
+@receiver(post_delete, sender=Issue)
+def issue_deleted(sender, instance: Issue, origin=None, **kwargs):
+
+    if deleted_through(origin, Project):
+        # the project is gone with its counters
+        return
+
+    Project.objects.filter(pk=instance.project_id).update(issue_count=decrement("issue_count"))
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance: Comment, created, raw=False, using=None, **kwargs):
+    """
+    Runs in the transaction of Comment.save(), on the shard of the comment (see sharding.shards)
+    """
+
+    if raw:
+        return
+
+    updates = {"last_activity": instance.created_time}
+
+    if created:
+        updates["comment_count"] = F("comment_count") + 1
+
+    Issue.objects.using(using).filter(pk=instance.issue_id).update(**updates)
+    Project.objects.filter(pk=instance.project_id).update(last_activity=instance.created_time)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance: Comment, origin=None, using=None, **kwargs):
+
+    if deleted_through(origin, Project, Issue):
+        return
+
+    Issue.objects.using(using).filter(pk=instance.issue_id).update(comment_count=decrement("comment_count"))
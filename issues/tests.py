@@ -1,5 +1,12 @@
+from datetime import timedelta
+from unittest.mock import patch
+from django.utils import timezone
 from rest_framework.test import APITestCase
-from issues.models import Issue, Comment
+from api.concurrency import VersionConflict
+from api.models import IdempotencyKey
+from issues.archive import archive_released_issues
+from issues.counters import repair_counters
+from issues.models import Issue, Comment, ArchivedIssue
 from user.models import SoftdeskUser
 from projects.models import Project, Contributor
 from settings import settings
@@ -75,6 +82,73 @@ class TestIssue(APITestCase):
         self.assertEqual(response.status_code, 201, response.json())
         self.assertEqual(Issue.objects.count(), 2)
 
+    def test_create_issue_idempotency(self):
+
+        self.authenticate(self.author)
+
+        data = {
+            "tag": "BUG",
+            "title": "fatal error",
+            "project": self.project.pk,
+            "author": self.author.pk,
+        }
+
+        response = self.client.post("/issues/", data=data, HTTP_IDEMPOTENCY_KEY="key")
+        self.assertEqual(response.status_code, 201, response.json())
+
+        # the retry gets the same response, without creating another issue
+        retry = self.client.post("/issues/", data=data, HTTP_IDEMPOTENCY_KEY="key")
+
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry.json(), response.json())
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(Issue.objects.count(), 2)
+
+        # the key can not be reused for another request
+        response = self.client.post("/issues/", data={**data, "title": "other"}, HTTP_IDEMPOTENCY_KEY="key")
+        self.assertEqual(response.status_code, 422)
+
+        # failed requests are not stored
+        response = self.client.post("/issues/", data={**data, "tag": "invalid"}, HTTP_IDEMPOTENCY_KEY="invalid")
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.post("/issues/", data=data, HTTP_IDEMPOTENCY_KEY="invalid")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Issue.objects.count(), 3)
+
+    def test_create_issue_idempotency_lease(self):
+
+        self.authenticate(self.author)
+
+        data = {
+            "tag": "BUG",
+            "title": "fatal error",
+            "project": self.project.pk,
+            "author": self.author.pk,
+        }
+
+        response = self.client.post("/issues/", data=data, HTTP_IDEMPOTENCY_KEY="key")
+        self.assertEqual(response.status_code, 201, response.json())
+
+        # the process died before storing the response
+        records = IdempotencyKey.objects.filter(key="key")
+        records.update(status_code=None, response=None, locked_until=timezone.now() + timedelta(seconds=60))
+
+        response = self.client.post("/issues/", data=data, HTTP_IDEMPOTENCY_KEY="key")
+        self.assertEqual(response.status_code, 409)
+
+        # a retry takes the key over once its lease is past
+        records.update(locked_until=timezone.now() - timedelta(seconds=1))
+
+        response = self.client.post("/issues/", data=data, HTTP_IDEMPOTENCY_KEY="key")
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn("Idempotent-Replayed", response)
+        self.assertEqual(Issue.objects.count(), 3)
+
+        retry = self.client.post("/issues/", data=data, HTTP_IDEMPOTENCY_KEY="key")
+        self.assertEqual(retry.json(), response.json())
+        self.assertEqual(Issue.objects.count(), 3)
+
     def test_create_multiple_issues_from_contributor(self):
 
         self.authenticate(self.non_author)
@@ -328,6 +402,96 @@ class TestIssue(APITestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.json()['title'], "TODO Issue", response.json())
 
+    def test_get_issue_single_query(self):
+
+        self.authenticate(self.author)
+
+        # read the project roles once
+        self.client.get("/issues/1/")
+
+        # the user authentication, then the issue with the id of its project
+        with self.assertNumQueries(2):
+            response = self.client.get("/issues/1/")
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_filter_issues(self):
+
+        Contributor.objects.create(
+            project=self.project,
+            user=self.non_author
+        )
+
+        Issue.objects.create(
+            tag="BUG",
+            title="BUG Issue",
+            state="INWORK",
+            priority="HIGH",
+            project=self.project,
+            author=self.author,
+            assigned_user=self.non_author
+        )
+
+        self.authenticate(self.author)
+
+        for query, count in [
+            ("state=INWORK", 1),
+            ("state=INWORK&priority=HIGH&tag=BUG", 1),
+            ("priority=LOW", 1),
+            (f"author={self.author.pk}", 2),
+            (f"assigned_user={self.non_author.pk}", 1),
+            ("created_after=2000-01-01T00:00:00Z", 2),
+            ("created_before=2000-01-01T00:00:00", 0),
+        ]:
+            response = self.client.get(f"/issues/?{query}")
+
+            self.assertEqual(response.status_code, 200, query)
+            self.assertEqual(response.json()["count"], count, query)
+
+        response = self.client.get("/issues/?ordering=-created_time")
+        self.assertEqual(response.json()["results"][0]["title"], "BUG Issue")
+
+        # the "most active" orderings are only index served within a project
+        for query in [
+            "ordering=title", "author=me", "created_after=yesterday", "ordering=-last_activity", "ordering=-comment_count"
+        ]:
+            response = self.client.get(f"/issues/?{query}")
+            self.assertEqual(response.status_code, 400, query)
+
+    def test_assigned_issues(self):
+
+        Contributor.objects.create(
+            project=self.project,
+            user=self.non_author
+        )
+
+        for state in ["TODO", "RELEASED"]:
+            Issue.objects.create(
+                tag="BUG",
+                title=f"{state} assigned Issue",
+                state=state,
+                project=self.project,
+                author=self.author,
+                assigned_user=self.non_author
+            )
+
+        self.authenticate(self.non_author)
+
+        # open issues only, by default
+        response = self.client.get("/issues/assigned/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["count"], 1)
+        self.assertEqual(response.json()["results"][0]["title"], "TODO assigned Issue")
+
+        response = self.client.get("/issues/assigned/?state=RELEASED")
+        self.assertEqual(response.json()["count"], 1)
+
+        self.authenticate(self.author)
+
+        response = self.client.get("/issues/assigned/")
+        self.assertEqual(response.json()["count"], 0)
+
     def test_get_issue_from_non_authorized(self):
 
         # retreive from non authenticated user
@@ -476,6 +640,83 @@ class TestIssue(APITestCase):
         self.assertEqual(updated_issue.author.pk, self.author.pk)
         self.assertEqual(updated_issue.project.pk, self.project.pk)
 
+    def test_update_issue_if_match(self):
+
+        self.authenticate(self.author)
+
+        response = self.client.get("/issues/1/")
+        self.assertEqual(response["ETag"], '"1"')
+
+        response = self.client.patch("/issues/1/", data={"state": "INWORK"}, HTTP_IF_MATCH='"1"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["ETag"], '"2"')
+        self.assertEqual(response.json()["version"], 2)
+
+        # a triager who read the first version
+        response = self.client.patch("/issues/1/", data={"state": "RELEASED"}, HTTP_IF_MATCH='"1"')
+        self.assertEqual(response.status_code, 412)
+        self.assertEqual(Issue.objects.get(pk=1).state, "INWORK")
+
+        response = self.client.patch("/issues/1/", data={"state": "RELEASED"}, HTTP_IF_MATCH='W/"2"')
+        self.assertEqual(response.status_code, 412)
+
+        response = self.client.patch("/issues/1/", data={"state": "RELEASED"}, HTTP_IF_MATCH='invalid')
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.patch("/issues/1/", data={"state": "RELEASED"}, HTTP_IF_MATCH='"1", "2"')
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(self.client.delete("/issues/1/", HTTP_IF_MATCH='"2"').status_code, 412)
+        self.assertEqual(self.client.delete("/issues/1/", HTTP_IF_MATCH='*').status_code, 204)
+
+    def test_concurrent_updates(self):
+
+        first, second = Issue.objects.get(pk=1), Issue.objects.get(pk=1)
+
+        first.state = "INWORK"
+        first.save()
+
+        second.state = "RELEASED"
+
+        with self.assertRaises(VersionConflict):
+            second.save()
+
+        self.assertEqual(Issue.objects.get(pk=1).state, "INWORK")
+        self.assertEqual(Issue.objects.get(pk=1).version, 2)
+
+        # the counters do not change the version
+        Comment.objects.create(issue=first, author=self.author, description="comment")
+        self.assertEqual(Issue.objects.get(pk=1).version, 2)
+
+        with self.assertRaises(VersionConflict):
+            second.claim_version()
+
+        # a stale save after a deletion does not create the issue again
+        first.delete()
+        second.title = "renamed"
+
+        with self.assertRaises(VersionConflict):
+            second.save()
+
+        self.assertFalse(Issue.objects.filter(pk=1).exists())
+
+    def test_update_deleted_issue(self):
+
+        self.authenticate(self.author)
+
+        # read by the PATCH, then deleted by a concurrent request before its save
+        original_save = Issue.save
+
+        def delete_then_save(issue, *args, **kwargs):
+            Issue.objects.filter(pk=issue.pk).delete()
+            return original_save(issue, *args, **kwargs)
+
+        with patch.object(Issue, "save", delete_then_save):
+            response = self.client.patch("/issues/1/", data={"state": "INWORK"})
+
+        self.assertEqual(response.status_code, 412)
+        self.assertFalse(Issue.objects.filter(pk=1).exists())
+
     # DELETE
     def test_delete_issue(self):
 
@@ -691,6 +932,21 @@ class TestComment(APITestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.json()['description'], "useless comment, for testing purpose...", response.json())
 
+    def test_get_comment_single_query(self):
+
+        self.authenticate(self.project_author)
+
+        # read the project roles once
+        self.client.get("/comments/1/")
+
+        # the user authentication, then the comment with the id of its project
+        with self.assertNumQueries(2) as context:
+            response = self.client.get("/comments/1/")
+
+        self.assertEqual(response.status_code, 200)
+        # the project is copied on the comment, without a join to its issue
+        self.assertNotIn("JOIN", context.captured_queries[-1]["sql"])
+
     def test_get_comment_from_project_contributor(self):
 
         self.authenticate(self.project_contributor)
@@ -725,6 +981,61 @@ class TestComment(APITestCase):
 
         self.assertEqual(response.status_code, 404)
 
+    def test_get_issue_comments(self):
+
+        other_issue = Issue.objects.create(
+            tag="BUG",
+            title="BUG Issue",
+            description="Issue description",
+            project=self.project,
+            author=self.project_author
+        )
+
+        Comment.objects.create(
+            issue=other_issue,
+            author=self.project_author,
+            description="comment on another issue"
+        )
+
+        self.authenticate(self.project_contributor)
+
+        # nested route
+        response = self.client.get(f"/issues/{self.issue.pk}/comments/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 1)
+        self.assertEqual(response.json()['results'][0]['issue'], self.issue.pk)
+
+        # query filter
+        response = self.client.get(f"/comments/?issue={other_issue.pk}")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 1)
+        self.assertEqual(response.json()['results'][0]['issue'], other_issue.pk)
+
+    def test_get_issue_comments_invalid_issue(self):
+
+        self.authenticate(self.project_contributor)
+
+        response = self.client.get("/comments/?issue=abc")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"issue": ["expected an integer"]})
+
+        response = self.client.get("/issues/abc/comments/")
+        self.assertEqual(response.status_code, 404)
+
+    def test_get_issue_comments_from_unauthorized_user(self):
+
+        self.authenticate(self.random_user)
+
+        response = self.client.get(f"/issues/{self.issue.pk}/comments/")
+        self.assertEqual(response.status_code, 404)
+
+        response = self.client.get(f"/comments/?issue={self.issue.pk}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 0)
+
     # UPDATE
     def test_update_comment(self):
 
@@ -807,6 +1118,92 @@ class TestComment(APITestCase):
         self.assertEqual(updated_comment.author.pk, self.project_author.pk)
 
     # DELETE
+    def test_activity_counters(self):
+
+        self.project.refresh_from_db()
+        self.issue.refresh_from_db()
+
+        self.assertEqual(self.project.issue_count, 1)
+        self.assertEqual(self.issue.comment_count, 1)
+        self.assertEqual(self.issue.last_activity, self.comment.created_time)
+        self.assertEqual(self.project.last_activity, self.comment.created_time)
+
+        self.authenticate(self.project_contributor)
+
+        response = self.client.post("/comments/", data={
+            "description": "new comment",
+            "issue": self.issue.pk,
+            "author": self.project_contributor.pk
+        })
+        self.assertEqual(response.status_code, 201)
+
+        response = self.client.get(f"/issues/{self.issue.pk}/")
+        self.assertEqual(response.json()["comment_count"], 2)
+
+        # the counters are read only
+        self.authenticate(self.project_author)
+        response = self.client.patch(f"/issues/{self.issue.pk}/", data={"comment_count": 10})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["comment_count"], 2)
+
+        self.client.delete(f"/comments/{self.comment.pk}/")
+        self.assertEqual(Issue.objects.get(pk=self.issue.pk).comment_count, 1)
+
+        self.client.delete(f"/issues/{self.issue.pk}/")
+        self.assertEqual(Project.objects.get(pk=self.project.pk).issue_count, 0)
+
+    def test_stale_save_keeps_counters(self):
+
+        issue = Issue.objects.get(pk=self.issue.pk)
+        project = Project.objects.get(pk=self.project.pk)
+
+        comment = Comment.objects.create(issue=self.issue, author=self.project_author, description="new comment")
+        Issue.objects.create(tag="BUG", title="other issue", project=self.project, author=self.project_author)
+
+        # saved after the counters were updated in place
+        issue.title = "renamed"
+        issue.save()
+        project.description = "renamed"
+        project.save()
+
+        issue.refresh_from_db()
+        project.refresh_from_db()
+
+        self.assertEqual(issue.title, "renamed")
+        self.assertEqual(issue.comment_count, 2)
+        self.assertEqual(project.description, "renamed")
+        self.assertEqual(project.issue_count, 2)
+        # from the last save of an issue
+        self.assertEqual(project.last_activity, issue.last_activity)
+        self.assertGreater(project.last_activity, comment.created_time)
+
+    def test_repair_counters(self):
+
+        Issue.objects.create(
+            tag="TODO",
+            title="other issue",
+            project=self.project,
+            author=self.project_author
+        )
+
+        expected = list(Issue.objects.order_by("pk").values_list("comment_count", "last_activity"))
+
+        Issue.objects.update(comment_count=7, last_activity=None)
+        Project.objects.update(issue_count=0, last_activity=None)
+
+        self.assertEqual(repair_counters(chunk_size=1), {"issues": 2, "projects": 1})
+
+        repaired = list(Issue.objects.order_by("pk").values_list("comment_count", "last_activity"))
+
+        # an issue last activity is its last save, which auto_now stamps a few microseconds apart
+        for (count, last_activity), (expected_count, expected_last_activity) in zip(repaired, expected):
+            self.assertEqual(count, expected_count)
+            self.assertAlmostEqual(last_activity, expected_last_activity, delta=timedelta(seconds=1))
+
+        project = Project.objects.get(pk=self.project.pk)
+        self.assertEqual(project.issue_count, 2)
+        self.assertEqual(project.last_activity, max(last_activity for _, last_activity in repaired))
+
     def test_delete_comment_from_author(self):
 
         self.authenticate(self.project_author)
@@ -837,3 +1234,98 @@ class TestComment(APITestCase):
         self.assertEqual(response.status_code, 404)
 
         self.assertTrue(Comment.objects.filter(pk=1).exists())
+
+
+class TestArchive(APITestCase):
+
+    def setUp(self) -> None:
+
+        self.author = SoftdeskUser.objects.create_user(
+            username="author",
+            password="password",
+            age=27,
+        )
+
+        self.project = Project.objects.create(
+            description="project",
+            type="FRONT",
+            author=self.author
+        )
+
+        self.released_issue = Issue.objects.create(
+            tag="BUG",
+            title="released issue",
+            description="Issue description",
+            state="RELEASED",
+            project=self.project,
+            author=self.author
+        )
+
+        self.todo_issue = Issue.objects.create(
+            tag="BUG",
+            title="todo issue",
+            project=self.project,
+            author=self.author
+        )
+
+        for issue in [self.released_issue, self.todo_issue]:
+            Comment.objects.create(
+                issue=issue,
+                author=self.author,
+                description="comment"
+            )
+
+        Issue.objects.update(created_time=timezone.now() - timedelta(days=100))
+
+    def authenticate(self, user):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+
+    def test_archive_released_issues(self):
+
+        self.assertEqual(archive_released_issues(age=timedelta(days=200)), 0)
+        self.assertEqual(archive_released_issues(age=timedelta(days=90), compress=True), 1)
+
+        self.assertFalse(Issue.objects.filter(pk=self.released_issue.pk).exists())
+        self.assertEqual(Comment.objects.count(), 1)
+
+        archived_issue = ArchivedIssue.objects.get(pk=self.released_issue.pk)
+
+        self.assertEqual(archived_issue.description, "")
+        self.assertEqual(archived_issue.full_description, "Issue description")
+        self.assertEqual(archived_issue.archivedcomment_set.count(), 1)
+        self.assertEqual(archived_issue.comment_count, 1)
+
+        # the archived issues leave the project counter
+        self.assertEqual(Project.objects.get(pk=self.project.pk).issue_count, 1)
+
+    def test_get_archived_issues(self):
+
+        archive_released_issues(age=timedelta(days=90))
+
+        self.authenticate(self.author)
+
+        # hot data only by default
+        response = self.client.get("/issues/")
+        self.assertEqual(response.json()["count"], 1)
+        self.assertEqual(response.json()["results"][0]["title"], "todo issue")
+
+        response = self.client.get("/issues/?archived=true")
+        self.assertEqual(response.json()["count"], 1)
+        self.assertEqual(response.json()["results"][0]["title"], "released issue")
+        self.assertEqual(response.json()["results"][0]["description"], "Issue description")
+
+        response = self.client.get(f"/issues/{self.released_issue.pk}/?archived=true")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["version"], self.released_issue.version)
+
+        response = self.client.get(f"/issues/{self.released_issue.pk}/comments/?archived=true")
+        self.assertEqual(response.json()["count"], 1)
+        self.assertEqual(response.json()["results"][0]["description"], "comment")
+        self.assertEqual(response.json()["results"][0]["project"], self.project.pk)
+
+        response = self.client.get("/comments/?archived=true")
+        self.assertEqual(response.json()["count"], 1)
+
+        # archived data is never written
+        response = self.client.patch(f"/issues/{self.released_issue.pk}/?archived=true", data={"title": "new title"})
+        self.assertEqual(response.status_code, 404)
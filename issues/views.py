@@ -1,84 +1,108 @@
 from rest_framework import viewsets, permissions
-from issues.models import Issue, Comment
-from issues.serializers import IssueSerializer, CommentSerializer
+from rest_framework.decorators import action
+from rest_framework.generics import get_object_or_404
+from rest_framework.exceptions import ValidationError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from issues.models import Issue, Comment, ArchivedIssue, ArchivedComment
+from issues.serializers import IssueSerializer, CommentSerializer, ArchivedIssueSerializer, ArchivedCommentSerializer
 from projects.models import Contributor
+from api.fast_list import FastListMixin
+from api.batch_retrieve import BatchRetrieveMixin
+from api.idempotency import IdempotentCreateMixin
+from api.authorization import ProjectRoleMixin
+from api.concurrency import ConditionalUpdateMixin
+from projects.roles import roles
+from sharding.shards import shard_for
 
 
 class IssuesPermission(permissions.BasePermission):
 
     def has_permission(self, request, view):
 
-        user = request.user
-        project_id = request.data.get("project")
-        author_id = request.data.get("author")
-
-        user_is_contributor = Contributor.is_contributor(user.pk, project_id)
-        create_for_himself = str(user.pk) == author_id
-
         if request.method in ["GET", "PATCH", "DELETE"]:
             # will be handled in IssuesPermission.has_object_permission() or in IssueViewSet.get_queryset()
             return True
 
         if request.method == "POST":
-            return user_is_contributor and create_for_himself
+
+            user = request.user
+            project_id = request.data.get("project")
+            author_id = request.data.get("author")
+
+            create_for_himself = str(user.pk) == str(author_id)
+
+            return create_for_himself and roles.get_role(user.pk, project_id) is not None
 
         # any request out of CRUD will fail
         return False
 
     def has_object_permission(self, request, view, issue: Issue):
 
-        is_author = issue.author.pk == request.user.pk
-        user_is_contributor = Contributor.is_contributor(user_id=request.user.pk, project_id=issue.id)
-
+        # role set by IssueViewSet.get_object()
         if request.method in permissions.SAFE_METHODS:
-            return user_is_contributor
+            return issue.role is not None
         else:
-            return is_author
+            return issue.author_id == request.user.pk
 
 
 class CommentPermission(permissions.BasePermission):
 
     def has_permission(self, request, view):
 
-        issue_id = request.data.get("issue")
-        issue = Issue.objects.filter(pk=issue_id)
-
-        if not issue.exists():
-            # will be handled by serializer validators
+        if request.method in ["GET", "PATCH", "DELETE"]:
+            # will be handled in CommentPermission.has_object_permission() or in CommentViewset.get_queryset()
             return True
 
-        project_id = issue[0].project.pk
+        if request.method == "POST":
 
-        user = request.user
-        user_is_contributor = Contributor.is_contributor(user.pk, project_id)
+            issue_id = request.data.get("issue")
+            project_id = Issue.objects.on_all_shards().filter(pk=issue_id).values_list("project_id", flat=True).first()
 
-        author_id = request.data.get("author")
-        create_for_himself = str(user.pk) == author_id
+            if project_id is None:
+                # will be handled by serializer validators
+                return True
 
-        if request.method in ["GET", "PATCH", "DELETE"]:
-            # will be handled in CommentPermission.has_object_permission() or in CommentViewset.get_queryset()
-            return True
+            user = request.user
+            author_id = request.data.get("author")
 
-        if request.method == "POST":
-            return user_is_contributor and create_for_himself
+            create_for_himself = str(user.pk) == str(author_id)
+
+            return create_for_himself and roles.get_role(user.pk, project_id) is not None
 
         # any request out of CRUD will fail
         return False
 
     def has_object_permission(self, request, view, comment: Comment):
 
-        project_id = comment.issue.project.pk
-
-        user_is_contributor = Contributor.is_contributor(user_id=request.user.pk, project_id=project_id)
-        user_is_author = comment.author.pk == request.user.pk
-
+        # role set by CommentViewset.get_object()
         if request.method in permissions.SAFE_METHODS:
-            return user_is_contributor
+            return comment.role is not None
         else:
-            return user_is_author
+            return comment.author_id == request.user.pk
 
 
-class IssueViewSet(viewsets.ModelViewSet):
+def parse_datetime_param(name: str, value: str):
+
+    moment = parse_datetime(value)
+
+    if moment is None:
+        raise ValidationError({name: ["expected an ISO 8601 datetime"]})
+
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+
+    return moment
+
+
+def reads_archive(view) -> bool:
+    """
+    The archived issues and comments are only read on demand (?archived=true), and never written
+    """
+    return view.action in ["list", "retrieve", "comments"] and view.request.GET.get("archived") == "true"
+
+
+class IssueViewSet(IdempotentCreateMixin, ConditionalUpdateMixin, ProjectRoleMixin, BatchRetrieveMixin, FastListMixin, viewsets.ModelViewSet):
 
     queryset = Issue.objects.all().order_by("created_time")
     serializer_class = IssueSerializer
@@ -87,22 +111,123 @@ class IssueViewSet(viewsets.ModelViewSet):
         IssuesPermission
     ]
 
+    def get_serializer_class(self):
+        return ArchivedIssueSerializer if reads_archive(self) else IssueSerializer
+
     def get_queryset(self):
 
+        issue_model = ArchivedIssue if reads_archive(self) else Issue
+
         user_accessible_projects = Contributor.get_user_projects(self.request.user.pk)
-        user_accessible_issues = Issue.objects.filter(project_id__in=user_accessible_projects)
+        # merged from the shards of the projects, see sharding.query
+        user_accessible_issues = issue_model.objects.for_projects(user_accessible_projects)
 
         self.queryset = user_accessible_issues
 
-        title = self.request.GET.get("title", None)
+        return self.filter_issues(self.queryset, self.request.GET)
 
-        if title is not None:
-            self.queryset = self.queryset.filter(title=title)
+    # exact match filters: query parameter -> model field
+    EXACT_FILTERS = {
+        "title": "title",
+        "state": "state",
+        "priority": "priority",
+        "tag": "tag",
+        "author": "author_id",
+        "assigned_user": "assigned_user_id",
+    }
 
-        return self.queryset.order_by("created_time")
+    # every ordering ends the (..., created_time) indexes of Issue, so that no supported query needs a sort
+    ORDERINGS = ["created_time", "-created_time"]
+
+    # the "most active" orderings end the (project, last_activity) and (project, comment_count) indexes:
+    # only served within a single project
+    PROJECT_ORDERINGS = ORDERINGS + ["-last_activity", "-comment_count"]
+
+    @staticmethod
+    def filter_issues(queryset, params, orderings=ORDERINGS):
+        """
+        Apply the issue filters from the query parameters, shared with the project scoped listing
+        """
+
+        for param, field in IssueViewSet.EXACT_FILTERS.items():
+
+            value = params.get(param, None)
+
+            if value is None:
+                continue
 
+            if field.endswith("_id") and not value.isdigit():
+                raise ValidationError({param: ["expected an integer"]})
 
-class CommentViewset(viewsets.ModelViewSet):
+            queryset = queryset.filter(**{field: value})
+
+        created_after = params.get("created_after", None)
+        created_before = params.get("created_before", None)
+
+        if created_after is not None:
+            queryset = queryset.filter(created_time__gte=parse_datetime_param("created_after", created_after))
+
+        if created_before is not None:
+            queryset = queryset.filter(created_time__lt=parse_datetime_param("created_before", created_before))
+
+        ordering = params.get("ordering", "created_time")
+
+        if ordering not in orderings:
+            raise ValidationError({"ordering": [f"expected one of {', '.join(orderings)}"]})
+
+        return queryset.order_by(ordering)
+
+    @action(detail=False, methods=["get"])
+    def assigned(self, request):
+        """
+        Cross project queue of the open issues assigned to the user, read through the partial
+        (assigned_user, created_time) index, or through the (assigned_user, state, created_time) one
+        when a state is given
+        """
+
+        queryset = self.get_queryset().filter(assigned_user_id=request.user.pk)
+
+        if "state" not in request.GET:
+            queryset = queryset.exclude(state=Issue.IssueState.RELEASED)
+
+        response = self.fast_list(queryset, IssueSerializer)
+
+        if response is not None:
+            return response
+
+        page = self.paginate_queryset(queryset)
+        serializer = IssueSerializer(page, many=True, context=self.get_serializer_context())
+
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=True, methods=["get"])
+    def comments(self, request, pk=None):
+        """
+        List the comments of a single issue: the issue visibility is checked once,
+        then the comments are read through the (issue, created_time) index
+        """
+
+        if reads_archive(self):
+            comment_model, comment_serializer = ArchivedComment, ArchivedCommentSerializer
+        else:
+            comment_model, comment_serializer = Comment, CommentSerializer
+
+        issue = get_object_or_404(self.get_queryset(), pk=pk)
+        # on the shard of the issue
+        queryset = comment_model.objects.using(issue._state.db).filter(issue_id=issue.pk).order_by("created_time")
+
+        response = self.fast_list(queryset, comment_serializer)
+
+        if response is not None:
+            return response
+
+        page = self.paginate_queryset(queryset)
+        serializer = comment_serializer(page, many=True, context=self.get_serializer_context())
+
+        return self.get_paginated_response(serializer.data)
+
+
+class CommentViewset(IdempotentCreateMixin, ConditionalUpdateMixin, ProjectRoleMixin, BatchRetrieveMixin, FastListMixin, viewsets.ModelViewSet):
 
     queryset = Comment.objects.all().order_by("created_time")
     serializer_class = CommentSerializer
@@ -111,11 +236,37 @@ class CommentViewset(viewsets.ModelViewSet):
         CommentPermission
     ]
 
+    def get_serializer_class(self):
+        return ArchivedCommentSerializer if reads_archive(self) else CommentSerializer
+
     def get_queryset(self):
 
+        if reads_archive(self):
+            issue_model, comment_model = ArchivedIssue, ArchivedComment
+        else:
+            issue_model, comment_model = Issue, Comment
+
         user_accessible_projects = Contributor.get_user_projects(self.request.user.pk)
-        user_accessible_issues = Issue.objects.filter(project_id__in=user_accessible_projects)
-        user_accessible_comments = Comment.objects.filter(issue_id__in=user_accessible_issues)
+
+        issue = self.request.GET.get("issue")
+
+        if issue and not issue.isdigit():
+            raise ValidationError({"issue": ["expected an integer"]})
+
+        if issue:
+            user_accessible_issues = issue_model.objects.for_projects(user_accessible_projects)
+            project_id = user_accessible_issues.filter(pk=issue).values_list("project_id", flat=True).first()
+
+            # check the issue visibility once, then scan only its comments, on the shard of its project
+            if project_id is not None:
+                self.queryset = comment_model.objects.using(shard_for(project_id)).filter(issue_id=issue)
+            else:
+                self.queryset = comment_model.objects.none()
+
+            return self.queryset.order_by("created_time")
+
+        # merged from the shards of the projects, see sharding.query
+        user_accessible_comments = comment_model.objects.for_projects(user_accessible_projects)
 
         self.queryset = user_accessible_comments
 
@@ -0,0 +1,226 @@
+import gzip
+import hashlib
+import shutil
+import sqlite3
+import tempfile
+import time
+from contextlib import closing
+from pathlib import Path
+from django.conf import settings
+from django.utils import timezone
+from maintenance.scheduler import dbapi_connection
+from sharding.shards import PRIMARY
+
+DEFAULTS = {
+    # snapshots directory, next to the database by default
+    'DIRECTORY': None,
+    # pages copied per step of the backup, the database is only read locked during a step
+    'PAGES': 256,
+    # pause between two steps, in seconds, for the API writes to go through
+    'PAUSE': 0.01,
+    # throttling of the copy, in bytes per second (None: only the pauses)
+    'MAX_RATE': None,
+    # a copy restarted this many times by concurrent writes is finished in a single step
+    'MAX_RESTARTS': 3,
+    'COMPRESS': True,
+    # number of snapshots kept, the oldest are deleted
+    'KEEP': 7,
+    # period of the backups of the maintenance scheduler, None to disable them
+    'INTERVAL': None,
+}
+
+PREFIX = "softdesk-"
+
+
+class BackupError(Exception):
+    pass
+
+
+class TooManyRestarts(Exception):
+    pass
+
+
+def get_setting(name):
+    return getattr(settings, 'BACKUP', {}).get(name, DEFAULTS[name])
+
+
+def get_directory(connection, directory: Path = None) -> Path:
+    """
+    Snapshots directory of a database: the shards get a subdirectory each, pruned apart from the primary
+    """
+
+    directory = directory or get_setting('DIRECTORY')
+
+    if directory is None:
+        directory = Path(connection.settings_dict["NAME"]).parent / "backups"
+
+    return Path(directory) if connection.alias == PRIMARY else Path(directory, connection.alias)
+
+
+def file_digest(path: Path) -> str:
+
+    digest = hashlib.sha256()
+
+    with open(path, "rb") as reader:
+        while chunk := reader.read(2 ** 20):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def check_integrity(path: Path):
+
+    with closing(sqlite3.connect(path)) as database:
+        result = database.execute("PRAGMA integrity_check").fetchall()
+
+    if result != [("ok",)]:
+        raise BackupError(f"{path} failed the integrity check: {result[:5]}")
+
+
+def copy_database(source: sqlite3.Connection, destination: Path) -> int:
+    """
+    Copy the live database with the online backup API, and return the number of copied pages.
+
+    In WAL mode, the readers never block the writers: the copy is a single step, over a consistent read
+    snapshot. Otherwise, PAGES pages are copied at a time: the source is read locked during a step only, and
+    released during the pauses. Since SQLite restarts the copy when another connection writes to the source,
+    a copy restarted MAX_RESTARTS times is done again in a single step, which holds the read lock until done
+    """
+
+    if source.execute("PRAGMA journal_mode").fetchone()[0] == "wal":
+        return copy_pages(source, destination, pages=-1)
+
+    try:
+        return copy_pages(source, destination, pages=get_setting('PAGES'), max_restarts=get_setting('MAX_RESTARTS'))
+    except TooManyRestarts:
+        return copy_pages(source, destination, pages=-1)
+
+
+def copy_pages(source: sqlite3.Connection, destination: Path, pages: int, max_restarts: int = None) -> int:
+
+    page_size = source.execute("PRAGMA page_size").fetchone()[0]
+    max_rate = get_setting('MAX_RATE')
+    total = 0
+    previous_remaining = None
+    restarts = 0
+
+    def progress(status, remaining, page_count):
+
+        nonlocal total, previous_remaining, restarts
+        total = page_count
+
+        if previous_remaining is not None and remaining >= previous_remaining:
+            restarts += 1
+
+            if max_restarts is not None and restarts > max_restarts:
+                raise TooManyRestarts()
+
+        previous_remaining = remaining
+        pause = get_setting('PAUSE')
+
+        if max_rate:
+            # never faster than MAX_RATE bytes per second
+            pause = max(pause, pages * page_size / max_rate)
+
+        if remaining:
+            time.sleep(pause)
+
+    with closing(sqlite3.connect(destination)) as target:
+        source.backup(target, pages=pages, progress=progress)
+
+    return total
+
+
+def backup(connection, directory: Path = None, compress: bool = None) -> dict:
+    """
+    Write a verified snapshot of the database: `<prefix><time>.sqlite3[.gz]`, and its sha256 (of the
+    uncompressed database) in a `.sha256` file next to it. The copy is checked before it is kept
+    """
+
+    directory = Path(directory or get_directory(connection))
+    compress = get_setting('COMPRESS') if compress is None else compress
+    directory.mkdir(parents=True, exist_ok=True)
+
+    name = f"{PREFIX}{timezone.now():%Y%m%d-%H%M%S-%f}.sqlite3"
+    snapshot = directory / (f"{name}.gz" if compress else name)
+    start = time.perf_counter()
+
+    with tempfile.TemporaryDirectory(dir=directory) as work_directory:
+
+        copy = Path(work_directory, name)
+        pages = copy_database(dbapi_connection(connection), copy)
+
+        check_integrity(copy)
+        digest = file_digest(copy)
+
+        if compress:
+            with open(copy, "rb") as reader, gzip.open(Path(work_directory, snapshot.name), "wb") as writer:
+                shutil.copyfileobj(reader, writer)
+
+        # only complete snapshots ever get their final name
+        Path(work_directory, snapshot.name).replace(snapshot)
+        Path(f"{snapshot}.sha256").write_text(f"{digest}  {name}\n")
+
+    return {
+        "path": snapshot,
+        "pages": pages,
+        "size": snapshot.stat().st_size,
+        "sha256": digest,
+        "duration": time.perf_counter() - start,
+    }
+
+
+def verify(snapshot: Path):
+    """
+    Check that a snapshot is complete: its checksum, then the integrity of the database it holds
+    """
+
+    snapshot = Path(snapshot)
+    checksum = Path(f"{snapshot}.sha256")
+
+    if not checksum.exists():
+        raise BackupError(f"{checksum} is missing")
+
+    expected = checksum.read_text().split()[0]
+
+    with tempfile.TemporaryDirectory() as work_directory:
+
+        copy = Path(work_directory, "snapshot.sqlite3")
+
+        if snapshot.suffix == ".gz":
+            try:
+                with gzip.open(snapshot, "rb") as reader, open(copy, "wb") as writer:
+                    shutil.copyfileobj(reader, writer)
+            except (OSError, EOFError) as error:
+                raise BackupError(f"{snapshot} can not be decompressed: {error}")
+        else:
+            shutil.copyfile(snapshot, copy)
+
+        if file_digest(copy) != expected:
+            raise BackupError(f"{snapshot} does not match its checksum")
+
+        check_integrity(copy)
+
+
+def list_snapshots(directory: Path) -> list:
+    """
+    Snapshots of the directory, oldest first
+    """
+
+    return sorted(path for path in Path(directory).glob(f"{PREFIX}*.sqlite3*") if path.suffix != ".sha256")
+
+
+def prune(directory: Path, keep: int = None) -> list:
+    """
+    Delete the oldest snapshots beyond BACKUP['KEEP'], and return them
+    """
+
+    keep = get_setting('KEEP') if keep is None else keep
+    snapshots = list_snapshots(directory)
+    deleted = snapshots[:max(0, len(snapshots) - keep)]
+
+    for snapshot in deleted:
+        snapshot.unlink()
+        Path(f"{snapshot}.sha256").unlink(missing_ok=True)
+
+    return deleted
@@ -0,0 +1,56 @@
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from maintenance.backup import BackupError, backup, get_directory, list_snapshots, prune, verify
+from sharding.shards import get_databases
+
+
+class Command(BaseCommand):
+    help = "Write a verified snapshot of the live SQLite databases, without blocking their writers"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", help="a single database (default: the primary and every shard)")
+        parser.add_argument("--directory", type=Path, help="snapshots directory (default: BACKUP['DIRECTORY'])")
+        parser.add_argument("--no-compress", action="store_false", dest="compress", default=None)
+        parser.add_argument("--keep", type=int, help="snapshots kept per database (default: BACKUP['KEEP'])")
+        parser.add_argument("--verify", type=Path, nargs="*", help="verify the given snapshots, or all of them, instead")
+
+    def handle(self, *args, **options):
+
+        databases = [options["database"]] if options["database"] else get_databases()
+
+        if options["verify"]:
+            return self.verify(options["verify"])
+
+        for database in databases:
+
+            connection = connections[database]
+
+            if connection.vendor != "sqlite":
+                raise CommandError(f"the {database} database is not a SQLite database")
+
+            directory = get_directory(connection, options["directory"])
+
+            if options["verify"] is not None:
+                self.verify(list_snapshots(directory))
+                continue
+
+            snapshot = backup(connection, directory, options["compress"])
+
+            self.stdout.write(
+                f"{snapshot['path']}: {snapshot['pages']} pages copied and verified, "
+                f"{snapshot['size'] / 2 ** 20:.1f} MiB, in {snapshot['duration']:.1f}s"
+            )
+
+            for deleted in prune(directory, options["keep"]):
+                self.stdout.write(f"{deleted} deleted")
+
+    def verify(self, snapshots):
+
+        for snapshot in snapshots:
+            try:
+                verify(snapshot)
+            except BackupError as error:
+                raise CommandError(str(error))
+
+            self.stdout.write(f"{snapshot}: ok")
@@ -0,0 +1,72 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from maintenance.scheduler import (
+    Scheduler, fragmentation_report, enable_incremental_vacuum, enable_wal, incremental_vacuum, optimize, run_forever
+)
+from sharding.shards import get_databases
+
+
+class Command(BaseCommand):
+    help = "Report the fragmentation of the SQLite databases, reclaim their free pages and refresh their statistics"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", help="a single database (default: the primary and every shard)")
+        parser.add_argument("--vacuum", action="store_true", help="reclaim the free pages, by small steps")
+        parser.add_argument("--max-pages", type=int, help="stop the vacuum after this number of pages")
+        parser.add_argument("--analyze", action="store_true", help="refresh the statistics of all the tables")
+        parser.add_argument("--optimize", action="store_true", help="refresh the statistics of the changed tables")
+        parser.add_argument(
+            "--enable-incremental", action="store_true",
+            help="switch to the incremental auto vacuum mode: rewrites the whole file, run it with the server stopped"
+        )
+        parser.add_argument("--enable-wal", action="store_true", help="switch to the write-ahead log journal mode")
+        parser.add_argument("--loop", action="store_true", help="run the scheduled tasks (MAINTENANCE settings) forever")
+
+    def handle(self, *args, **options):
+
+        databases = [options["database"]] if options["database"] else get_databases()
+
+        for database in databases:
+
+            connection = connections[database]
+
+            if connection.vendor != "sqlite":
+                raise CommandError(f"the {database} database is not a SQLite database")
+
+            self.maintain(database, connection, options)
+
+        if options["loop"]:
+            run_forever([Scheduler(database) for database in databases])
+
+    def maintain(self, database: str, connection, options: dict):
+
+        if options["enable_incremental"]:
+            enable_incremental_vacuum(connection)
+            self.stdout.write(f"{database}: incremental auto vacuum enabled")
+
+        if options["enable_wal"]:
+            enable_wal(connection)
+            self.stdout.write(f"{database}: write-ahead log enabled")
+
+        if options["vacuum"]:
+            freed = incremental_vacuum(connection, options["max_pages"])
+            self.stdout.write(f"{database}: {freed} pages freed")
+
+        if options["analyze"] or options["optimize"]:
+            optimize(connection, full=options["analyze"])
+            self.stdout.write(f"{database}: statistics refreshed")
+
+        self.write_report(database, fragmentation_report(connection))
+
+    def write_report(self, database: str, report: dict):
+
+        self.stdout.write(
+            f"{database}: journal {report['journal_mode']}, auto vacuum {report['auto_vacuum']}, "
+            f"{report['page_count']} pages of {report['page_size']} bytes ({report['size'] / 2 ** 20:.1f} MiB), {report['free_pages']} free ({report['free_ratio']:.1%}, "
+            f"{report['free_size'] / 2 ** 20:.1f} MiB)"
+        )
+
+        if report["auto_vacuum"] != "incremental" and report["free_pages"]:
+            self.stdout.write(
+                f"{database}: the free pages can only be reclaimed in small steps after --enable-incremental"
+            )
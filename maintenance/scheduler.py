@@ -0,0 +1,245 @@
+import logging
+import sqlite3
+import time
+from contextlib import closing
+from datetime import timedelta
+from django.conf import settings
+from django.db import OperationalError, connections
+from django.db.transaction import TransactionManagementError
+from sharding.shards import get_databases
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    # free pages given back to the file system per write transaction, adapted to VACUUM_STEP_TIME
+    'VACUUM_PAGES': 256,
+    # target duration of a single vacuum step, in seconds: the write lock is never held much longer
+    'VACUUM_STEP_TIME': 0.05,
+    # pause between two vacuum steps, in seconds, for the API writes to get the lock
+    'VACUUM_PAUSE': 0.05,
+    # the free pages are only reclaimed above this share of the file
+    'VACUUM_MIN_FREE_RATIO': 0.05,
+    'VACUUM_INTERVAL': timedelta(minutes=10),
+    # rows sampled per index by ANALYZE, see https://www.sqlite.org/pragma.html#pragma_analysis_limit
+    'ANALYSIS_LIMIT': 1000,
+    'ANALYZE_INTERVAL': timedelta(hours=6),
+}
+
+AUTO_VACUUM_MODES = {0: "none", 1: "full", 2: "incremental"}
+
+
+def get_setting(name):
+    return getattr(settings, 'MAINTENANCE', {}).get(name, DEFAULTS[name])
+
+
+def pragma(connection, statement: str):
+
+    with closing(connection.cursor()) as cursor:
+        cursor.execute(f"PRAGMA {statement}")
+        row = cursor.fetchone()
+
+    return row[0] if row else None
+
+
+def dbapi_connection(connection) -> sqlite3.Connection:
+    """
+    The sqlite3 connection of a Django connection, or the given sqlite3 connection
+    """
+
+    if hasattr(connection, "ensure_connection"):
+        connection.ensure_connection()
+        return connection.connection
+
+    return connection
+
+
+def fragmentation_report(connection) -> dict:
+    """
+    Size of the database file, and share of its pages left free by the deletions
+    """
+
+    page_size = pragma(connection, "page_size")
+    page_count = pragma(connection, "page_count")
+    free_pages = pragma(connection, "freelist_count")
+
+    return {
+        "auto_vacuum": AUTO_VACUUM_MODES.get(pragma(connection, "auto_vacuum"), "unknown"),
+        "journal_mode": pragma(connection, "journal_mode"),
+        "page_size": page_size,
+        "page_count": page_count,
+        "free_pages": free_pages,
+        "free_ratio": free_pages / page_count if page_count else 0,
+        "size": page_size * page_count,
+        "free_size": page_size * free_pages,
+    }
+
+
+def enable_incremental_vacuum(connection):
+    """
+    Switch the database to the incremental auto vacuum mode. The full VACUUM this takes rewrites the whole file
+    under an exclusive lock: to be run once, offline
+    """
+
+    pragma(connection, "auto_vacuum = INCREMENTAL")
+
+    with closing(connection.cursor()) as cursor:
+        cursor.execute("VACUUM")
+
+
+def enable_wal(connection):
+    """
+    Switch the database to the write-ahead log: the readers, backups included, stop blocking the writers
+    """
+
+    pragma(connection, "journal_mode = WAL")
+
+
+def incremental_vacuum(connection, max_pages: int = None) -> int:
+    """
+    Give the free pages back to the file system by small steps, each its own short write transaction, sized
+    to last about VACUUM_STEP_TIME. Return the number of freed pages, 0 when the database is not in the
+    incremental auto vacuum mode or when the API writes keep the lock busy
+    """
+
+    if pragma(connection, "auto_vacuum") != 2:
+        return 0
+
+    if getattr(connection, "in_atomic_block", False):
+        # executescript() would commit the transaction
+        raise TransactionManagementError("the incremental vacuum runs in autocommit mode")
+
+    pages = get_setting('VACUUM_PAGES')
+    step_time = get_setting('VACUUM_STEP_TIME')
+    freed = 0
+
+    while (free_pages := pragma(connection, "freelist_count")) and (max_pages is None or freed < max_pages):
+
+        step = min(pages, free_pages, max_pages - freed if max_pages is not None else free_pages)
+        start = time.perf_counter()
+
+        try:
+            # the pragma frees one page per step of its statement, which only executescript() runs to the end
+            dbapi_connection(connection).executescript(f"PRAGMA incremental_vacuum({step});")
+
+        except (OperationalError, sqlite3.OperationalError):
+            # the database stayed locked for the whole busy timeout: the API writes have the priority
+            logger.warning("incremental vacuum interrupted by a locked database")
+            break
+
+        freed += step
+        elapsed = time.perf_counter() - start
+
+        # keep the steps around their target duration
+        if elapsed > step_time:
+            pages = max(1, pages // 2)
+        elif elapsed < step_time / 2:
+            pages = pages * 2
+
+        time.sleep(get_setting('VACUUM_PAUSE'))
+
+    return freed
+
+
+def optimize(connection, full: bool = False):
+    """
+    Refresh the query planner statistics: `PRAGMA optimize` only analyzes the tables which changed enough since
+    the last run, `full` analyzes all of them. Both sample at most ANALYSIS_LIMIT rows per index
+    """
+
+    pragma(connection, f"analysis_limit = {int(get_setting('ANALYSIS_LIMIT'))}")
+
+    with closing(connection.cursor()) as cursor:
+        cursor.execute("ANALYZE" if full else "PRAGMA optimize")
+        cursor.fetchall()
+
+
+class Scheduler:
+    """
+    Runs the due maintenance tasks of a database: the incremental vacuum when enough pages are free, the
+    planner statistics refresh, and the backups when BACKUP['INTERVAL'] is set
+    """
+
+    def __init__(self, using: str = "default"):
+        self.using = using
+        self.last_runs = {}
+
+    def is_due(self, task: str, interval: timedelta, now: float) -> bool:
+
+        if interval is None:
+            return False
+
+        return now - self.last_runs.get(task, float("-inf")) >= interval.total_seconds()
+
+    def run_due_tasks(self, now: float = None) -> dict:
+
+        from maintenance import backup
+
+        now = time.monotonic() if now is None else now
+        connection = connections[self.using]
+        done = {}
+
+        if connection.vendor != "sqlite":
+            return done
+
+        if self.is_due("vacuum", get_setting('VACUUM_INTERVAL'), now):
+
+            self.last_runs["vacuum"] = now
+
+            if fragmentation_report(connection)["free_ratio"] >= get_setting('VACUUM_MIN_FREE_RATIO'):
+                done["vacuum"] = incremental_vacuum(connection)
+
+        if self.is_due("optimize", get_setting('ANALYZE_INTERVAL'), now):
+
+            self.last_runs["optimize"] = now
+            optimize(connection)
+            done["optimize"] = True
+
+        if self.is_due("backup", backup.get_setting('INTERVAL'), now):
+
+            self.last_runs["backup"] = now
+            snapshot = backup.backup(connection)
+            backup.prune(snapshot["path"].parent)
+            done["backup"] = snapshot["path"]
+
+        return done
+
+    def get_intervals(self) -> dict:
+
+        from maintenance import backup
+
+        intervals = {"vacuum": get_setting('VACUUM_INTERVAL'), "optimize": get_setting('ANALYZE_INTERVAL')}
+
+        if backup.get_setting('INTERVAL') is not None:
+            intervals["backup"] = backup.get_setting('INTERVAL')
+
+        return intervals
+
+    def next_run(self, now: float) -> float:
+        """
+        Seconds until the next due task
+        """
+
+        return max(0, min(
+            self.last_runs.get(task, float("-inf")) + interval.total_seconds() - now
+            for task, interval in self.get_intervals().items()
+        ))
+
+
+def run_forever(schedulers: list):
+    """
+    Run the due tasks of the schedulers forever, from the single `manage.py sqlite_maintenance --loop` process:
+    never from the server processes, whose concurrent runs would vacuum the same files
+    """
+
+    while True:
+
+        for scheduler in schedulers:
+            try:
+                scheduler.run_due_tasks()
+            except Exception:
+                logger.exception("sqlite maintenance of the %s database failed", scheduler.using)
+            finally:
+                connections.close_all()
+
+        time.sleep(max(1, min(scheduler.next_run(time.monotonic()) for scheduler in schedulers)))
+
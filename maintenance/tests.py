@@ -0,0 +1,106 @@
+import sqlite3
+import tempfile
+from contextlib import closing
+from pathlib import Path
+from io import StringIO
+from django.core.management import call_command
+from django.db import connections
+from django.test import TestCase, override_settings
+from maintenance.scheduler import Scheduler, fragmentation_report, enable_incremental_vacuum, incremental_vacuum
+from maintenance.backup import BackupError, backup, get_directory, list_snapshots, prune, verify
+
+
+@override_settings(MAINTENANCE={'VACUUM_PAGES': 4, 'VACUUM_PAUSE': 0, 'VACUUM_MIN_FREE_RATIO': 0})
+class TestMaintenance(TestCase):
+
+    databases = {"default", "shard1"}
+
+    def setUp(self) -> None:
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+
+        self.directory = Path(directory.name)
+        self.database = sqlite3.connect(Path(directory.name, "db.sqlite3"), isolation_level=None)
+        self.addCleanup(self.database.close)
+
+        self.database.execute("CREATE TABLE comment (id INTEGER PRIMARY KEY, description TEXT)")
+        self.database.executemany("INSERT INTO comment (description) VALUES (?)", [("x" * 2000,)] * 200)
+
+    def test_incremental_vacuum(self):
+
+        self.database.execute("DELETE FROM comment")
+
+        report = fragmentation_report(self.database)
+        self.assertEqual(report["auto_vacuum"], "none")
+        self.assertGreater(report["free_ratio"], 0.5)
+
+        # nothing can be reclaimed by steps before the mode is switched
+        self.assertEqual(incremental_vacuum(self.database), 0)
+
+        enable_incremental_vacuum(self.database)
+
+        self.database.executemany("INSERT INTO comment (description) VALUES (?)", [("x" * 2000,)] * 200)
+        self.database.execute("DELETE FROM comment")
+
+        free_pages = fragmentation_report(self.database)["free_pages"]
+
+        self.assertEqual(incremental_vacuum(self.database, max_pages=10), 10)
+        self.assertEqual(fragmentation_report(self.database)["free_pages"], free_pages - 10)
+
+        self.assertEqual(incremental_vacuum(self.database), free_pages - 10)
+
+        report = fragmentation_report(self.database)
+        self.assertEqual(report["auto_vacuum"], "incremental")
+        self.assertEqual(report["free_pages"], 0)
+
+    def test_scheduler(self):
+
+        scheduler = Scheduler()
+
+        # the test database is not in the incremental mode: only the statistics are refreshed
+        self.assertEqual(scheduler.run_due_tasks(now=0), {"vacuum": 0, "optimize": True})
+        self.assertEqual(scheduler.run_due_tasks(now=60), {})
+        self.assertEqual(scheduler.next_run(now=60), 540)
+
+        self.assertEqual(scheduler.run_due_tasks(now=600), {"vacuum": 0})
+
+    @override_settings(BACKUP={'PAGES': 8, 'PAUSE': 0})
+    def test_backup(self):
+
+        snapshot = backup(self.database, self.directory / "backups")
+
+        self.assertTrue(snapshot["path"].name.endswith(".sqlite3.gz"))
+        self.assertGreater(snapshot["pages"], 100)
+        verify(snapshot["path"])
+
+        # a truncated snapshot is detected
+        corrupted = Path(self.directory, "backups", "softdesk-corrupted.sqlite3.gz")
+        corrupted.write_bytes(snapshot["path"].read_bytes()[:1000])
+        Path(f"{corrupted}.sha256").write_text(Path(f"{snapshot['path']}.sha256").read_text())
+
+        with self.assertRaises(BackupError):
+            verify(corrupted)
+
+        corrupted.unlink()
+
+        copy = backup(self.database, self.directory / "backups", compress=False)["path"]
+
+        with closing(sqlite3.connect(copy)) as database:
+            self.assertEqual(database.execute("SELECT COUNT(*) FROM comment").fetchone()[0], 200)
+
+        self.assertEqual(prune(self.directory / "backups", keep=1), [snapshot["path"]])
+        self.assertEqual(list_snapshots(self.directory / "backups"), [copy])
+
+    @override_settings(SHARDING={'SHARDS': ['default', 'shard1']})
+    def test_shards(self):
+
+        output = StringIO()
+        call_command("sqlite_maintenance", "--optimize", stdout=output)
+
+        self.assertIn("default: statistics refreshed", output.getvalue())
+        self.assertIn("shard1: statistics refreshed", output.getvalue())
+
+        # the snapshots of a shard are pruned apart from the ones of the primary
+        self.assertEqual(get_directory(connections["default"], self.directory), self.directory)
+        self.assertEqual(get_directory(connections["shard1"], self.directory), self.directory / "shard1")
@@ -0,0 +1,30 @@
+from django.core.mail import send_mail
+from notifications.models import Notification
+
+
+def describe(notification: Notification, count: int) -> str:
+
+    title = notification.payload.get("title", "")
+
+    if notification.kind == Notification.NotificationKind.ASSIGNED:
+        return f'You were assigned the issue "{title}" (project {notification.project_id})'
+
+    if count > 1:
+        return f'{count} new comments on the issue "{title}" (project {notification.project_id})'
+
+    return f'New comment on the issue "{title}" (project {notification.project_id}): {notification.payload.get("description", "")}'
+
+
+def send_email(recipient, entries):
+    """
+    Default dispatcher: a single email per recipient and batch, through the EMAIL_* settings
+    """
+
+    if not recipient.email:
+        # nowhere to send it, retrying would not help
+        return
+
+    subject = f"Softdesk: {len(entries)} new notification{'s' if len(entries) > 1 else ''}"
+    body = "\n".join(describe(notification, count) for notification, count in entries)
+
+    send_mail(subject, body, None, [recipient.email])
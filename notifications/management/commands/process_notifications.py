@@ -0,0 +1,22 @@
+import time
+from django.core.management.base import BaseCommand
+from notifications.worker import dispatch_pending
+
+
+class Command(BaseCommand):
+    help = "Dispatch the pending notifications of the outbox, by batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="keep polling for new notifications")
+        parser.add_argument("--interval", type=float, default=5, help="seconds between two polls")
+
+    def handle(self, *args, **options):
+
+        # the notifications left sending by a dead worker are dispatched again: at least once delivery
+        sent = dispatch_pending(resume=True)
+
+        while options["loop"]:
+            time.sleep(options["interval"])
+            sent += dispatch_pending()
+
+        self.stdout.write(f"{sent} messages sent")
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.30 on 2026-10-19 13:27
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('user', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Notification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('ASSIGNED', 'assigned'), ('COMMENTED', 'commented')], max_length=10)),
+                ('project_id', models.BigIntegerField()),
+                ('issue_id', models.BigIntegerField()),
+                ('comment_id', models.BigIntegerField(null=True)),
+                ('payload', models.JSONField(default=dict)),
+                ('state', models.CharField(choices=[('PENDING', 'pending'), ('SENDING', 'sending'), ('SENT', 'sent'), ('FAILED', 'failed')], default='PENDING', max_length=10)),
+                ('attempts', models.IntegerField(default=0)),
+                ('next_attempt_time', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_error', models.CharField(default='', max_length=500)),
+                ('created_time', models.DateTimeField(auto_now_add=True)),
+                ('sent_time', models.DateTimeField(null=True)),
+                ('recipient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='user.softdeskuser')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['state', 'next_attempt_time'], name='notification_due_idx')],
+            },
+        ),
+    ]
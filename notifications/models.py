@@ -0,0 +1,78 @@
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from django.db import models
+from user.models import SoftdeskUser
+
+
+class Notification(models.Model):
+    """
+    Outbox row, written in the transaction of the issue or comment which triggers it, and dispatched
+    off the request path by notifications.worker
+    """
+
+    class NotificationKind(models.TextChoices):
+        ASSIGNED = "ASSIGNED", _("assigned")
+        COMMENTED = "COMMENTED", _("commented")
+
+    class NotificationState(models.TextChoices):
+        PENDING = "PENDING", _("pending")
+        SENDING = "SENDING", _("sending")
+        SENT = "SENT", _("sent")
+        FAILED = "FAILED", _("failed")
+
+    recipient = models.ForeignKey(
+        to=SoftdeskUser,
+        on_delete=models.CASCADE
+    )
+
+    kind = models.CharField(
+        max_length=10,
+        choices=NotificationKind.choices
+    )
+
+    # plain ids: a notification outlives the deletion of its issue or comment
+    project_id = models.BigIntegerField()
+
+    issue_id = models.BigIntegerField()
+
+    comment_id = models.BigIntegerField(
+        null=True
+    )
+
+    # what the dispatcher needs, without reading the issue or comment back
+    payload = models.JSONField(
+        default=dict
+    )
+
+    state = models.CharField(
+        max_length=10,
+        choices=NotificationState.choices,
+        default=NotificationState.PENDING
+    )
+
+    attempts = models.IntegerField(
+        default=0
+    )
+
+    next_attempt_time = models.DateTimeField(
+        default=timezone.now
+    )
+
+    last_error = models.CharField(
+        max_length=500,
+        default=""
+    )
+
+    created_time = models.DateTimeField(
+        auto_now_add=True
+    )
+
+    sent_time = models.DateTimeField(
+        null=True
+    )
+
+    class Meta:
+        indexes = [
+            # serves the worker claims of the due notifications
+            models.Index(fields=["state", "next_attempt_time"], name="notification_due_idx"),
+        ]
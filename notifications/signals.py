@@ -0,0 +1,70 @@
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from user.models import SoftdeskUser
+from issues.models import Issue, Comment
+from notifications.models import Notification
+from notifications.worker import start_worker
+
+
+def enqueue(kind: str, recipient_ids, issue: Issue, comment: Comment = None):
+    """
+    Write the notifications in the current transaction: they are dispatched only if it commits
+    """
+
+    recipient_ids = SoftdeskUser.objects.filter(
+        pk__in={pk for pk in recipient_ids if pk is not None},
+        can_be_contacted=True
+    ).values_list("pk", flat=True)
+
+    payload = {"title": issue.title}
+
+    if comment is not None:
+        payload["description"] = comment.description[:200]
+
+    notifications = Notification.objects.bulk_create([
+        Notification(
+            recipient_id=recipient_id,
+            kind=kind,
+            project_id=issue.project_id,
+            issue_id=issue.pk,
+            comment_id=comment.pk if comment is not None else None,
+            payload=payload
+        )
+        for recipient_id in recipient_ids
+    ])
+
+    if notifications:
+        transaction.on_commit(start_worker)
+
+
+@receiver(post_save, sender=Issue)
+def issue_saved(sender, instance: Issue, created, raw=False, **kwargs):
+    """
+    Runs in the transaction of Issue.save(): notify the new assignee, unless the issue author (the only one
+    allowed to update it) assigned it to themselves
+    """
+
+    previous_assigned_user_id = None if created else getattr(instance, "loaded_assigned_user_id", None)
+    instance.loaded_assigned_user_id = instance.assigned_user_id
+
+    if raw or instance.assigned_user_id in (None, previous_assigned_user_id, instance.author_id):
+        return
+
+    enqueue(Notification.NotificationKind.ASSIGNED, [instance.assigned_user_id], instance)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance: Comment, created, raw=False, **kwargs):
+    """
+    Runs in the transaction of Comment.save(): notify the issue author and assignee of the new comments
+    """
+
+    if raw or not created:
+        return
+
+    issue = instance.issue
+    recipient_ids = {issue.author_id, issue.assigned_user_id} - {instance.author_id}
+
+    if recipient_ids - {None}:
+        enqueue(Notification.NotificationKind.COMMENTED, recipient_ids, issue, instance)
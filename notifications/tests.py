@@ -0,0 +1,169 @@
+from unittest.mock import patch
+from django.core import mail
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+from user.models import SoftdeskUser
+from projects.models import Project, Contributor
+from issues.models import Issue
+from notifications.models import Notification
+from notifications.worker import claim_batch, dispatch_pending
+
+
+def failing_dispatcher(recipient, entries):
+    raise ConnectionError("smtp server unreachable")
+
+
+@override_settings(NOTIFICATIONS={'IN_PROCESS_WORKER': False, 'MAX_ATTEMPTS': 2})
+class TestNotifications(APITestCase):
+
+    def setUp(self) -> None:
+
+        self.project_author = SoftdeskUser.objects.create_user(
+            username="project_author",
+            password="password",
+            email="author@example.com",
+            age=27,
+            can_be_contacted=True,
+        )
+
+        self.project_contributor = SoftdeskUser.objects.create_user(
+            username="project_contributor",
+            password="password",
+            email="contributor@example.com",
+            age=27,
+            can_be_contacted=True,
+        )
+
+        self.silent_contributor = SoftdeskUser.objects.create_user(
+            username="silent_contributor",
+            password="password",
+            email="silent@example.com",
+            age=27,
+        )
+
+        self.project = Project.objects.create(
+            description="project",
+            type="FRONT",
+            author=self.project_author
+        )
+
+        for user in [self.project_contributor, self.silent_contributor]:
+            Contributor.objects.create(project=self.project, user=user)
+
+        self.issue = Issue.objects.create(
+            tag="BUG",
+            title="issue",
+            project=self.project,
+            author=self.project_author
+        )
+
+    def authenticate(self, user):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+
+    def test_assignment_notifications(self):
+
+        self.authenticate(self.project_author)
+
+        response = self.client.patch(f"/issues/{self.issue.pk}/", data={"assigned_user": self.project_contributor.pk})
+        self.assertEqual(response.status_code, 200)
+
+        # saved again without any new assignee
+        response = self.client.patch(f"/issues/{self.issue.pk}/", data={"title": "new title"})
+        self.assertEqual(response.status_code, 200)
+
+        # opted out
+        response = self.client.patch(f"/issues/{self.issue.pk}/", data={"assigned_user": self.silent_contributor.pk})
+        self.assertEqual(response.status_code, 200)
+
+        notification = Notification.objects.get()
+
+        self.assertEqual(notification.recipient_id, self.project_contributor.pk)
+        self.assertEqual(notification.kind, Notification.NotificationKind.ASSIGNED)
+        self.assertEqual(notification.state, Notification.NotificationState.PENDING)
+
+        self.assertEqual(dispatch_pending(), 1)
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ["contributor@example.com"])
+        self.assertIn('You were assigned the issue "issue"', mail.outbox[0].body)
+        self.assertEqual(Notification.objects.get().state, Notification.NotificationState.SENT)
+
+    def test_comment_notifications(self):
+
+        self.authenticate(self.project_contributor)
+
+        for i in range(3):
+            response = self.client.post("/comments/", data={
+                "description": f"comment {i}",
+                "issue": self.issue.pk,
+                "author": self.project_contributor.pk
+            })
+            self.assertEqual(response.status_code, 201)
+
+        # the issue author is not notified of their own comments
+        self.authenticate(self.project_author)
+        self.client.post("/comments/", data={"description": "answer", "issue": self.issue.pk, "author": self.project_author.pk})
+
+        self.assertEqual(Notification.objects.filter(recipient=self.project_author).count(), 3)
+        self.assertEqual(Notification.objects.count(), 3)
+
+        # a single message per recipient, with the comments of the same issue collapsed
+        self.assertEqual(dispatch_pending(), 1)
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].subject, "Softdesk: 1 new notification")
+        self.assertIn('3 new comments on the issue "issue"', mail.outbox[0].body)
+
+    @override_settings(NOTIFICATIONS={
+        'IN_PROCESS_WORKER': False,
+        'MAX_ATTEMPTS': 2,
+        'DISPATCHER': 'notifications.tests.failing_dispatcher'
+    })
+    def test_dispatch_retries(self):
+
+        self.issue.assigned_user = self.project_contributor
+        self.issue.save()
+
+        with self.assertLogs("notifications.worker", "ERROR"):
+            self.assertEqual(dispatch_pending(), 0)
+
+        notification = Notification.objects.get()
+
+        self.assertEqual(notification.state, Notification.NotificationState.PENDING)
+        self.assertEqual(notification.attempts, 1)
+        self.assertIn("smtp server unreachable", notification.last_error)
+        self.assertGreater(notification.next_attempt_time, timezone.now())
+
+        # not due yet
+        self.assertEqual(dispatch_pending(), 0)
+
+        Notification.objects.update(next_attempt_time=timezone.now())
+
+        with self.assertLogs("notifications.worker", "ERROR"):
+            dispatch_pending()
+
+        notification = Notification.objects.get()
+
+        self.assertEqual(notification.state, Notification.NotificationState.FAILED)
+        self.assertEqual(notification.attempts, 2)
+
+    def test_claim_batch(self):
+
+        other_issue = Issue.objects.create(tag="BUG", title="other", project=self.project, author=self.project_author)
+
+        for issue in [self.issue, other_issue]:
+            issue.assigned_user = self.project_contributor
+            issue.save()
+
+        claimed, pending = Notification.objects.order_by("pk")
+
+        # claimed by another worker since the due notifications were read
+        Notification.objects.filter(pk=claimed.pk).update(state=Notification.NotificationState.SENDING)
+
+        with patch("notifications.worker.due_notifications", lambda states: Notification.objects.all()):
+            batch = claim_batch([Notification.NotificationState.PENDING])
+
+        self.assertEqual([notification.pk for notification in batch], [pending.pk])
+        self.assertEqual(Notification.objects.get(pk=pending.pk).state, Notification.NotificationState.SENDING)
@@ -0,0 +1,175 @@
+import logging
+import threading
+from collections import defaultdict
+from datetime import timedelta
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from notifications.models import Notification
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    # notifications claimed per batch, dispatched as one message per recipient
+    'BATCH_SIZE': 100,
+    # the retries of a failed dispatch wait RETRY_DELAY, then twice as long after each new failure
+    'RETRY_DELAY': timedelta(seconds=30),
+    'MAX_ATTEMPTS': 5,
+    # callable(recipient, entries) sending the notifications of one recipient, raises when it fails
+    'DISPATCHER': 'notifications.dispatch.send_email',
+    # drain the outbox in a daemon thread once a notification is committed,
+    # disable it when the `process_notifications` command runs as a dedicated worker
+    'IN_PROCESS_WORKER': True,
+}
+
+_worker_lock = threading.Lock()
+
+
+def get_setting(name):
+    return getattr(settings, 'NOTIFICATIONS', {}).get(name, DEFAULTS[name])
+
+
+def start_worker():
+    if get_setting('IN_PROCESS_WORKER'):
+        threading.Thread(target=_work, name="notifications-worker", daemon=True).start()
+
+
+def _work():
+    try:
+        dispatch_pending()
+    finally:
+        connections.close_all()
+
+
+def due_notifications(states):
+    return Notification.objects.filter(state__in=states, next_attempt_time__lte=timezone.now())
+
+
+def dispatch_pending(resume: bool = False) -> int:
+    """
+    Dispatch the due notifications by batches until none is left, and return the number of messages sent.
+
+    A batch whose dispatches all fail stops the worker: the dispatcher is most likely down, the rest of the
+    outbox waits for the next run rather than being burnt through the retries. With `resume`, the
+    notifications left sending by a dead worker are dispatched again.
+    """
+
+    states = [Notification.NotificationState.PENDING]
+
+    if resume:
+        states.append(Notification.NotificationState.SENDING)
+
+    sent = 0
+
+    # a single worker per process, the concurrent ones would only dispatch the same notifications twice
+    while _worker_lock.acquire(blocking=False):
+
+        try:
+            while batch := claim_batch(states):
+
+                delivered = dispatch_batch(batch)
+                sent += delivered
+
+                if not delivered:
+                    return sent
+
+        finally:
+            _worker_lock.release()
+
+        # a notification may have been committed while the lock was being released
+        if not due_notifications([Notification.NotificationState.PENDING]).exists():
+            break
+
+    return sent
+
+
+def claim_batch(states) -> list:
+    """
+    Mark a batch of due notifications as sending: each row is claimed by a conditional update, so that the rows
+    claimed by a concurrent worker since they were read are left to it
+    """
+
+    due = due_notifications(states).order_by("next_attempt_time").values_list("pk", "next_attempt_time")
+    claimed = []
+
+    with transaction.atomic():
+
+        for pk, next_attempt_time in due[:get_setting('BATCH_SIZE')]:
+
+            # the claim moves next_attempt_time, so that the resumed sending rows are not claimed twice either
+            if Notification.objects.filter(pk=pk, state__in=states, next_attempt_time=next_attempt_time).update(
+                state=Notification.NotificationState.SENDING,
+                next_attempt_time=timezone.now()
+            ):
+                claimed.append(pk)
+
+    return list(Notification.objects.filter(pk__in=claimed).select_related("recipient"))
+
+
+def deduplicate(notifications) -> list:
+    """
+    Collapse the notifications of a recipient on the same issue: (latest notification, count) pairs, oldest first
+    """
+
+    entries = {}
+
+    for notification in sorted(notifications, key=lambda notification: notification.pk):
+        key = (notification.kind, notification.issue_id)
+        entries[key] = (notification, entries.get(key, (None, 0))[1] + 1)
+
+    return list(entries.values())
+
+
+def dispatch_batch(batch) -> int:
+    """
+    Send one message per recipient of the batch, and return the number of messages sent
+    """
+
+    dispatcher = import_string(get_setting('DISPATCHER'))
+    by_recipient = defaultdict(list)
+
+    for notification in batch:
+        by_recipient[notification.recipient_id].append(notification)
+
+    delivered = 0
+
+    for notifications in by_recipient.values():
+
+        pks = [notification.pk for notification in notifications]
+        recipient = notifications[0].recipient
+
+        try:
+            # the recipient may have opted out since the notification was written
+            if recipient.can_be_contacted:
+                dispatcher(recipient, deduplicate(notifications))
+
+        except Exception as error:
+            logger.exception("notifications dispatch to user %s failed", recipient.pk)
+            retry_later(pks, max(notification.attempts for notification in notifications), error)
+
+        else:
+            Notification.objects.filter(pk__in=pks).update(
+                state=Notification.NotificationState.SENT,
+                sent_time=timezone.now()
+            )
+            delivered += 1
+
+    return delivered
+
+
+def retry_later(pks, attempts: int, error: Exception):
+    """
+    Back off exponentially, and give up after NOTIFICATIONS['MAX_ATTEMPTS']
+    """
+
+    Notification.objects.filter(pk__in=pks).update(
+        attempts=F("attempts") + 1,
+        state=Case(
+            When(attempts__gte=get_setting('MAX_ATTEMPTS') - 1, then=Value(Notification.NotificationState.FAILED)),
+            default=Value(Notification.NotificationState.PENDING)
+        ),
+        next_attempt_time=timezone.now() + get_setting('RETRY_DELAY') * 2 ** attempts,
+        last_error=repr(error)[:500]
+    )
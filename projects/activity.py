@@ -0,0 +1,96 @@
+import heapq
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+from issues.models import Issue, Comment
+from issues.serializers import IssueSerializer, CommentSerializer
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# kinds of the timeline entries: (model, serializer); on the same time, the issues come first
+KINDS = {
+    "issue": (Issue, IssueSerializer),
+    "comment": (Comment, CommentSerializer),
+}
+
+# position of an entry in the timeline, which is ordered by decreasing (created_time, kind, id)
+Position = namedtuple("Position", ["created_time", "kind", "id"])
+
+
+def to_cursor(position: Position) -> str:
+    """
+    Encode a position as an opaque cursor: "<microseconds since epoch>.<kind>.<id>"
+    """
+
+    microseconds = (position.created_time - EPOCH) // timedelta(microseconds=1)
+
+    return f"{microseconds}.{position.kind}.{position.id}"
+
+
+def from_cursor(cursor: str) -> Position:
+
+    try:
+        microseconds, kind, pk = cursor.split(".")
+        position = Position(EPOCH + timedelta(microseconds=int(microseconds)), kind, int(pk))
+    except (ValueError, OverflowError):
+        raise ValidationError({"cursor": ["invalid cursor"]})
+
+    if kind not in KINDS:
+        raise ValidationError({"cursor": ["invalid cursor"]})
+
+    return position
+
+
+def stream(kind: str, project_id, after: Position = None):
+    """
+    Entries of one kind, read through their (project, created_time) index from the given position: the range
+    starts at the position time, so that the depth of the page does not matter
+    """
+
+    model, _ = KINDS[kind]
+    queryset = model.objects.filter(project_id=project_id).order_by("-created_time", "-id")
+
+    if after is None:
+        return queryset
+
+    if kind > after.kind:
+        # comes before the position on the same time
+        return queryset.filter(created_time__lt=after.created_time)
+
+    queryset = queryset.filter(created_time__lte=after.created_time)
+
+    if kind == after.kind:
+        return queryset.filter(Q(created_time__lt=after.created_time) | Q(id__lt=after.id))
+
+    return queryset
+
+
+def positioned(kind: str, queryset):
+    return ((Position(instance.created_time, kind, instance.pk), instance) for instance in queryset)
+
+
+def get_activity(project_id, after: Position = None, size: int = 10):
+    """
+    Return a page of the issues and comments of a project, newest first, as (kind, instance) pairs merged from
+    one bounded query per kind, and the position of its last entry if there are more
+    """
+
+    streams = [positioned(kind, stream(kind, project_id, after)[:size + 1]) for kind in KINDS]
+
+    entries = list(islice(heapq.merge(*streams, key=lambda entry: entry[0], reverse=True), size + 1))
+    last = entries[size - 1][0] if len(entries) > size else None
+
+    return [(position.kind, instance) for position, instance in entries[:size]], last
+
+
+def serialize_activity(entries, context=None) -> list:
+    """
+    Timeline entries with the representation of their own serializer
+    """
+
+    return [
+        {"type": kind, "data": KINDS[kind][1](instance, context=context).data}
+        for kind, instance in entries
+    ]
@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class ProjectsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'projects'
+
+    def ready(self):
+        # keep the role matrix up to date
+        from projects import signals  # noqa: F401
+        from projects.roles import check_shared_cache
+
+        check_shared_cache()
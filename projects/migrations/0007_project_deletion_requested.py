@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 12:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0006_contributor_created_time'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='deletion_requested',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.30 on 2026-10-19 13:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0007_project_deletion_requested'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='issue_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='last_activity',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['last_activity'], name='project_activity_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['issue_count'], name='project_issue_count_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-19 13:45
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0001_initial'),
+        ('projects', '0008_project_activity_counters'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='contributor',
+            name='project',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to='projects.project'),
+        ),
+        migrations.AlterField(
+            model_name='contributor',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to='user.softdeskuser'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 13:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0009_shard_foreign_keys'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+    ]
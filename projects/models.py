@@ -1,9 +1,25 @@
 from django.utils.translation import gettext_lazy as _
 from user.models import SoftdeskUser
 from django.db import models
+from sharding.query import ShardedQuerySet
+from api.models import VersionedModel
 
 
-class Project(models.Model):
+def saved_fields(instance, counter_fields) -> set:
+    """
+    Columns written by the save of an existing row: the counters are updated in place by issues.signals,
+    a stale instance would write them back
+    """
+
+    deferred_fields = instance.get_deferred_fields()
+
+    return {
+        field.name for field in instance._meta.concrete_fields
+        if not field.primary_key and field.name not in counter_fields and field.attname not in deferred_fields
+    }
+
+
+class Project(VersionedModel):
 
     class ProjectType(models.TextChoices):
         FRONTEND = "FRONT", _("front-end")
@@ -28,6 +44,21 @@ class Project(models.Model):
 
     created_time = models.DateTimeField(auto_now=True)
 
+    # hides the project while its content is deleted in background, see deletion.worker
+    deletion_requested = models.BooleanField(default=False)
+
+    # activity counters, kept up to date by issues.signals and repaired by `manage.py repair_counters`
+    issue_count = models.PositiveIntegerField(
+        default=0
+    )
+
+    # last save of one of the project issues or comments
+    last_activity = models.DateTimeField(
+        null=True
+    )
+
+    counter_fields = ["issue_count", "last_activity"]
+
     def save(self, *args, **kwargs):
         """
         Override default save method, in order to add auto creation of contributor
@@ -35,6 +66,9 @@ class Project(models.Model):
 
         project_is_being_created = self.pk is None
 
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = saved_fields(self, self.counter_fields)
+
         # apply the regular parent save method
         project = super().save(*args, **kwargs)
 
@@ -48,6 +82,13 @@ class Project(models.Model):
         # parent save method return
         return project
 
+    class Meta:
+        indexes = [
+            # serve the "most active" orderings of the project listing
+            models.Index(fields=["last_activity"], name="project_activity_idx"),
+            models.Index(fields=["issue_count"], name="project_issue_count_idx"),
+        ]
+
 
 class Contributor(models.Model):
     """
@@ -56,25 +97,39 @@ class Contributor(models.Model):
 
     @classmethod
     def is_contributor(self, user_id, project_id):
-        return self.objects.filter(user_id=user_id, project_id=project_id).exists()
+        """
+        Whether the user has a role in the project, read from the role matrix (see projects.roles)
+        """
+        from projects.roles import roles
+        return roles.get_role(user_id, project_id) is not None
 
     @classmethod
     def get_user_projects(self, user_id):
-        return self.objects.filter(user_id=user_id).values_list("project_id", flat=True)
+        """
+        Ids of the projects the user has a role in, read from the role matrix (see projects.roles)
+        """
+        from projects.roles import roles
+        return roles.get_user_projects(user_id)
 
     created_time = models.DateTimeField(
         auto_now=True
     )
 
+    # the users and the projects live on the primary, the contributors on the shard of their project
+    # (see sharding.shards): no database constraint across them
     user = models.ForeignKey(
         to=SoftdeskUser,
-        on_delete=models.CASCADE
+        on_delete=models.CASCADE,
+        db_constraint=False
     )
 
     project = models.ForeignKey(
         to=Project,
         on_delete=models.CASCADE,
+        db_constraint=False
     )
 
+    objects = ShardedQuerySet.as_manager()
+
     class Meta:
         unique_together = ('user', 'project')
@@ -0,0 +1,231 @@
+import os
+import threading
+import time
+from collections import namedtuple
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+
+DEFAULTS = {
+    # seconds after which the whole matrix is reloaded, bounds the staleness when the cache is not shared
+    'MAX_AGE': 300,
+}
+
+# bumped on each committed change, so that the other processes reload their matrix when the cache is shared
+GENERATION_KEY = "project-roles-generation"
+
+# cache backends private to each process
+LOCAL_CACHES = [
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+]
+
+
+def get_setting(name):
+    return getattr(settings, 'PROJECT_ROLES', {}).get(name, DEFAULTS[name])
+
+
+def check_shared_cache():
+    """
+    The cache generation is the only signal between the processes: with several workers (WEB_CONCURRENCY, as
+    read by gunicorn and uvicorn), a process local cache would keep the other workers on a stale matrix
+    """
+
+    workers = int(os.environ.get("WEB_CONCURRENCY", 1))
+
+    if workers > 1 and settings.CACHES["default"]["BACKEND"] in LOCAL_CACHES:
+        raise ImproperlyConfigured("several workers need a cache shared by all of them, see settings.production")
+
+
+def to_id(value):
+    """
+    Primary key from a model instance or a request value, None when it is not an integer
+    """
+
+    try:
+        return int(getattr(value, "pk", value))
+    except (TypeError, ValueError):
+        return None
+
+
+class Role:
+    AUTHOR = "AUTHOR"
+    CONTRIBUTOR = "CONTRIBUTOR"
+
+
+# `hidden` projects are being deleted: they still exist, but nobody has a role in them anymore
+ProjectRoles = namedtuple("ProjectRoles", ["author_id", "members", "hidden"])
+
+
+class RoleMatrix:
+    """
+    In memory `(user_id, project_id) -> role` table, shared by the permission classes and the queryset filters.
+
+    The matrix is loaded on first use, then kept up to date by projects.signals: a changed project is marked
+    dirty, and only the dirty projects are read again on the next access. The checks themselves are dict and
+    set lookups, without any query.
+    """
+
+    def __init__(self):
+
+        self.lock = threading.RLock()
+        self.projects = {}
+        self.user_projects = {}
+        self.dirty = set()
+        self.loaded_time = None
+        self.generation = None
+
+    def get_role(self, user_id, project_id):
+
+        project = self.get_project(project_id)
+
+        if project is None or project.hidden:
+            return None
+
+        if project.author_id == to_id(user_id):
+            return Role.AUTHOR
+
+        if to_id(user_id) in project.members:
+            return Role.CONTRIBUTOR
+
+        return None
+
+    def get_project(self, project_id) -> ProjectRoles:
+
+        project_id = to_id(project_id)
+
+        with self.lock:
+            self.sync()
+
+            if project_id is not None and project_id not in self.projects:
+                # created by another process, whose change may not be signaled yet
+                self.load([project_id])
+
+            return self.projects.get(project_id)
+
+    def project_exists(self, project_id) -> bool:
+        return self.get_project(project_id) is not None
+
+    def get_user_projects(self, user_id) -> list:
+        """
+        Ids of the projects the user has a role in, sorted
+        """
+
+        with self.lock:
+            self.sync()
+            return sorted(self.user_projects.get(to_id(user_id), ()))
+
+    def invalidate(self, *project_ids, using=None):
+        """
+        Read the projects again on next access, and once more when the transaction of the written database
+        is committed, so that a concurrent read of the previous state is not kept
+        """
+
+        with self.lock:
+            self.dirty.update(project_ids)
+
+        transaction.on_commit(lambda: self.committed(project_ids), using=using)
+
+    def forget_user(self, user_id, using=None):
+        """
+        Read again all the projects the user had a role in
+        """
+
+        with self.lock:
+            self.invalidate(*(
+                project_id for project_id, project in self.projects.items()
+                if project.author_id == user_id or user_id in project.members
+            ), using=using)
+
+    def reload(self):
+        """
+        Read the whole matrix again on next access, after a rollback of changes it may have read
+        """
+
+        with self.lock:
+            self.loaded_time = None
+
+    def committed(self, project_ids):
+
+        try:
+            generation = cache.incr(GENERATION_KEY)
+        except ValueError:
+            generation = 1
+            cache.set(GENERATION_KEY, generation, timeout=None)
+
+        with self.lock:
+            self.dirty.update(project_ids)
+
+            # any other increment comes from another process, whose changes need a full reload
+            if self.generation is not None and generation == self.generation + 1:
+                self.generation = generation
+
+    def sync(self):
+
+        generation = cache.get(GENERATION_KEY, 0)
+
+        expired = self.loaded_time is None or time.monotonic() - self.loaded_time > get_setting('MAX_AGE')
+
+        if expired or generation != self.generation:
+            self.load()
+            self.generation = generation
+
+        elif self.dirty:
+            self.load(self.dirty)
+
+    def load(self, project_ids=None):
+        """
+        Read the given projects from the database, or all the projects
+        """
+
+        from projects.models import Project, Contributor
+
+        projects = Project.objects.all()
+        # one query per shard, see sharding.shards
+        contributors = Contributor.objects.on_all_shards()
+
+        if project_ids is None:
+            self.projects, self.user_projects = {}, {}
+            self.loaded_time = time.monotonic()
+        else:
+            project_ids = list(project_ids)
+
+            for project_id in project_ids:
+                self.remove(project_id)
+
+            projects = projects.filter(pk__in=project_ids)
+            contributors = Contributor.objects.for_projects(project_ids)
+
+        self.dirty.clear()
+
+        members = {}
+
+        for project_id, user_id in contributors.values_list("project_id", "user_id"):
+            members.setdefault(project_id, set()).add(user_id)
+
+        for project_id, author_id, hidden in projects.values_list("pk", "author_id", "deletion_requested"):
+            self.add(project_id, ProjectRoles(author_id, frozenset(members.get(project_id, ())), hidden))
+
+    def add(self, project_id, project: ProjectRoles):
+
+        self.projects[project_id] = project
+
+        if project.hidden:
+            return
+
+        for user_id in project.members | {project.author_id}:
+            self.user_projects.setdefault(user_id, set()).add(project_id)
+
+    def remove(self, project_id):
+
+        project = self.projects.pop(project_id, None)
+
+        if project is None:
+            return
+
+        for user_id in project.members | {project.author_id}:
+            self.user_projects.get(user_id, set()).discard(project_id)
+
+
+roles = RoleMatrix()
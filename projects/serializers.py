@@ -29,6 +29,10 @@ class ProjectSerializer(serializers.ModelSerializer):
     class Meta:
         model = Project
         fields = "__all__"
+        # kept up to date by issues.signals, and by deletion.worker for deletion_requested
+        read_only_fields = ["issue_count", "last_activity", "deletion_requested"]
+        # nested by to_representation(), see api.fast_list
+        fast_nested = {"author": SoftdeskUserSerializer}
 
 
 class ContributorSerializer(serializers.ModelSerializer):
@@ -53,6 +57,8 @@ class ContributorSerializer(serializers.ModelSerializer):
     class Meta:
         model = Contributor
         fields = "__all__"
+        # nested by to_representation(), see api.fast_list
+        fast_nested = {"project": ProjectSerializer, "user": SoftdeskUserSerializer}
         validators = [
             serializers.UniqueTogetherValidator(
                 queryset=Contributor.objects.all(),
@@ -0,0 +1,39 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from projects.models import Project, Contributor
+from projects.roles import roles
+from user.models import SoftdeskUser
+
+
+@receiver(post_save, sender=Project)
+def project_saved(sender, instance: Project, created, using, **kwargs):
+
+    # the author of a project can not be updated, see ProjectSerializer.validate_author
+    if created:
+        roles.invalidate(instance.pk, using=using)
+
+
+@receiver(post_delete, sender=Project)
+def project_deleted(sender, instance: Project, using, **kwargs):
+    roles.invalidate(instance.pk, using=using)
+
+
+@receiver(post_save, sender=Contributor)
+def contributor_saved(sender, instance: Contributor, created, using, **kwargs):
+
+    # written to the shard of the project, see sharding.router
+    if created:
+        roles.invalidate(instance.project_id, using=using)
+
+
+@receiver(post_delete, sender=Contributor)
+def contributor_deleted(sender, instance: Contributor, using, **kwargs):
+    roles.invalidate(instance.project_id, using=using)
+
+
+@receiver(post_save, sender=SoftdeskUser)
+def user_created(sender, instance: SoftdeskUser, created, using, **kwargs):
+
+    # a new user has no role yet: drop what a rolled back user of the same id may have left
+    if created:
+        roles.forget_user(instance.pk, using=using)
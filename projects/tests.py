@@ -1,7 +1,14 @@
+import os
+from unittest.mock import patch
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase
 from rest_framework.test import APITestCase
 from rest_framework_simplejwt.tokens import AccessToken
 from user.models import SoftdeskUser
 from projects.models import Project, Contributor
+from projects.roles import check_shared_cache, roles, Role
+from issues.models import Issue, Comment
+from deletion.worker import schedule_project_deletion
 from settings import settings
 
 
@@ -166,6 +173,116 @@ class TestProject(APITestCase):
         response = self.client.get("/projects/1/")
         self.assertEqual(response.status_code, 404)
 
+    def test_get_projects_by_activity(self):
+
+        other_project = Project.objects.create(
+            description="other_project",
+            type="BACK",
+            author=self.project_author
+        )
+
+        for i in range(2):
+            Issue.objects.create(
+                tag="BUG",
+                title=f"issue {i}",
+                project=other_project,
+                author=self.project_author
+            )
+
+        self.authenticate(self.project_author)
+
+        response = self.client.get("/projects/?ordering=-issue_count")
+        self.assertEqual([project["id"] for project in response.json()["results"]], [other_project.pk, self.project.pk])
+        self.assertEqual(response.json()["results"][0]["issue_count"], 2)
+
+        Issue.objects.create(tag="BUG", title="latest issue", project=self.project, author=self.project_author)
+
+        response = self.client.get("/projects/?ordering=-last_activity")
+        self.assertEqual([project["id"] for project in response.json()["results"]], [self.project.pk, other_project.pk])
+
+        response = self.client.get("/projects/?ordering=description")
+        self.assertEqual(response.status_code, 400)
+
+    def test_get_project_activity(self):
+
+        issue = Issue.objects.create(tag="BUG", title="issue", project=self.project, author=self.project_author)
+
+        for i in range(11):
+            Comment.objects.create(issue=issue, author=self.project_author, description=f"comment {i}")
+
+        # not part of the timeline
+        other_project = Project.objects.create(description="other_project", type="BACK", author=self.project_author)
+        Issue.objects.create(tag="BUG", title="other issue", project=other_project, author=self.project_author)
+
+        self.authenticate(self.project_contributor)
+
+        response = self.client.get(f"/projects/{self.project.pk}/activity/")
+        self.assertEqual(response.status_code, 200)
+
+        first_page = response.json()["results"]
+        self.assertEqual(len(first_page), 10)
+        self.assertEqual(first_page[0], {"type": "comment", "data": first_page[0]["data"]})
+        self.assertEqual(first_page[0]["data"]["description"], "comment 10")
+
+        # new entries do not shift the next pages
+        Comment.objects.create(issue=issue, author=self.project_author, description="late comment")
+
+        # the authenticated user, then one query per kind
+        with self.assertNumQueries(3):
+            response = self.client.get(response.json()["next"])
+
+        second_page = response.json()["results"]
+        self.assertEqual([entry["type"] for entry in second_page], ["comment", "issue"])
+        self.assertEqual(second_page[0]["data"]["description"], "comment 0")
+        self.assertEqual(second_page[1]["data"]["title"], "issue")
+        self.assertIsNone(response.json()["next"])
+
+        response = self.client.get(f"/projects/{self.project.pk}/activity/?cursor=invalid")
+        self.assertEqual(response.status_code, 400)
+
+        self.authenticate(self.random_user)
+        response = self.client.get(f"/projects/{self.project.pk}/activity/")
+        self.assertEqual(response.status_code, 404)
+
+    def test_get_project_issues(self):
+
+        other_project = Project.objects.create(
+            description="other_project",
+            type="BACK",
+            author=self.project_author
+        )
+
+        for project, title in [(self.project, "issue1"), (self.project, "issue2"), (other_project, "issue3")]:
+            Issue.objects.create(
+                tag="BUG",
+                title=title,
+                project=project,
+                author=self.project_author
+            )
+
+        self.authenticate(self.project_contributor)
+
+        response = self.client.get(f"/projects/{self.project.pk}/issues/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["count"], 2)
+
+        # same filters as the /issues/ route
+        response = self.client.get(f"/projects/{self.project.pk}/issues/?title=issue2")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["count"], 1)
+
+        response = self.client.get(f"/projects/{self.project.pk}/issues/?ordering=-last_activity")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["results"][0]["title"], "issue2")
+
+        # not index served on the archive
+        response = self.client.get(f"/projects/{self.project.pk}/issues/?archived=true&ordering=-comment_count")
+        self.assertEqual(response.status_code, 400)
+
+        # the contributor is not a member of the other project
+        response = self.client.get(f"/projects/{other_project.pk}/issues/")
+        self.assertEqual(response.status_code, 404)
+
     # UPDATE
     def test_update_project_from_author(self):
 
@@ -206,6 +323,31 @@ class TestProject(APITestCase):
 
         self.assertEqual(response.status_code, 404, response.json())
 
+    def test_update_project_if_match(self):
+
+        self.authenticate(self.project_author)
+
+        response = self.client.patch("/projects/1/", data={"type": "BACK"}, HTTP_IF_MATCH='"1"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["ETag"], '"2"')
+
+        # the permissions are checked first
+        self.authenticate(self.project_contributor)
+        response = self.client.patch("/projects/1/", data={"type": "FRONT"}, HTTP_IF_MATCH='"1"')
+        self.assertEqual(response.status_code, 403)
+
+        self.authenticate(self.project_author)
+        response = self.client.patch("/projects/1/", data={"type": "FRONT"}, HTTP_IF_MATCH='"1"')
+        self.assertEqual(response.status_code, 412)
+        self.assertEqual(Project.objects.get(pk=1).type, "BACK")
+
+        response = self.client.delete("/projects/1/?async=true", HTTP_IF_MATCH='"1"')
+        self.assertEqual(response.status_code, 412)
+        self.assertFalse(Project.objects.get(pk=1).deletion_requested)
+
+        response = self.client.delete("/projects/1/?async=true", HTTP_IF_MATCH='"2"')
+        self.assertEqual(response.status_code, 202)
+
     def test_update_forbidden_datas(self):
 
         self.authenticate(self.project_author)
@@ -216,6 +358,15 @@ class TestProject(APITestCase):
         self.assertEqual(response.status_code, 400)
         self.assertEqual(response.json(), {'author': ['update the project author is not allowed']}, response.json())
 
+        # hidden by the deletions only, see deletion.worker
+        response = self.client.patch("/projects/1/", data={"deletion_requested": True})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.json()["deletion_requested"])
+        self.assertFalse(Project.objects.get(pk=1).deletion_requested)
+
+        response = self.client.get("/projects/1/")
+        self.assertEqual(response.status_code, 200)
+
     # DELETE
     def test_delete_project_from_author(self):
 
@@ -538,3 +689,82 @@ class TestProjectsIntegration(APITestCase):
 
         self.assertEqual(response.status_code, 204)
         self.assertFalse(Contributor.objects.filter(pk=contributor_to_remove).exists())
+
+
+class TestRoleMatrix(TestCase):
+
+    def setUp(self) -> None:
+
+        self.author = SoftdeskUser.objects.create_user(
+            username="author",
+            password="password",
+            age=27,
+        )
+
+        self.contributor = SoftdeskUser.objects.create_user(
+            username="contributor",
+            password="password",
+            age=27,
+        )
+
+        self.project = Project.objects.create(
+            description="project",
+            type="FRONT",
+            author=self.author
+        )
+
+    def test_roles(self):
+
+        self.assertEqual(roles.get_role(self.author.pk, self.project.pk), Role.AUTHOR)
+        self.assertIsNone(roles.get_role(self.contributor.pk, self.project.pk))
+
+        # the checks of a loaded matrix do not query the database
+        with self.assertNumQueries(0):
+            self.assertEqual(roles.get_user_projects(self.author.pk), [self.project.pk])
+            self.assertEqual(roles.get_role(str(self.author.pk), str(self.project.pk)), Role.AUTHOR)
+            self.assertIsNone(roles.get_role(self.author.pk, "unknown"))
+
+    def test_project_of_another_process(self):
+
+        self.assertEqual(roles.get_role(self.author.pk, self.project.pk), Role.AUTHOR)
+
+        # no signal: written by another process, whose cache is not shared
+        project = Project.objects.bulk_create([Project(description="other", type="BACK", author=self.author)])[0]
+
+        self.assertEqual(roles.get_role(self.author.pk, project.pk), Role.AUTHOR)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(roles.get_role(self.author.pk, project.pk), Role.AUTHOR)
+
+    def test_shared_cache_check(self):
+
+        locmem = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+        shared = {"default": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": "/tmp"}}
+
+        with self.settings(CACHES=locmem):
+            check_shared_cache()
+
+            with patch.dict(os.environ, {"WEB_CONCURRENCY": "4"}):
+                self.assertRaises(ImproperlyConfigured, check_shared_cache)
+
+        with self.settings(CACHES=shared), patch.dict(os.environ, {"WEB_CONCURRENCY": "4"}):
+            check_shared_cache()
+
+    def test_incremental_updates(self):
+
+        contributor = Contributor.objects.create(project=self.project, user=self.contributor)
+
+        self.assertEqual(roles.get_role(self.contributor.pk, self.project.pk), Role.CONTRIBUTOR)
+        self.assertEqual(roles.get_user_projects(self.contributor.pk), [self.project.pk])
+
+        contributor.delete()
+
+        self.assertIsNone(roles.get_role(self.contributor.pk, self.project.pk))
+        self.assertEqual(roles.get_user_projects(self.contributor.pk), [])
+
+        # the projects being deleted are hidden, but still exist
+        schedule_project_deletion(self.project, self.author)
+
+        self.assertIsNone(roles.get_role(self.author.pk, self.project.pk))
+        self.assertTrue(roles.project_exists(self.project.pk))
+        self.assertEqual(roles.get_user_projects(self.author.pk), [])
@@ -1,8 +1,24 @@
 from rest_framework import viewsets, permissions
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
 from projects.serializers import ProjectSerializer, ContributorSerializer
 from projects.models import Project, Contributor
+from api.fast_list import FastListMixin
+from api.batch_retrieve import BatchRetrieveMixin
+from api.idempotency import IdempotentCreateMixin
+from api.authorization import ProjectRoleMixin
+from api.concurrency import ConditionalUpdateMixin
+from projects.roles import roles, Role
+from projects.activity import get_activity, serialize_activity, from_cursor, to_cursor
+from issues.models import Issue, ArchivedIssue
+from issues.serializers import IssueSerializer, ArchivedIssueSerializer
+from issues.views import IssueViewSet
+from deletion.serializers import DeletionJobSerializer
+from deletion.worker import schedule_project_deletion
 from rest_framework import status
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
 
 
 class ProjectPermission(permissions.BasePermission):
@@ -10,7 +26,7 @@ class ProjectPermission(permissions.BasePermission):
     def has_permission(self, request, view):
 
         author_id = request.data.get("author")
-        create_for_himself = str(request.user.pk) == author_id
+        create_for_himself = str(request.user.pk) == str(author_id)
 
         if request.method in ["GET", "PATCH", "DELETE"]:
             # will be handled in ProjectPermission.has_object_permission() or in IssueViewSet.get_queryset()
@@ -24,13 +40,11 @@ class ProjectPermission(permissions.BasePermission):
 
     def has_object_permission(self, request, view, project: Project):
 
-        is_author = project.author.pk == request.user.pk
-        is_contributor = Contributor.objects.filter(user_id=request.user.pk, project_id=project.id).exists()
-
+        # role set by ProjectViewSet.get_object()
         if request.method in permissions.SAFE_METHODS:
-            return is_contributor
+            return project.role is not None
         else:
-            return is_author
+            return project.role == Role.AUTHOR
 
 
 class ContributorPermission(permissions.BasePermission):
@@ -40,12 +54,10 @@ class ContributorPermission(permissions.BasePermission):
         if request.method in ["POST"]:
 
             project_id = request.data.get("project")
-            project = Project.objects.filter(pk=project_id)
 
-            if project.exists():
+            if roles.project_exists(project_id):
                 # the user who tries to create a contributor must be the project author
-                user_is_author = project[0].author.pk == request.user.pk
-                return user_is_author
+                return roles.get_role(request.user.pk, project_id) == Role.AUTHOR
 
             else:
                 # the post request will fail if no project is specified
@@ -58,12 +70,13 @@ class ContributorPermission(permissions.BasePermission):
             return True
 
         if request.method == "DELETE":
-            return obj.project.author.pk == request.user.pk
+            # role set by ContributorViewSet.get_object()
+            return obj.role == Role.AUTHOR
 
         return False
 
 
-class ProjectViewSet(viewsets.ModelViewSet):
+class ProjectViewSet(ConditionalUpdateMixin, ProjectRoleMixin, BatchRetrieveMixin, FastListMixin, viewsets.ModelViewSet):
 
     queryset = Project.objects.all().order_by("id")
     serializer_class = ProjectSerializer
@@ -71,14 +84,17 @@ class ProjectViewSet(viewsets.ModelViewSet):
         permissions.IsAuthenticated,
         ProjectPermission
     ]
+    project_id_field = "id"
+
+    # the "most active" orderings are read through the last_activity and issue_count indexes of Project
+    ORDERINGS = ["created_time", "-last_activity", "-issue_count"]
 
     def get_queryset(self):
         """
         Override queryset getter, in order to add custom filters
         """
 
-        user = self.request.user
-        contributor_projects = Contributor.objects.filter(user=user).values_list("project_id", flat=True)
+        contributor_projects = Contributor.get_user_projects(self.request.user.pk)
         self.queryset = Project.objects.filter(id__in=contributor_projects)
 
         description = self.request.GET.get("description", None)
@@ -86,10 +102,81 @@ class ProjectViewSet(viewsets.ModelViewSet):
         if description is not None:
             self.queryset = self.queryset.filter(description=description)
 
-        return self.queryset.order_by("created_time")
+        ordering = self.request.GET.get("ordering", "created_time")
+
+        if ordering not in ProjectViewSet.ORDERINGS:
+            raise ValidationError({"ordering": [f"expected one of {', '.join(ProjectViewSet.ORDERINGS)}"]})
+
+        return self.queryset.order_by(ordering, "id")
+
+    def destroy(self, request, *args, **kwargs):
+        """
+        With ?async=true, hide the project and delete its content in background instead
+        """
+
+        if request.GET.get("async") != "true":
+            return super().destroy(request, *args, **kwargs)
+
+        job = schedule_project_deletion(self.get_object(), request.user)
+
+        return Response(DeletionJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=["get"])
+    def issues(self, request, pk=None):
+        """
+        List the issues of a single project: the caller membership is checked once,
+        then the issues are read through the (project, created_time) index
+        """
+
+        if not Contributor.is_contributor(request.user.pk, pk):
+            raise NotFound()
+
+        if request.GET.get("archived") == "true":
+            # the activity counters of the archive are not indexed
+            issue_model, issue_serializer, orderings = ArchivedIssue, ArchivedIssueSerializer, IssueViewSet.ORDERINGS
+        else:
+            issue_model, issue_serializer, orderings = Issue, IssueSerializer, IssueViewSet.PROJECT_ORDERINGS
+
+        # read from the shard of the project
+        queryset = IssueViewSet.filter_issues(issue_model.objects.filter(project_id=pk), request.GET, orderings)
+
+        response = self.fast_list(queryset, issue_serializer)
+
+        if response is not None:
+            return response
+
+        page = self.paginate_queryset(queryset)
+        serializer = issue_serializer(page, many=True, context=self.get_serializer_context())
+
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=True, methods=["get"])
+    def activity(self, request, pk=None):
+        """
+        Issues and comments of a single project, newest first (created_time is refreshed on each save).
+        Paginated by an opaque `cursor`: each page costs one index range read per kind, whatever its depth
+        """
+
+        if not Contributor.is_contributor(request.user.pk, pk):
+            raise NotFound()
+
+        cursor = request.GET.get("cursor")
+        after = from_cursor(cursor) if cursor else None
+
+        entries, last = get_activity(pk, after, api_settings.PAGE_SIZE)
+
+        next_url = None
+
+        if last is not None:
+            next_url = replace_query_param(request.build_absolute_uri(), "cursor", to_cursor(last))
+
+        return Response({
+            "next": next_url,
+            "results": serialize_activity(entries, self.get_serializer_context()),
+        })
 
 
-class ContributorViewSet(viewsets.ModelViewSet):
+class ContributorViewSet(IdempotentCreateMixin, ProjectRoleMixin, BatchRetrieveMixin, FastListMixin, viewsets.ModelViewSet):
 
     queryset = Contributor.objects.all().order_by("user_id")
     serializer_class = ContributorSerializer
@@ -101,7 +188,8 @@ class ContributorViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
 
         user_accessible_projects = Contributor.get_user_projects(self.request.user.pk)
-        user_accessible_contributors = Contributor.objects.filter(project_id__in=user_accessible_projects)
+        # merged from the shards of the projects, see sharding.query
+        user_accessible_contributors = Contributor.objects.for_projects(user_accessible_projects)
 
         self.queryset = user_accessible_contributors
 
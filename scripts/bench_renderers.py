@@ -0,0 +1,50 @@
+from rest_framework.renderers import JSONRenderer
+from projects.models import Contributor
+from projects.serializers import ContributorSerializer
+from issues.models import Issue
+from issues.serializers import IssueSerializer
+from api import renderers
+from api.renderers import FastJSONRenderer, MessagePackRenderer
+from unittest.mock import patch
+import timeit
+
+PAGE_SIZE = 100
+REPEAT = 200
+
+
+def bench(label, data, render):
+
+    size = len(render(data))
+    seconds = min(timeit.repeat(lambda: render(data), number=REPEAT, repeat=5)) / REPEAT
+
+    print(f"    {label:<28}{seconds * 1e6:>10.1f} us/page{size:>10} bytes")
+
+
+def bench_page(name, data):
+
+    print(f"{name} page ({len(data)} rows)")
+
+    bench("drf json", data, JSONRenderer().render)
+    bench("fast json", data, FastJSONRenderer().render)
+    bench("msgpack", data, MessagePackRenderer().render)
+
+    with patch.object(renderers, "msgpack", None):
+        bench("msgpack (pure python)", data, MessagePackRenderer().render)
+
+
+def run(*args):
+    """
+    Compare the render cost of serialized pages, on the current database:
+
+        pipenv run python ./manage.py runscript bench_renderers [--script-args PAGE_SIZE]
+    """
+
+    page_size = int(args[0]) if args else PAGE_SIZE
+
+    issues = IssueSerializer(Issue.objects.order_by("id")[:page_size], many=True).data
+    contributors = ContributorSerializer(Contributor.objects.order_by("id")[:page_size], many=True).data
+
+    print(f"orjson: {renderers.orjson is not None}, msgpack: {renderers.msgpack is not None}")
+
+    bench_page("IssueSerializer", issues)
+    bench_page("ContributorSerializer", contributors)
@@ -0,0 +1,139 @@
+"""
+Compare the settings profiles: cold start, per request overhead and resident memory.
+
+    DJANGO_SECRET_KEY=... pipenv run python ./scripts/bench_settings.py [settings.settings settings.production]
+
+Each profile is measured in fresh processes, on a copy of the database.
+"""
+from pathlib import Path
+import json
+import os
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = Path(__file__).parent.parent
+PROFILES = ["settings.settings", "settings.production"]
+STARTS = 7
+# best of REPEAT rounds of REQUESTS requests, below the default throttling rate
+REPEAT = 3
+REQUESTS = 150
+URLS = ["/issues/", "/projects/", "/users/{user_id}/"]
+
+
+def child(profile: str, measure_requests: bool):
+    """
+    Run in the measured process: print the setup time, the request times and the peak resident memory
+    """
+
+    start = time.perf_counter()
+
+    import django
+    from django.conf import settings
+
+    # the development profile has no database setting
+    settings.DATABASES["default"]["NAME"] = os.environ["DJANGO_DB_PATH"]
+    django.setup()
+
+    from django.core.handlers.wsgi import WSGIHandler
+    handler = WSGIHandler()
+
+    import settings.urls  # noqa: F401
+    setup = time.perf_counter() - start
+
+    requests = {}
+
+    if measure_requests:
+
+        from django.test import Client
+        from rest_framework_simplejwt.tokens import AccessToken
+        from user.models import SoftdeskUser
+
+        user = SoftdeskUser.objects.order_by("pk").first()
+        client = Client(SERVER_NAME="localhost", HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}")
+
+        for url in URLS:
+
+            # warm up the caches
+            client.get(url.format(user_id=user.pk))
+
+            rounds = []
+
+            for round in range(REPEAT):
+
+                start = time.perf_counter()
+
+                for i in range(REQUESTS):
+                    response = client.get(url.format(user_id=user.pk))
+
+                rounds.append((time.perf_counter() - start) / REQUESTS)
+
+            requests[url] = min(rounds)
+            assert response.status_code == 200, (url, response.status_code)
+
+    del handler
+
+    print(json.dumps({
+        "setup": setup,
+        "requests": requests,
+        "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }))
+
+
+def get_env(profile: str, database: str) -> dict:
+    return {
+        **os.environ,
+        "DJANGO_SETTINGS_MODULE": profile,
+        "DJANGO_SECRET_KEY": os.environ.get("DJANGO_SECRET_KEY", "bench-settings-secret-key"),
+        "DJANGO_DB_PATH": database,
+        "PYTHONPATH": str(ROOT),
+    }
+
+
+def measure(profile: str, database: str, measure_requests: bool) -> dict:
+
+    command = [sys.executable, __file__, "--child", profile] + (["--requests"] if measure_requests else [])
+    output = subprocess.run(
+        command, env=get_env(profile, database), cwd=ROOT, check=True, capture_output=True, text=True
+    ).stdout
+
+    return json.loads(output.splitlines()[-1])
+
+
+def run(*profiles):
+
+    profiles = profiles or PROFILES
+
+    with tempfile.TemporaryDirectory() as directory:
+
+        database = str(Path(directory, "db.sqlite3"))
+        shutil.copy(Path(ROOT, "db.sqlite3"), database)
+
+        subprocess.run(
+            [sys.executable, "manage.py", "migrate", "--verbosity", "0"],
+            env=get_env("settings.production", database), cwd=ROOT, check=True
+        )
+
+        print(f"{'profile':<24}{'cold start':>12}{'max rss':>12}" + "".join(f"{url:>20}" for url in URLS))
+
+        for profile in profiles:
+
+            setups = [measure(profile, database, False)["setup"] for i in range(STARTS)]
+            result = measure(profile, database, True)
+
+            print(
+                f"{profile:<24}{statistics.median(setups) * 1000:>10.0f}ms{result['max_rss_kb'] / 1024:>10.1f}MB"
+                + "".join(f"{result['requests'][url] * 1e6:>18.0f}us" for url in URLS)
+            )
+
+
+if __name__ == "__main__":
+
+    if sys.argv[1:2] == ["--child"]:
+        child(sys.argv[2], "--requests" in sys.argv)
+    else:
+        run(*sys.argv[1:])
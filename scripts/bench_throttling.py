@@ -0,0 +1,32 @@
+from api.throttling import MemoryBuckets, SharedMemoryBuckets
+from multiprocessing import resource_tracker
+import itertools
+import time
+import timeit
+
+REPEAT = 100000
+USERS = 1000
+
+
+def bench(label, buckets):
+
+    keys = itertools.cycle([f"user:{i}:issue.list" for i in range(USERS)])
+    seconds = min(timeit.repeat(lambda: buckets.take(next(keys), 600, 10.0, time.monotonic()), number=REPEAT, repeat=5))
+
+    print(f"    {label:<20}{seconds / REPEAT * 1e6:>8.2f} us/request")
+
+
+def run(*args):
+    """
+    Measure the cost of a throttling decision, for each bucket backend:
+
+        pipenv run python ./manage.py runscript bench_throttling
+    """
+
+    bench("memory", MemoryBuckets())
+
+    buckets = SharedMemoryBuckets("softdesk-throttling-bench", 65536)
+    bench("shared_memory", buckets)
+
+    resource_tracker.register(buckets.memory._name, "shared_memory")
+    buckets.memory.unlink()
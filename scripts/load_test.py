@@ -0,0 +1,382 @@
+"""
+Scenario load test of a running server, driven by the requests of the Postman collection:
+
+    pipenv run python ./manage.py runserver --noreload
+    pipenv run python ./manage.py runscript load_test --script-args "--stages 10:30 50:60 50:60"
+
+Each virtual user logs in with one of the users of `dummy_data`, then loops over weighted scenarios.
+The stages ramp the number of virtual users linearly to their target over their duration ("users:seconds").
+The results are printed per step, and saved as JSON to be compared with `--compare previous.json`.
+"""
+from http.client import HTTPConnection
+from pathlib import Path
+from urllib.parse import urlencode, urlsplit
+import argparse
+import json
+import random
+import re
+import threading
+import time
+
+ROOT = Path(__file__).parent.parent
+COLLECTION = Path(ROOT, "OC-P10.postman_collection.json")
+USERNAMES = Path(Path(__file__).parent, "data", "users.json")
+RESULTS = Path(Path(__file__).parent, "load_results")
+
+PASSWORD = "password"
+
+# requests of the write flows, not described by the collection
+EXTRA_REQUESTS = {
+    "Find user": ("GET", "{{root}}/users/?username={{other_username}}", None),
+    "Create project": ("POST", "{{root}}/projects/", {"description": "load test", "type": "BACK", "author": "{{user_id}}"}),
+    "Add contributor": ("POST", "{{root}}/contributors/", {"project": "{{project_id}}", "user": "{{other_user_id}}"}),
+    "Create issue": ("POST", "{{root}}/issues/", {
+        "title": "load test", "tag": "BUG", "project": "{{project_id}}", "author": "{{user_id}}"
+    }),
+    "Comment issue": ("POST", "{{root}}/comments/", {
+        "description": "load test", "issue": "{{issue_id}}", "author": "{{user_id}}"
+    }),
+}
+
+# (weight, steps): the steps are request names, of the collection or of EXTRA_REQUESTS
+SCENARIOS = {
+    "browse": (6, ["Get projects", "Get contributors", "Get issues", "Get comments", "Get users"]),
+    "contribute": (3, ["Find user", "Create project", "Add contributor", "Create issue", "Comment issue"]),
+    "register": (1, ["Register", "Get access token"]),
+}
+
+PERCENTILES = [50, 90, 95, 99]
+
+
+def load_collection(path: Path) -> dict:
+    """
+    Return the collection requests by name: (method, url template, form data or None)
+    """
+
+    with open(path, "rb") as reader:
+        collection = json.loads(reader.read())
+
+    requests = {}
+
+    def walk(items):
+        for item in items:
+
+            if "item" in item:
+                walk(item["item"])
+                continue
+
+            request = item["request"]
+            url = request["url"]["raw"] if isinstance(request["url"], dict) else request["url"]
+            body = request.get("body", {})
+
+            data = {field["key"]: field["value"] for field in body.get("formdata", []) if not field.get("disabled")}
+
+            requests[item["name"]] = (request["method"], url, data or None)
+
+    walk(collection["item"])
+
+    return requests
+
+
+def render(template: str, variables: dict) -> str:
+    return re.sub(r"{{(\w+)}}", lambda match: str(variables[match.group(1)]), template)
+
+
+class Results:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.errors = {}
+        self.statuses = {}
+
+    def add(self, step: str, seconds: float, status: int):
+
+        with self.lock:
+            self.latencies.setdefault(step, []).append(seconds)
+            self.statuses.setdefault(step, {}).setdefault(str(status), 0)
+            self.statuses[step][str(status)] += 1
+
+            if not 200 <= status < 300:
+                self.errors[step] = self.errors.get(step, 0) + 1
+
+    def summary(self, duration: float) -> dict:
+
+        steps = {}
+
+        for step, latencies in self.latencies.items():
+
+            latencies = sorted(latencies)
+            count = len(latencies)
+
+            steps[step] = {
+                "count": count,
+                "throughput": count / duration,
+                "error_rate": self.errors.get(step, 0) / count,
+                "statuses": self.statuses[step],
+                "max_ms": latencies[-1] * 1000,
+                **{
+                    f"p{p}_ms": latencies[min(count - 1, int(count * p / 100))] * 1000
+                    for p in PERCENTILES
+                },
+            }
+
+        total = sum(step["count"] for step in steps.values())
+        errors = sum(self.errors.values())
+
+        return {
+            "duration": duration,
+            "requests": total,
+            "throughput": total / duration,
+            "error_rate": errors / total if total else 0,
+            "steps": steps,
+        }
+
+
+class VirtualUser(threading.Thread):
+    """
+    Logs in once, then runs weighted random scenarios over a persistent connection while it is active
+    """
+
+    def __init__(self, index: int, test):
+
+        super().__init__(daemon=True)
+
+        self.index = index
+        self.test = test
+        self.connection = None
+        self.variables = dict(test.variables)
+
+    def request(self, step: str, record: bool = True, **overrides):
+
+        method, url, data = self.test.requests[step]
+
+        url = urlsplit(render(url, self.variables))
+        path = url.path.replace("//", "/") + (f"?{url.query}" if url.query else "")
+        data = {**{key: render(value, self.variables) for key, value in (data or {}).items()}, **overrides}
+        body = urlencode(data) if data else None
+
+        headers = {"Accept": "application/json"}
+
+        if body is not None:
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+
+        if self.variables.get("token"):
+            headers["Authorization"] = f"Bearer {self.variables['token']}"
+
+        start = time.perf_counter()
+
+        try:
+            if self.connection is None:
+                self.connection = HTTPConnection(url.hostname, url.port, timeout=30)
+
+            self.connection.request(method, path, body=body, headers=headers)
+            response = self.connection.getresponse()
+            content = response.read()
+            status = response.status
+
+        except OSError:
+            self.connection = None
+            content, status = b"", 0
+
+        if record:
+            self.test.results.add(step, time.perf_counter() - start, status)
+
+        try:
+            return status, json.loads(content) if content else None
+        except ValueError:
+            return status, None
+
+    def login(self, username: str) -> bool:
+
+        self.variables.update(username=username, password=PASSWORD, token="")
+
+        status, data = self.request("Get access token")
+
+        if status != 200:
+            return False
+
+        self.variables["token"] = data["access"]
+        self.variables["user_id"] = self.test.user_ids.get(username)
+
+        return True
+
+    def run_scenario(self, name: str):
+
+        # the register scenario logs in as the new user, the virtual user gets its session back afterwards
+        session = dict(self.variables)
+
+        for step in SCENARIOS[name][1]:
+
+            overrides = {}
+
+            if step == "Register":
+                # the collection registers a fixed username
+                self.variables.update(username=f"load-{self.index}-{time.monotonic_ns()}", token="")
+                overrides["username"] = self.variables["username"]
+
+            if step == "Find user":
+                self.variables["other_username"] = random.choice(
+                    [username for username in self.test.usernames if username != session["username"]]
+                )
+
+            status, data = self.request(step, **overrides)
+
+            if not 200 <= status < 300:
+                # the next steps depend on this one
+                break
+
+            if step == "Get access token":
+                self.variables["token"] = data["access"]
+            elif step == "Find user":
+                self.variables["other_user_id"] = data["results"][0]["id"]
+            elif step == "Create project":
+                self.variables["project_id"] = data["id"]
+            elif step == "Create issue":
+                self.variables["issue_id"] = data["id"]
+
+        self.variables = session
+
+    def run(self):
+
+        if not self.login(self.test.usernames[self.index % len(self.test.usernames)]):
+            return
+
+        names = list(SCENARIOS)
+        weights = [SCENARIOS[name][0] for name in names]
+
+        while not self.test.stopped.is_set():
+
+            # ramped down: idle until the target grows again
+            if self.index >= self.test.target:
+                time.sleep(0.1)
+                continue
+
+            self.run_scenario(random.choices(names, weights)[0])
+
+
+class LoadTest:
+
+    def __init__(self, root: str, stages: list):
+
+        self.requests = {**load_collection(COLLECTION), **EXTRA_REQUESTS}
+        self.variables = {"root": root.rstrip("/")}
+        self.stages = stages
+        self.results = Results()
+        self.stopped = threading.Event()
+        self.target = 0
+
+        with open(USERNAMES, "rb") as reader:
+            self.usernames = json.loads(reader.read())
+
+        self.user_ids = {}
+
+    def resolve_user_ids(self):
+        """
+        Ids of the dummy users, the authors of the created resources
+        """
+
+        user = VirtualUser(0, self)
+
+        if not user.login(self.usernames[0]):
+            raise SystemExit("login failed, are the dummy data loaded (runscript dummy_data)?")
+
+        for username in self.usernames:
+            user.variables["other_username"] = username
+            status, data = user.request("Find user", record=False)
+
+            if status == 200 and data["results"]:
+                self.user_ids[username] = data["results"][0]["id"]
+
+    def run(self) -> dict:
+
+        self.resolve_user_ids()
+        self.results = Results()
+
+        users = []
+        start = time.monotonic()
+        previous = 0
+
+        for target, seconds in self.stages:
+
+            stage_start = time.monotonic()
+
+            while time.monotonic() - stage_start < seconds:
+
+                progress = (time.monotonic() - stage_start) / seconds
+                self.target = round(previous + (target - previous) * progress)
+
+                while len(users) < self.target:
+                    users.append(VirtualUser(len(users), self))
+                    users[-1].start()
+
+                time.sleep(0.1)
+
+            print(f"stage {target} users: {self.results.summary(time.monotonic() - start)['throughput']:.1f} req/s")
+            previous = target
+
+        self.stopped.set()
+
+        for user in users:
+            user.join(timeout=30)
+
+        return self.results.summary(time.monotonic() - start)
+
+
+def print_summary(summary: dict, previous: dict = None):
+
+    columns = ["count", "throughput", "error_rate"] + [f"p{p}_ms" for p in PERCENTILES] + ["max_ms"]
+
+    print(f"\n{'step':<20}" + "".join(f"{column:>12}" for column in columns))
+
+    for step, values in sorted(summary["steps"].items()):
+
+        print(f"{step:<20}" + "".join(f"{values[column]:>12.{0 if column == 'count' else 2}f}" for column in columns))
+
+        if previous and step in previous["steps"]:
+            deltas = (
+                f"{(values[column] / previous['steps'][step][column] - 1) * 100:>+11.0f}%"
+                if previous["steps"][step][column] else f"{'':>12}"
+                for column in columns
+            )
+            print(f"{'  vs previous':<20}" + "".join(deltas))
+
+    print(
+        f"\n{summary['requests']} requests in {summary['duration']:.0f}s: "
+        f"{summary['throughput']:.1f} req/s, {summary['error_rate'] * 100:.2f}% errors"
+    )
+
+
+def parse_stage(value: str):
+
+    users, seconds = value.split(":")
+
+    return int(users), float(seconds)
+
+
+def run(*args):
+
+    parser = argparse.ArgumentParser(prog="load_test")
+    parser.add_argument("--root", default="http://127.0.0.1:8000/")
+    parser.add_argument("--stages", nargs="+", type=parse_stage, default=[(10, 30), (10, 30)])
+    parser.add_argument("--output", type=Path, default=None)
+    parser.add_argument("--compare", type=Path, default=None)
+
+    options = parser.parse_args(args)
+
+    summary = LoadTest(options.root, options.stages).run()
+    summary["stages"] = options.stages
+
+    previous = json.loads(options.compare.read_bytes()) if options.compare else None
+    print_summary(summary, previous)
+
+    output = options.output or Path(RESULTS, f"{time.strftime('%Y%m%d-%H%M%S')}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(summary, indent=4))
+
+    print(f"results saved to {output}")
+
+
+if __name__ == "__main__":
+    import sys
+    run(*sys.argv[1:])
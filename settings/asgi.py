@@ -3,6 +3,9 @@ ASGI config for settings project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+The /events/ stream is an async view: serve it through this application (e.g. with uvicorn
+or daphne), so that the connected clients do not hold a worker thread each.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 """
@@ -0,0 +1,105 @@
+"""
+Production profile of the API, selected with DJANGO_SETTINGS_MODULE=settings.production.
+
+The API only authenticates with JWT and renders JSON or MessagePack: the debug query log, the admin, the
+sessions, the messages, the static files and their middleware are left out. Measured by
+`python scripts/bench_settings.py`.
+
+The workers coordinate through the Django cache: the role matrix (projects.roles), the shard placements
+(sharding.shards) and the generations of the cached counts (api.pagination) are only refreshed in the other
+processes through it. A multi-worker deployment needs a cache shared by all the workers, a directory of the
+machine by default, like the SQLite files.
+
+Read from the environment:
+    DJANGO_SECRET_KEY       required
+    DJANGO_ALLOWED_HOSTS    comma separated, defaults to localhost
+    DJANGO_DB_PATH          defaults to db.sqlite3 next to manage.py
+    DJANGO_DB_PATH_<ALIAS>  database file of another alias of DATABASES (a shard), e.g. DJANGO_DB_PATH_SHARD1
+    DJANGO_EMAIL_HOST       SMTP server of the notifications, defaults to localhost
+    DJANGO_CACHE_DIR        directory of the shared cache, defaults to cache next to manage.py
+"""
+
+import os
+from django.core.exceptions import ImproperlyConfigured
+from settings.settings import *  # noqa: F401, F403
+from settings.settings import BASE_DIR, DATABASES, REST_FRAMEWORK
+
+DEBUG = False
+
+try:
+    SECRET_KEY = os.environ["DJANGO_SECRET_KEY"]
+except KeyError:
+    raise ImproperlyConfigured("the production settings need the DJANGO_SECRET_KEY environment variable")
+
+ALLOWED_HOSTS = os.environ.get("DJANGO_ALLOWED_HOSTS", "localhost,127.0.0.1").split(",")
+
+INSTALLED_APPS = [
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'rest_framework',
+    'rest_framework_simplejwt',
+    'user',
+    'projects',
+    'issues',
+    'sync',
+    'deletion',
+    'notifications',
+    'maintenance',
+    'sharding',
+    'api'
+]
+
+MIDDLEWARE = [
+    'django.middleware.security.SecurityMiddleware',
+    'django.middleware.common.CommonMiddleware',
+]
+
+# no cookie authentication nor HTML pages: neither CSRF nor framing protection apply
+SILENCED_SYSTEM_CHECKS = ['security.W002', 'security.W003']
+
+# only the DRF error pages are rendered, without any context
+TEMPLATES = [
+    {
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'DIRS': [],
+        'APP_DIRS': True,
+        'OPTIONS': {
+            'context_processors': [],
+        },
+    },
+]
+
+# every alias is kept: SHARDING['SHARDS'] routes to them
+DATABASES = {
+    alias: {
+        **database,
+        'NAME': os.environ.get(f"DJANGO_DB_PATH_{alias.upper()}", database['NAME']),
+    }
+    for alias, database in DATABASES.items()
+}
+
+DATABASES['default']['NAME'] = os.environ.get("DJANGO_DB_PATH", BASE_DIR / 'db.sqlite3')
+
+# shared by the workers of the machine, see projects.roles.check_shared_cache
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get("DJANGO_CACHE_DIR", BASE_DIR / 'cache'),
+        'OPTIONS': {
+            # the cached counts of every user and filters, along with the generations
+            'MAX_ENTRIES': 10000,
+        },
+    },
+}
+
+EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+EMAIL_HOST = os.environ.get("DJANGO_EMAIL_HOST", "localhost")
+
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    # the browsable API needs the sessions
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'api.renderers.MessagePackRenderer',
+    ],
+}
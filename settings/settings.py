@@ -37,7 +37,16 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_RENDERER_CLASSES': [
+        # same output as rest_framework.renderers.JSONRenderer but for the float formatting, see api.renderers
+        'api.renderers.FastJSONRenderer',
+        'api.renderers.MessagePackRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_THROTTLE_CLASSES': [
+        'api.throttling.TokenBucketThrottle',
+    ],
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.CachedCountPagination',
     'PAGE_SIZE': 10
 }
 
@@ -46,6 +55,112 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
 }
 
+# Incremental synchronization (/sync/), see sync.views
+SYNC = {
+    'CURSOR_OVERLAP': timedelta(seconds=10),
+    'PAGE_SIZE': 500,
+}
+
+# Server-Sent Events stream (/events/), see sync.broker
+EVENT_STREAM = {
+    'BUFFER_SIZE': 100,
+    'HISTORY_SIZE': 1000,
+    'KEEPALIVE': 15,
+}
+
+# Background deletions (DELETE ...?async=true), see deletion.worker
+DELETION = {
+    'CHUNK_SIZE': 500,
+    'IN_PROCESS_WORKER': True,
+}
+
+# Outbox of the assignment and comment notifications, see notifications.worker
+NOTIFICATIONS = {
+    'BATCH_SIZE': 100,
+    'RETRY_DELAY': timedelta(seconds=30),
+    'MAX_ATTEMPTS': 5,
+    'DISPATCHER': 'notifications.dispatch.send_email',
+    'IN_PROCESS_WORKER': True,
+}
+
+# notification emails are printed in development
+EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+DEFAULT_FROM_EMAIL = 'softdesk@localhost'
+
+# Online maintenance of the SQLite database (manage.py sqlite_maintenance), see maintenance.scheduler
+MAINTENANCE = {
+    'VACUUM_PAGES': 256,
+    'VACUUM_STEP_TIME': 0.05,
+    'VACUUM_PAUSE': 0.05,
+    'VACUUM_MIN_FREE_RATIO': 0.05,
+    'VACUUM_INTERVAL': timedelta(minutes=10),
+    'ANALYSIS_LIMIT': 1000,
+    'ANALYZE_INTERVAL': timedelta(hours=6),
+}
+
+# Online snapshots of the SQLite database (manage.py sqlite_backup), see maintenance.backup
+BACKUP = {
+    # None: a backups directory next to the database
+    'DIRECTORY': None,
+    'PAGES': 256,
+    'PAUSE': 0.01,
+    'MAX_RATE': None,
+    'MAX_RESTARTS': 3,
+    'COMPRESS': True,
+    'KEEP': 7,
+    # taken by the maintenance scheduler when set
+    'INTERVAL': None,
+}
+
+# Placement of the contributors, issues and comments of each project on a shard database, see sharding.shards
+SHARDING = {
+    # database aliases, ProjectShardRouter places each project on one of them by id;
+    # ['default', 'shard1'] spreads the projects over two databases
+    'SHARDS': ['default'],
+    'ID_BLOCK_SIZE': 100,
+    'PLACEMENT_MAX_AGE': 60,
+}
+
+# Archival of the released issues (manage.py archive_issues), see issues.archive
+ARCHIVE = {
+    'RELEASED_AGE': timedelta(days=90),
+    'COMPRESS': True,
+    'CHUNK_SIZE': 200,
+}
+
+# In memory role matrix of the permission checks, see projects.roles: several workers need a shared cache
+PROJECT_ROLES = {
+    'MAX_AGE': 300,
+}
+
+# Per user and per endpoint token buckets, see api.throttling
+THROTTLING = {
+    'DEFAULT_RATE': '600/min',
+    # keyed by "<viewset basename>.<action>", or by view class name
+    'RATES': {
+        'TokenObtainPairView': '20/min',
+    },
+    'BACKEND': 'memory',
+}
+
+# Replay of the create responses to the retries (Idempotency-Key header), see api.idempotency
+IDEMPOTENCY = {
+    'TTL': timedelta(hours=24),
+    'PURGE_INTERVAL': 300,
+    'LOCK_TIMEOUT': timedelta(seconds=60),
+}
+
+# Operations run in a single request (/batch/), see api.batch
+BATCH = {
+    'MAX_OPERATIONS': 25,
+}
+
+# Counts of the paginated lists, see api.pagination
+PAGINATION_COUNT = {
+    'CACHE_TTL': 30,
+    'ESTIMATE_THRESHOLD': 10000,
+}
+
 # Application definition
 
 INSTALLED_APPS = [
@@ -60,7 +175,13 @@ INSTALLED_APPS = [
     'django_extensions',
     'user',
     'projects',
-    'issues'
+    'issues',
+    'sync',
+    'deletion',
+    'notifications',
+    'maintenance',
+    'sharding',
+    'api'
 ]
 
 MIDDLEWARE = [
@@ -101,9 +222,16 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    },
+    # second shard of the project scoped rows, only used once listed in SHARDING['SHARDS']
+    'shard1': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'shard1.sqlite3',
+    },
 }
 
+DATABASE_ROUTERS = ['sharding.router.ProjectShardRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -14,12 +14,16 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.apps import apps
 from django.urls import include, path
 from rest_framework import routers
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from user.views import UserViewSet, RegisterView
 from projects.views import ProjectViewSet, ContributorViewSet
 from issues.views import IssueViewSet, CommentViewset
+from sync.views import SyncView, EventStreamView
+from deletion.views import DeletionJobViewSet
+from api.batch import BatchView
 
 router = routers.DefaultRouter()
 router.register(r'users', UserViewSet)
@@ -27,13 +31,20 @@ router.register(r'projects', ProjectViewSet)
 router.register(r'contributors', ContributorViewSet)
 router.register(r'issues', IssueViewSet)
 router.register(r'comments', CommentViewset)
+router.register(r'deletions', DeletionJobViewSet)
 
 # Wire up our API using automatic URL routing.
 # Additionally, we include login URLs for the browsable API.
 urlpatterns = [
     path('', include(router.urls)),
     path('register/', RegisterView.as_view(), name="register"),
-    path('api-auth/', include('rest_framework.urls', namespace='rest_framework')),
+    path('sync/', SyncView.as_view(), name="sync"),
+    path('events/', EventStreamView.as_view(), name="events"),
+    path('batch/', BatchView.as_view(), name="batch"),
     path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
 ]
+
+# the browsable API login, not served by the production profile (see settings.production)
+if apps.is_installed('django.contrib.sessions'):
+    urlpatterns.append(path('api-auth/', include('rest_framework.urls', namespace='rest_framework')))
@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class ShardingConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'sharding'
+
+    def ready(self):
+        # global ids, and the cascades the collector of the primary does not see
+        from sharding import signals  # noqa: F401
@@ -0,0 +1,10 @@
+from rest_framework import serializers
+
+
+class ShardedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Primary key of a sharded row, looked up on every shard: its project is not known before
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().on_all_shards()
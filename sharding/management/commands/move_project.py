@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+from sharding.moves import MoveError, move_project
+from sharding.shards import shard_for
+
+
+class Command(BaseCommand):
+    help = "Move the contributors, issues and comments of a project to another shard"
+
+    def add_arguments(self, parser):
+        parser.add_argument("project_id", type=int)
+        parser.add_argument("shard", help="database alias of the target shard, one of SHARDING['SHARDS']")
+        parser.add_argument("--chunk-size", type=int, default=500, help="rows copied per insert")
+
+    def handle(self, *args, **options):
+
+        source = shard_for(options["project_id"])
+
+        try:
+            moved = move_project(options["project_id"], options["shard"], options["chunk_size"])
+        except MoveError as error:
+            raise CommandError(str(error))
+
+        counts = ", ".join(f"{count} {label}" for label, count in moved.items())
+
+        self.stdout.write(f"project {options['project_id']} moved from {source} to {options['shard']}: {counts}")
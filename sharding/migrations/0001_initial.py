@@ -0,0 +1,31 @@
+# Generated by Django 4.2.30 on 2026-10-19 13:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=100, unique=True)),
+                ('last_id', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ProjectPlacement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('project_id', models.BigIntegerField(unique=True)),
+                ('shard', models.CharField(max_length=100)),
+                ('moved_time', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
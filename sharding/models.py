@@ -0,0 +1,35 @@
+from django.db import models
+
+
+class ProjectPlacement(models.Model):
+    """
+    Shard of a moved project, which overrides its placement by id (see sharding.shards). Kept on the primary
+    """
+
+    project_id = models.BigIntegerField(
+        unique=True
+    )
+
+    shard = models.CharField(
+        max_length=100
+    )
+
+    moved_time = models.DateTimeField(
+        auto_now=True
+    )
+
+
+class IdSequence(models.Model):
+    """
+    Last id reserved for the rows of a sharded model, so that they keep unique ids over all the shards.
+    Kept on the primary
+    """
+
+    model = models.CharField(
+        max_length=100,
+        unique=True
+    )
+
+    last_id = models.BigIntegerField(
+        default=0
+    )
@@ -0,0 +1,75 @@
+from itertools import islice
+from django.db import transaction
+from django.db.models import F
+from projects.models import Project, Contributor
+from issues.models import Issue, Comment, ArchivedIssue, ArchivedComment
+from sharding.models import ProjectPlacement
+from sharding.shards import PRIMARY, get_shards, placements, shard_for
+
+# rows of a project, in dependency order, with the lookup of their project
+PROJECT_ROWS = [
+    (Contributor, "project_id"),
+    (Issue, "project_id"),
+    (Comment, "project_id"),
+    (ArchivedIssue, "project_id"),
+    (ArchivedComment, "issue__project_id"),
+]
+
+
+class MoveError(Exception):
+    pass
+
+
+def move_project(project_id: int, target: str, chunk_size: int = 500) -> dict:
+    """
+    Move the rows of a project to another shard, and return the number of moved rows per model.
+
+    The rows keep their ids, which are unique over all the shards. They are copied to the target shard, the
+    project is pointed to it, then they are deleted from the source shard, raw: for the clients, nothing was
+    deleted. The source shard stays write locked meanwhile (SQLite), so that no row of the project is written
+    there and lost: the writers wait, up to their busy timeout. Copying again is harmless, so that an
+    interrupted move can be run again.
+    """
+
+    if target not in get_shards():
+        raise MoveError(f"{target} is not one of the shards {', '.join(get_shards())}")
+
+    if not Project.objects.filter(pk=project_id).exists():
+        raise MoveError(f"project {project_id} does not exist")
+
+    source = shard_for(project_id)
+    moved = {model._meta.label_lower: 0 for model, _ in PROJECT_ROWS}
+
+    with transaction.atomic(using=source):
+
+        if source != target:
+
+            # takes the write lock of the source shard before reading
+            Contributor.objects.using(source).filter(project_id=project_id).update(project_id=F("project_id"))
+
+            with transaction.atomic(using=target):
+                for model, lookup in PROJECT_ROWS:
+                    moved[model._meta.label_lower] = copy_rows(model, lookup, project_id, source, target, chunk_size)
+
+        ProjectPlacement.objects.using(PRIMARY).update_or_create(project_id=project_id, defaults={"shard": target})
+        # read again by the other processes once committed only, or they could keep the previous placement
+        transaction.on_commit(placements.invalidate, using=PRIMARY)
+
+        if source != target:
+            for model, lookup in reversed(PROJECT_ROWS):
+                queryset = model.objects.using(source).filter(**{lookup: project_id})
+                queryset._raw_delete(source)
+
+    return moved
+
+
+def copy_rows(model, lookup: str, project_id: int, source: str, target: str, chunk_size: int) -> int:
+
+    rows = model.objects.using(source).filter(**{lookup: project_id}).order_by("pk").iterator(chunk_size)
+    copied = 0
+
+    while chunk := list(islice(rows, chunk_size)):
+        model.objects.using(target).bulk_create(chunk, ignore_conflicts=True)
+        copied += len(chunk)
+
+    return copied
@@ -0,0 +1,287 @@
+from django.db import models
+from projects.roles import to_id
+from sharding.shards import get_shards, group_by_shard, is_enabled, shard_for
+
+
+class ShardedQuerySet(models.QuerySet):
+    """
+    QuerySet of a model whose rows live on the shard of their project (see sharding.shards).
+
+    Filtered on a single project, it reads the shard of that project; `for_projects()` fans out to the shards
+    of several projects, and `on_all_shards()` to all of them. The created rows are written to the shard of
+    their project, by ProjectShardRouter. Without sharding, these are plain querysets of the primary.
+    """
+
+    # lookup from a row to the id of its project
+    project_lookup = "project_id"
+
+    def filter(self, *args, **kwargs):
+
+        queryset = super().filter(*args, **kwargs)
+
+        if queryset._db is not None or not is_enabled():
+            return queryset
+
+        for lookup in (self.project_lookup, self.project_lookup.removesuffix("_id")):
+
+            project_id = to_id(kwargs.get(lookup))
+
+            if project_id is not None:
+                return queryset.using(shard_for(project_id))
+
+        return queryset
+
+    def for_projects(self, project_ids):
+        """
+        Rows of the given projects: a queryset of their shard, or a MergedQuerySet when they span several
+        """
+
+        lookup = f"{self.project_lookup}__in"
+
+        if not is_enabled():
+            return self.filter(**{lookup: project_ids})
+
+        querysets = [self.using(shard).filter(**{lookup: ids}) for shard, ids in group_by_shard(project_ids).items()]
+
+        if not querysets:
+            return self.none()
+
+        return querysets[0] if len(querysets) == 1 else MergedQuerySet(querysets)
+
+    def on_all_shards(self):
+        """
+        Rows of every shard, for the lookups which do not know the project: one query per shard
+        """
+
+        if not is_enabled():
+            return self
+
+        return MergedQuerySet([self.using(shard) for shard in get_shards()])
+
+    def create(self, **kwargs):
+
+        if self._db is not None or not is_enabled():
+            return super().create(**kwargs)
+
+        obj = self.model(**kwargs)
+        # written to the shard of its project, see ProjectShardRouter
+        obj.save(force_insert=True)
+
+        return obj
+
+
+class MergedQuerySet:
+    """
+    Read only union of the same query on several shards, merged in memory along its ordering.
+
+    The filters, orderings and annotations apply to the query of each shard. A slice `[low:high]` reads the
+    first `high` rows of each shard, since any of them may belong to the merged slice: one indexed query per
+    shard, but a page costs O(offset), growing with its depth. The counts add up the bounded counts of the
+    shards. Supports what the viewsets, the paginators and the
+    row serializers use, which is only a part of the QuerySet API.
+    """
+
+    def __init__(self, querysets, low=0, high=None, fields=None, stripped=0, flat=False):
+
+        self.querysets = querysets
+        self.low = low
+        self.high = high
+        # values_list() names, with the ordering fields appended to merge the tuples, then stripped
+        self.fields = fields
+        self.stripped = stripped
+        self.flat = flat
+        self._result_cache = None
+
+    @property
+    def model(self):
+        return self.querysets[0].model
+
+    @property
+    def ordered(self):
+        return self.querysets[0].ordered
+
+    @property
+    def db(self):
+        return self.querysets[0].db
+
+    def get_ordering(self) -> list:
+
+        query = self.querysets[0].query
+
+        if query.order_by:
+            ordering = query.order_by
+        elif query.default_ordering:
+            ordering = self.model._meta.ordering
+        else:
+            ordering = []
+
+        if not all(isinstance(field, str) for field in ordering):
+            raise TypeError("the shards are only merged along field name orderings")
+
+        pk_name = self.model._meta.pk.name
+
+        return [field.replace("pk", pk_name) if field.lstrip("-") == "pk" else field for field in ordering]
+
+    def clone(self, querysets=None, **kwargs):
+
+        attributes = {
+            "low": self.low,
+            "high": self.high,
+            "fields": self.fields,
+            "stripped": self.stripped,
+            "flat": self.flat,
+            **kwargs
+        }
+
+        return MergedQuerySet(querysets or self.querysets, **attributes)
+
+    def chain(self, method: str, *args, **kwargs):
+
+        if self.low or self.high is not None:
+            raise TypeError("Cannot filter a query once a slice has been taken.")
+
+        return self.clone([getattr(queryset, method)(*args, **kwargs) for queryset in self.querysets])
+
+    def all(self):
+        return self.clone()
+
+    def filter(self, *args, **kwargs):
+        return self.chain("filter", *args, **kwargs)
+
+    def exclude(self, *args, **kwargs):
+        return self.chain("exclude", *args, **kwargs)
+
+    def annotate(self, *args, **kwargs):
+        return self.chain("annotate", *args, **kwargs)
+
+    def order_by(self, *fields):
+        return self.chain("order_by", *fields)
+
+    def select_related(self, *fields):
+        return self.chain("select_related", *fields)
+
+    def none(self):
+        return self.chain("none")
+
+    def values_list(self, *fields, flat=False):
+
+        if self.fields is not None:
+            raise TypeError("values_list() is already applied")
+
+        fields = [self.model._meta.pk.name if field == "pk" else field for field in fields] or [
+            field.attname for field in self.model._meta.concrete_fields
+        ]
+
+        extra = [field.lstrip("-") for field in self.get_ordering() if field.lstrip("-") not in fields]
+        merged = self.chain("values_list", *fields, *extra)
+
+        merged.fields = fields + extra
+        merged.stripped = len(extra)
+        merged.flat = flat
+
+        return merged
+
+    def __getitem__(self, k):
+
+        if isinstance(k, int):
+
+            if k < 0:
+                raise ValueError("Negative indexing is not supported.")
+
+            rows = list(self[k:k + 1])
+
+            if not rows:
+                raise IndexError("list index out of range")
+
+            return rows[0]
+
+        if not isinstance(k, slice) or k.step is not None or (k.start or 0) < 0 or (k.stop or 0) < 0:
+            raise ValueError("only non negative slices without step are supported")
+
+        low = self.low + (k.start or 0)
+        high = self.high
+
+        if k.stop is not None:
+            high = self.low + k.stop if high is None else min(high, self.low + k.stop)
+
+        return self.clone(low=low, high=max(low, high) if high is not None else None)
+
+    def merge(self, rows: list) -> list:
+        """
+        Sort the rows of all the shards along the ordering, one stable pass per field from the last one
+        """
+
+        if self.fields is not None:
+            positions = {field: i for i, field in enumerate(self.fields)}
+            getter = lambda name: lambda row: row[positions[name]]  # noqa: E731
+        else:
+            getter = lambda name: lambda row: getattr(row, name)  # noqa: E731
+
+        for field in reversed(self.get_ordering()):
+            value = getter(field.lstrip("-"))
+            # the NULLs first in ascending order, like SQLite
+            rows.sort(key=lambda row: (value(row) is not None, value(row)), reverse=field.startswith("-"))
+
+        return rows
+
+    def fetch(self) -> list:
+
+        if self._result_cache is None:
+
+            rows = []
+
+            for queryset in self.querysets:
+                rows.extend(queryset if self.high is None else queryset[:self.high])
+
+            rows = self.merge(rows)[self.low:self.high]
+
+            if self.stripped:
+                rows = [row[:-self.stripped] for row in rows]
+
+            if self.flat:
+                rows = [row[0] for row in rows]
+
+            self._result_cache = rows
+
+        return self._result_cache
+
+    def __iter__(self):
+        return iter(self.fetch())
+
+    def __len__(self):
+        return len(self.fetch())
+
+    def __bool__(self):
+        return bool(self.fetch())
+
+    def count(self) -> int:
+
+        if self._result_cache is not None:
+            return len(self._result_cache)
+
+        total = sum(
+            (queryset if self.high is None else queryset[:self.high]).count() for queryset in self.querysets
+        )
+
+        if self.high is not None:
+            total = min(total, self.high)
+
+        return max(0, total - self.low)
+
+    def exists(self) -> bool:
+        return any(queryset.exists() for queryset in self.querysets)
+
+    def first(self):
+        return next(iter(self[:1]), None)
+
+    def get(self, *args, **kwargs):
+
+        rows = list(self.filter(*args, **kwargs)[:2])
+
+        if not rows:
+            raise self.model.DoesNotExist(f"{self.model._meta.object_name} matching query does not exist.")
+
+        if len(rows) > 1:
+            raise self.model.MultipleObjectsReturned(f"get() returned more than one {self.model._meta.object_name}")
+
+        return rows[0]
@@ -0,0 +1,52 @@
+from sharding.shards import PRIMARY, is_enabled, is_sharded, shard_for
+
+
+class ProjectShardRouter:
+    """
+    Routes the rows of the sharded models (see sharding.shards) to the shard of their project, and everything
+    else to the primary. Without any hint, the queries go to the primary: the fan-out over the shards is
+    explicit, see ShardedQuerySet.
+
+    Every shard holds the whole schema, so that any of them can also be the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        return self.route(model, hints.get("instance"))
+
+    def db_for_write(self, model, **hints):
+        return self.route(model, hints.get("instance"))
+
+    @staticmethod
+    def route(model, instance):
+
+        if instance is None or not is_enabled():
+            return None
+
+        if not is_sharded(model):
+            # the users and the project of a row of a shard
+            return PRIMARY if is_sharded(type(instance)) else None
+
+        if instance._meta.label_lower == "projects.project":
+            # the contributors, issues or comments of a project
+            return shard_for(instance.pk)
+
+        if is_sharded(type(instance)):
+
+            project_id = getattr(instance, "project_id", None)
+
+            if instance._state.adding and project_id is not None:
+                # a new row, whichever of its foreign keys was assigned first
+                return shard_for(project_id)
+
+            # a row read from a shard, and its related rows
+            return instance._state.db
+
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+
+        # the sharded rows refer to the users and the projects of the primary by id
+        if is_sharded(type(obj1)) or is_sharded(type(obj2)):
+            return True
+
+        return None
@@ -0,0 +1,210 @@
+import threading
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.db.models import F, Max
+from projects.roles import to_id
+
+DEFAULTS = {
+    # database aliases of the shards of the project scoped rows, see ProjectShardRouter
+    'SHARDS': ['default'],
+    # ids reserved at once on the primary for the rows created on the shards
+    'ID_BLOCK_SIZE': 100,
+    # seconds after which the moved projects are read again, bounds the staleness when the cache is not shared
+    'PLACEMENT_MAX_AGE': 60,
+}
+
+# holds the users, the projects and every other global row, along with the placements and the id sequences
+PRIMARY = "default"
+
+# the contributors, issues and comments of a project, archived or not, live on the shard of the project
+SHARDED_MODELS = {
+    "projects.contributor",
+    "issues.issue",
+    "issues.comment",
+    "issues.archivedissue",
+    "issues.archivedcomment",
+}
+
+# bumped on each move, so that the other processes read the placements again when the cache is shared
+GENERATION_KEY = "shard-placements-generation"
+
+
+def get_setting(name):
+    return getattr(settings, 'SHARDING', {}).get(name, DEFAULTS[name])
+
+
+def get_shards() -> list:
+    return list(get_setting('SHARDS'))
+
+
+def get_databases() -> list:
+    """
+    Aliases of the primary, then of the other shards
+    """
+    return [PRIMARY, *(shard for shard in get_shards() if shard != PRIMARY)]
+
+
+def is_enabled() -> bool:
+    """
+    Whether the project scoped rows are spread over several databases
+    """
+    return len(get_setting('SHARDS')) > 1
+
+
+def is_sharded(model) -> bool:
+    return model._meta.label_lower in SHARDED_MODELS
+
+
+class Placements:
+    """
+    In memory `project_id -> shard` table of the moved projects, the other ones are placed by id
+    """
+
+    def __init__(self):
+
+        self.lock = threading.Lock()
+        self.shards = {}
+        self.loaded_time = None
+        self.generation = None
+
+    def get(self, project_id):
+
+        generation = cache.get(GENERATION_KEY, 0)
+
+        with self.lock:
+
+            expired = self.loaded_time is None or time.monotonic() - self.loaded_time > get_setting('PLACEMENT_MAX_AGE')
+
+            if expired or generation != self.generation:
+                self.load()
+                self.generation = generation
+
+            return self.shards.get(project_id)
+
+    def load(self):
+
+        from sharding.models import ProjectPlacement
+
+        self.shards = dict(ProjectPlacement.objects.using(PRIMARY).values_list("project_id", "shard"))
+        self.loaded_time = time.monotonic()
+
+    def invalidate(self):
+
+        with self.lock:
+            self.loaded_time = None
+
+        try:
+            cache.incr(GENERATION_KEY)
+        except ValueError:
+            cache.set(GENERATION_KEY, 1, timeout=None)
+
+
+placements = Placements()
+
+
+def shard_for(project_id) -> str:
+    """
+    Database alias of the shard holding the rows of a project: the one it was moved to, or the one of its id
+    """
+
+    shards = get_shards()
+
+    if len(shards) == 1:
+        return shards[0]
+
+    project_id = to_id(project_id)
+
+    if project_id is None:
+        return PRIMARY
+
+    return placements.get(project_id) or shards[project_id % len(shards)]
+
+
+def group_by_shard(project_ids) -> dict:
+    """
+    Return `{shard: [project_id, ...]}`, in the order of the shards
+    """
+
+    grouped = {shard: [] for shard in get_shards()}
+
+    for project_id in project_ids:
+        grouped[shard_for(project_id)].append(project_id)
+
+    return {shard: ids for shard, ids in grouped.items() if ids}
+
+
+class IdAllocator:
+    """
+    Hands out the ids of the rows created on the shards, from blocks of ID_BLOCK_SIZE ids reserved on the primary:
+    a single primary write per block, and no two shards ever give the same id to two rows
+    """
+
+    def __init__(self):
+
+        self.lock = threading.Lock()
+        # model label -> (next id, end of the reserved block)
+        self.blocks = {}
+
+    def allocate(self, model) -> int:
+
+        label = model._meta.label_lower
+
+        with self.lock:
+
+            next_id, end = self.blocks.get(label, (0, 0))
+
+            if next_id >= end:
+                next_id, end = self.reserve(model)
+
+                if connections[PRIMARY].in_atomic_block:
+                    # the reservation may still be rolled back: the rest of the block is only used once committed
+                    transaction.on_commit(lambda: self.keep(label, next_id + 1, end), using=PRIMARY)
+                    return next_id
+
+            self.blocks[label] = (next_id + 1, end)
+
+            return next_id
+
+    def keep(self, label: str, next_id: int, end: int):
+
+        with self.lock:
+
+            current_id, current_end = self.blocks.get(label, (0, 0))
+
+            if current_id >= current_end:
+                self.blocks[label] = (next_id, end)
+
+    @staticmethod
+    def reserve(model) -> tuple:
+
+        from sharding.models import IdSequence
+
+        size = get_setting('ID_BLOCK_SIZE')
+
+        with transaction.atomic(using=PRIMARY):
+
+            sequences = IdSequence.objects.using(PRIMARY)
+
+            sequences.get_or_create(
+                model=model._meta.label_lower,
+                # the rows created before the sharding was enabled keep their ids
+                defaults={"last_id": lambda: max_id(model)}
+            )
+
+            sequences.filter(model=model._meta.label_lower).update(last_id=F("last_id") + size)
+            last_id = sequences.get(model=model._meta.label_lower).last_id
+
+        return last_id - size + 1, last_id + 1
+
+
+def max_id(model) -> int:
+
+    return max(
+        model._base_manager.using(shard).aggregate(max_id=Max("pk"))["max_id"] or 0
+        for shard in {PRIMARY, *get_shards()}
+    )
+
+
+ids = IdAllocator()
@@ -0,0 +1,70 @@
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import pre_delete, pre_save
+from django.dispatch import receiver
+from user.models import SoftdeskUser
+from projects.models import Project, Contributor
+from issues.models import Issue, Comment, ArchivedIssue, ArchivedComment
+from sharding.shards import PRIMARY, get_shards, ids, is_enabled, shard_for
+
+
+@receiver(pre_save, sender=Contributor)
+@receiver(pre_save, sender=Issue)
+@receiver(pre_save, sender=Comment)
+def allocate_id(sender, instance, raw=False, **kwargs):
+    """
+    The rows created on the shards take their id from the primary, so that it stays unique over all of them
+    """
+
+    if instance.pk is None and not raw and is_enabled():
+        instance.pk = ids.allocate(sender)
+
+
+@receiver(pre_delete, sender=Project)
+def delete_project_rows(sender, instance: Project, **kwargs):
+    """
+    The collector of the primary only cascades to the rows of the primary: the ones of the other shards are
+    deleted here, as the deletion worker does (see deletion.worker.project_steps)
+    """
+
+    shard = shard_for(instance.pk)
+
+    if shard == PRIMARY:
+        return
+
+    with transaction.atomic(using=shard):
+
+        # implied by the project tombstone, see sync.signals
+        for queryset in [
+            Comment.objects.using(shard).filter(project_id=instance.pk),
+            Issue.objects.using(shard).filter(project_id=instance.pk),
+            ArchivedComment.objects.using(shard).filter(issue__project_id=instance.pk),
+            ArchivedIssue.objects.using(shard).filter(project_id=instance.pk),
+        ]:
+            queryset._raw_delete(shard)
+
+        # traced for the former contributors
+        Contributor.objects.using(shard).filter(project_id=instance.pk).delete()
+
+
+@receiver(pre_delete, sender=SoftdeskUser)
+def delete_user_rows(sender, instance: SoftdeskUser, **kwargs):
+
+    user_issues = Q(author_id=instance.pk) | Q(assigned_user_id=instance.pk)
+
+    for shard in get_shards():
+
+        if shard == PRIMARY:
+            continue
+
+        with transaction.atomic(using=shard):
+
+            # the comments of the deleted issues go with them
+            for queryset in [
+                Comment.objects.using(shard).filter(author_id=instance.pk),
+                Issue.objects.using(shard).filter(user_issues),
+                ArchivedComment.objects.using(shard).filter(author_id=instance.pk),
+                ArchivedIssue.objects.using(shard).filter(user_issues),
+                Contributor.objects.using(shard).filter(user_id=instance.pk),
+            ]:
+                queryset.delete()
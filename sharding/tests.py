@@ -0,0 +1,233 @@
+from io import StringIO
+from unittest.mock import patch
+from django.core.management import call_command
+from django.test import override_settings
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+from user.models import SoftdeskUser
+from projects.models import Project, Contributor
+from projects.roles import roles
+from issues.models import Issue, Comment
+from sharding.models import ProjectPlacement
+from sharding.shards import placements, shard_for
+
+
+@override_settings(SHARDING={'SHARDS': ['default', 'shard1']}, NOTIFICATIONS={'IN_PROCESS_WORKER': False})
+class TestSharding(APITestCase):
+
+    databases = {"default", "shard1"}
+
+    def setUp(self) -> None:
+
+        # the placements of the previous tests were rolled back
+        placements.invalidate()
+
+        self.author = SoftdeskUser.objects.create_user(username="author", password="password", age=27)
+        self.contributor = SoftdeskUser.objects.create_user(username="contributor", password="password", age=27)
+
+        # consecutive ids: one project on each shard
+        self.projects = [
+            Project.objects.create(description=f"project {i}", type="BACK", author=self.author) for i in range(2)
+        ]
+
+        for project in self.projects:
+            Contributor.objects.create(project=project, user=self.contributor)
+
+    def authenticate(self, user):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+
+    def create_issue(self, project, title):
+
+        response = self.client.post("/issues/", data={
+            "tag": "BUG",
+            "title": title,
+            "project": project.pk,
+            "author": self.author.pk
+        })
+        self.assertEqual(response.status_code, 201, response.json())
+
+        return response.json()
+
+    def test_rows_placed_on_project_shard(self):
+
+        self.assertEqual({shard_for(project.pk) for project in self.projects}, {"default", "shard1"})
+
+        self.authenticate(self.author)
+
+        issues = [self.create_issue(project, f"issue {project.pk}") for project in self.projects]
+
+        response = self.client.post("/comments/", data={
+            "description": "comment",
+            "issue": issues[1]["id"],
+            "author": self.author.pk
+        })
+        self.assertEqual(response.status_code, 201, response.json())
+
+        for project, issue in zip(self.projects, issues):
+
+            shard = shard_for(project.pk)
+            other_shard = "default" if shard == "shard1" else "shard1"
+
+            self.assertTrue(Issue.objects.using(shard).filter(pk=issue["id"]).exists())
+            self.assertFalse(Issue.objects.using(other_shard).filter(pk=issue["id"]).exists())
+            self.assertEqual(Contributor.objects.using(shard).filter(project_id=project.pk).count(), 2)
+            self.assertFalse(Contributor.objects.using(other_shard).filter(project_id=project.pk).exists())
+
+        # on the shard of its issue, along with the counters of the issue
+        shard = shard_for(self.projects[1].pk)
+        comment = Comment.objects.using(shard).get()
+
+        self.assertEqual(comment.project_id, self.projects[1].pk)
+        self.assertEqual(Issue.objects.using(shard).get(pk=issues[1]["id"]).comment_count, 1)
+        self.assertEqual(Project.objects.get(pk=self.projects[1].pk).issue_count, 1)
+
+        # unique over all the shards
+        ids = [issue["id"] for issue in issues]
+        self.assertEqual(len(set(ids)), 2)
+
+    def test_roles_invalidated_on_shard_commit(self):
+
+        project = next(project for project in self.projects if shard_for(project.pk) == "shard1")
+        user = SoftdeskUser.objects.create_user(username="user", password="password", age=27)
+
+        with patch.object(roles, "committed") as committed:
+
+            with self.captureOnCommitCallbacks(using="shard1", execute=True):
+                with self.captureOnCommitCallbacks(using="default", execute=True):
+                    Contributor.objects.create(project=project, user=user)
+
+                # the contributor is written to the shard of its project
+                committed.assert_not_called()
+
+            committed.assert_called_once_with((project.pk,))
+
+    def test_merged_lists(self):
+
+        self.authenticate(self.author)
+
+        issues = [self.create_issue(self.projects[i % 2], f"issue {i}") for i in range(12)]
+
+        for issue in issues[:3]:
+            self.client.post("/comments/", data={"description": "comment", "issue": issue["id"], "author": self.author.pk})
+
+        self.authenticate(self.contributor)
+
+        response = self.client.get("/issues/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["count"], 12)
+        self.assertEqual([issue["title"] for issue in response.json()["results"]], [f"issue {i}" for i in range(10)])
+
+        response = self.client.get("/issues/", data={"page": 2})
+        self.assertEqual([issue["title"] for issue in response.json()["results"]], ["issue 10", "issue 11"])
+
+        response = self.client.get("/issues/", data={"ordering": "-created_time"})
+        self.assertEqual([issue["title"] for issue in response.json()["results"]], [f"issue {i}" for i in range(11, 1, -1)])
+
+        response = self.client.get("/comments/")
+        self.assertEqual(response.json()["count"], 3)
+        self.assertEqual([comment["issue"] for comment in response.json()["results"]], [issue["id"] for issue in issues[:3]])
+
+        response = self.client.get("/issues/", data={"ids": f"{issues[1]['id']},{issues[0]['id']},999999"})
+        self.assertEqual([issue["id"] for issue in response.json()["results"]], [issues[1]["id"], issues[0]["id"]])
+        self.assertEqual(response.json()["missing"], [999999])
+
+        response = self.client.get("/contributors/")
+        self.assertEqual(response.json()["count"], 4)
+
+        response = self.client.get("/sync/")
+        self.assertEqual(len(response.json()["issues"]), 12)
+        self.assertEqual(len(response.json()["comments"]), 3)
+        self.assertEqual(len(response.json()["contributors"]), 4)
+
+        response = self.client.get(f"/projects/{self.projects[1].pk}/activity/")
+        # the 6 issues of the project, and the comment of "issue 1" written after them
+        self.assertEqual([entry["type"] for entry in response.json()["results"]], ["comment"] + ["issue"] * 6)
+
+    def test_detail_on_shard(self):
+
+        self.authenticate(self.author)
+
+        project = next(project for project in self.projects if shard_for(project.pk) == "shard1")
+        issue = self.create_issue(project, "issue")
+
+        response = self.client.get(f"/issues/{issue['id']}/")
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.patch(f"/issues/{issue['id']}/", data={"state": "INWORK"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Issue.objects.using("shard1").get(pk=issue["id"]).state, "INWORK")
+
+        response = self.client.get(f"/projects/{project.pk}/issues/")
+        self.assertEqual(response.json()["count"], 1)
+
+        response = self.client.delete(f"/issues/{issue['id']}/")
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Issue.objects.using("shard1").exists())
+
+    def test_delete_project_on_shard(self):
+
+        self.authenticate(self.author)
+
+        project = next(project for project in self.projects if shard_for(project.pk) == "shard1")
+        self.create_issue(project, "issue")
+
+        response = self.client.delete(f"/projects/{project.pk}/")
+        self.assertEqual(response.status_code, 204)
+
+        self.assertFalse(Issue.objects.using("shard1").filter(project_id=project.pk).exists())
+        self.assertFalse(Contributor.objects.using("shard1").filter(project_id=project.pk).exists())
+
+    def test_move_project(self):
+
+        self.authenticate(self.author)
+
+        project = next(project for project in self.projects if shard_for(project.pk) == "shard1")
+        issue = self.create_issue(project, "issue")
+        self.client.post("/comments/", data={"description": "comment", "issue": issue["id"], "author": self.author.pk})
+
+        output = StringIO()
+
+        with self.captureOnCommitCallbacks(using="default", execute=True) as callbacks:
+            call_command("move_project", project.pk, "default", stdout=output)
+
+            # the placement is not committed yet
+            self.assertEqual(shard_for(project.pk), "shard1")
+
+        self.assertEqual(len(callbacks), 1)
+
+        self.assertIn(f"project {project.pk} moved from shard1 to default: 2 projects.contributor, 1 issues.issue", output.getvalue())
+
+        self.assertEqual(shard_for(project.pk), "default")
+        self.assertEqual(ProjectPlacement.objects.get(project_id=project.pk).shard, "default")
+
+        self.assertFalse(Issue.objects.using("shard1").filter(project_id=project.pk).exists())
+        self.assertFalse(Comment.objects.using("shard1").filter(project_id=project.pk).exists())
+        self.assertEqual(Contributor.objects.using("default").filter(project_id=project.pk).count(), 2)
+        self.assertEqual(Comment.objects.using("default").get().issue_id, issue["id"])
+
+        response = self.client.get(f"/issues/{issue['id']}/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["comment_count"], 1)
+
+    def test_atomic_batch_on_shards(self):
+
+        self.authenticate(self.author)
+
+        project = next(project for project in self.projects if shard_for(project.pk) == "shard1")
+
+        response = self.client.post("/batch/", format="json", data={"atomic": True, "operations": [
+            {"method": "POST", "path": "/issues/", "body": {
+                "tag": "BUG", "title": "issue", "project": project.pk, "author": self.author.pk
+            }},
+            {"method": "DELETE", "path": f"/projects/{project.pk}/"},
+            {"method": "GET", "path": "/unknown/"},
+        ]})
+
+        self.assertEqual([result["status"] for result in response.json()["results"]], [201, 204, 404])
+        self.assertEqual(response.json()["failed"], 2)
+        self.assertTrue(response.json()["rolled_back"])
+
+        # rolled back on the shard of the project as well
+        self.assertFalse(Issue.objects.using("shard1").exists())
+        self.assertTrue(Project.objects.filter(pk=project.pk).exists())
+        self.assertTrue(Contributor.objects.using("shard1").filter(project_id=project.pk).exists())
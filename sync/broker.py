@@ -0,0 +1,214 @@
+import asyncio
+import json
+import threading
+import uuid
+from collections import deque
+from django.conf import settings
+
+DEFAULTS = {
+    # number of events kept per client before it is asked to resynchronize
+    'BUFFER_SIZE': 100,
+    # number of recent events kept to resume the reconnecting clients
+    'HISTORY_SIZE': 1000,
+    # seconds between two keepalive comments on an idle stream
+    'KEEPALIVE': 15,
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'EVENT_STREAM', {}).get(name, DEFAULTS[name])
+
+
+class Event:
+
+    __slots__ = ('id', 'project_id', 'name', 'data', 'user_id')
+
+    def __init__(self, id: str, project_id: int, name: str, data: dict, user_id=None):
+        self.id = id
+        self.project_id = project_id
+        self.name = name
+        self.data = data
+        # set for the events addressed to a single user
+        self.user_id = user_id
+
+    def is_visible(self, subscription) -> bool:
+
+        if self.user_id is not None:
+            return self.user_id == subscription.user_id
+
+        return self.project_id in subscription.project_ids
+
+    def encode(self) -> str:
+        """
+        Format the event as a Server-Sent Events message
+        """
+        return f"id: {self.id}\nevent: {self.name}\ndata: {json.dumps(self.data)}\n\n"
+
+
+class Subscription:
+    """
+    Bounded event buffer of a single client, filled from any thread and drained by the client event loop
+    """
+
+    def __init__(self, broker, user_id, project_ids, loop: asyncio.AbstractEventLoop, buffer_size: int):
+        self.broker = broker
+        self.user_id = user_id
+        self.project_ids = set(project_ids)
+        self.buffer = deque()
+        self.buffer_size = buffer_size
+        self.overflowed = False
+        self._loop = loop
+        self._ready = asyncio.Event()
+
+    def push(self, event: Event):
+        """
+        Must be called with the broker lock held
+        """
+
+        if self.overflowed:
+            return
+
+        if len(self.buffer) >= self.buffer_size:
+            # the client is too slow: drop its buffer and ask it to resynchronize
+            self.buffer.clear()
+            self.overflowed = True
+
+        else:
+            self.buffer.append(event)
+
+        self._wake_up()
+
+    def _wake_up(self):
+        try:
+            self._loop.call_soon_threadsafe(self._ready.set)
+        except RuntimeError:
+            # the client event loop is closed
+            pass
+
+    async def wait(self, timeout: float) -> bool:
+        """
+        Wait for new events, return False on timeout
+        """
+
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+
+        return True
+
+    def drain(self):
+        """
+        Return the pending events, and whether events were lost since the last call
+        """
+
+        with self.broker.lock:
+            self._ready.clear()
+            events = list(self.buffer)
+            self.buffer.clear()
+            overflowed, self.overflowed = self.overflowed, False
+
+        return events, overflowed
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class Broker:
+    """
+    In-process fan-out of the project activity to the connected clients.
+
+    Event ids are prefixed by a per-process token, so that a client resuming with an id emitted
+    by another process (or before a restart) is detected and asked to resynchronize.
+    """
+
+    def __init__(self, history_size: int = None):
+        self.lock = threading.Lock()
+        self.token = uuid.uuid4().hex[:8]
+        self._sequence = 0
+        self._history = deque(maxlen=history_size or get_setting('HISTORY_SIZE'))
+        self._subscriptions = set()
+
+    def publish(self, project_id: int, name: str, data: dict):
+
+        with self.lock:
+            event = self._append(project_id, name, data)
+
+            for subscription in self._subscriptions:
+                if event.is_visible(subscription):
+                    subscription.push(event)
+
+    def _append(self, project_id: int, name: str, data: dict, user_id=None) -> Event:
+        """
+        Must be called with the broker lock held
+        """
+
+        self._sequence += 1
+        event = Event(f"{self.token}-{self._sequence}", project_id, name, data, user_id)
+        self._history.append(event)
+
+        return event
+
+    def subscribe(self, user_id, project_ids, last_event_id: str = None, buffer_size: int = None):
+        """
+        Register a client; return its subscription, and the missed events (None if they cannot be replayed)
+        """
+
+        subscription = Subscription(
+            broker=self,
+            user_id=user_id,
+            project_ids=project_ids,
+            loop=asyncio.get_running_loop(),
+            buffer_size=buffer_size or get_setting('BUFFER_SIZE')
+        )
+
+        with self.lock:
+            missed = self._replay(subscription, last_event_id) if last_event_id else []
+            self._subscriptions.add(subscription)
+
+        return subscription, missed
+
+    def unsubscribe(self, subscription: Subscription):
+        with self.lock:
+            self._subscriptions.discard(subscription)
+
+    def grant(self, user_id, project_id):
+        with self.lock:
+            for subscription in self._subscriptions:
+                if subscription.user_id == user_id:
+                    subscription.project_ids.add(project_id)
+
+    def revoke(self, user_id, project_id):
+        """
+        Stop streaming a project to a user, and notify its connected clients
+        """
+
+        with self.lock:
+            event = self._append(project_id, "project.revoked", {"project": project_id}, user_id)
+
+            for subscription in self._subscriptions:
+                if event.is_visible(subscription):
+                    subscription.push(event)
+                    subscription.project_ids.discard(project_id)
+
+    def _replay(self, subscription: Subscription, last_event_id: str):
+
+        token, _, sequence = last_event_id.partition("-")
+
+        if token != self.token or not sequence.isdigit():
+            return None
+
+        sequence = int(sequence)
+        oldest = self._sequence - len(self._history)
+
+        if sequence < oldest:
+            # the missed events are no longer in the history
+            return None
+
+        return [
+            event for event in list(self._history)[sequence - oldest:]
+            if event.is_visible(subscription)
+        ]
+
+
+broker = Broker()
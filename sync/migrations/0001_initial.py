@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-19 12:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resource', models.CharField(choices=[('PROJECT', 'project'), ('CONTRIBUTOR', 'contributor'), ('ISSUE', 'issue'), ('COMMENT', 'comment')], max_length=12)),
+                ('resource_id', models.BigIntegerField()),
+                ('project_id', models.BigIntegerField()),
+                ('user_id', models.BigIntegerField(null=True)),
+                ('deleted_time', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['project_id', 'deleted_time'], name='tombstone_project_deleted_idx'), models.Index(fields=['user_id', 'deleted_time'], name='tombstone_user_deleted_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+from django.utils.translation import gettext_lazy as _
+from django.db import models
+
+
+class Tombstone(models.Model):
+    """
+    Trace of a deleted resource, used to propagate deletes to the synchronized clients
+    """
+
+    class ResourceType(models.TextChoices):
+        PROJECT = "PROJECT", _("project")
+        CONTRIBUTOR = "CONTRIBUTOR", _("contributor")
+        ISSUE = "ISSUE", _("issue")
+        COMMENT = "COMMENT", _("comment")
+
+    resource = models.CharField(
+        max_length=12,
+        choices=ResourceType.choices
+    )
+
+    resource_id = models.BigIntegerField()
+
+    # plain ids: the referenced rows are likely to be deleted as well
+    project_id = models.BigIntegerField()
+
+    user_id = models.BigIntegerField(
+        null=True
+    )
+
+    deleted_time = models.DateTimeField(
+        auto_now_add=True
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["project_id", "deleted_time"], name="tombstone_project_deleted_idx"),
+            models.Index(fields=["user_id", "deleted_time"], name="tombstone_user_deleted_idx"),
+        ]
@@ -0,0 +1,15 @@
+from rest_framework import serializers
+from sync.models import Tombstone
+
+
+class TombstoneSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = Tombstone
+        fields = [
+            'resource',
+            'resource_id',
+            'project_id',
+            'user_id',
+            'deleted_time'
+        ]
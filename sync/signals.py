@@ -0,0 +1,105 @@
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import pre_delete, post_save
+from django.dispatch import receiver
+from projects.models import Project, Contributor
+from issues.models import Issue, Comment
+from issues.serializers import IssueSerializer, CommentSerializer
+from sync.models import Tombstone
+from sync.broker import broker
+
+
+def deleted_through(origin, *models) -> bool:
+    """
+    Return True if the deletion was started from an instance (or a queryset) of one of the given models
+    """
+
+    if isinstance(origin, QuerySet):
+        return issubclass(origin.model, models)
+
+    return isinstance(origin, models)
+
+
+def publish(project_id, name, data, using=None):
+    """
+    Stream an event once the current transaction is committed, so that rolled back changes are never sent;
+    `using` is the database of the change, the shard of its project (see sharding.shards)
+    """
+    transaction.on_commit(lambda: broker.publish(project_id, name, data), using=using)
+
+
+@receiver(pre_delete, sender=Project)
+def project_tombstone(sender, instance: Project, origin=None, **kwargs):
+    Tombstone.objects.create(
+        resource=Tombstone.ResourceType.PROJECT,
+        resource_id=instance.pk,
+        project_id=instance.pk
+    )
+
+
+@receiver(pre_delete, sender=Contributor)
+def contributor_tombstone(sender, instance: Contributor, origin=None, using=None, **kwargs):
+    # always traced, even when the whole project is deleted: this is how
+    # the former contributors learn that they lost access to the project
+    Tombstone.objects.create(
+        resource=Tombstone.ResourceType.CONTRIBUTOR,
+        resource_id=instance.pk,
+        project_id=instance.project_id,
+        user_id=instance.user_id
+    )
+
+    user_id, project_id = instance.user_id, instance.project_id
+    transaction.on_commit(lambda: broker.revoke(user_id, project_id), using=using)
+
+
+@receiver(pre_delete, sender=Issue)
+def issue_tombstone(sender, instance: Issue, origin=None, using=None, **kwargs):
+
+    if deleted_through(origin, Project):
+        # implied by the project tombstone
+        return
+
+    Tombstone.objects.create(
+        resource=Tombstone.ResourceType.ISSUE,
+        resource_id=instance.pk,
+        project_id=instance.project_id
+    )
+
+    publish(instance.project_id, "issue.deleted", {"id": instance.pk}, using)
+
+
+@receiver(pre_delete, sender=Comment)
+def comment_tombstone(sender, instance: Comment, origin=None, using=None, **kwargs):
+
+    if deleted_through(origin, Project, Issue):
+        # implied by the project or issue tombstone
+        return
+
+    project_id = instance.issue.project_id
+
+    Tombstone.objects.create(
+        resource=Tombstone.ResourceType.COMMENT,
+        resource_id=instance.pk,
+        project_id=project_id
+    )
+
+    publish(project_id, "comment.deleted", {"id": instance.pk, "issue": instance.issue_id}, using)
+
+
+@receiver(post_save, sender=Contributor)
+def contributor_saved(sender, instance: Contributor, created, using=None, **kwargs):
+    if created:
+        user_id, project_id = instance.user_id, instance.project_id
+        transaction.on_commit(lambda: broker.grant(user_id, project_id), using=using)
+
+
+@receiver(post_save, sender=Issue)
+def issue_saved(sender, instance: Issue, created, using=None, **kwargs):
+    name = "issue.created" if created else "issue.updated"
+    publish(instance.project_id, name, IssueSerializer(instance).data, using)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance: Comment, created, using=None, **kwargs):
+    name = "comment.created" if created else "comment.updated"
+    publish(instance.project_id, name, CommentSerializer(instance).data, using)
@@ -0,0 +1,334 @@
+from datetime import timedelta
+from unittest.mock import patch
+from asgiref.sync import sync_to_async
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+from user.models import SoftdeskUser
+from projects.models import Project, Contributor
+from issues.models import Issue, Comment
+from sync.models import Tombstone
+from sync.broker import Broker, broker
+
+
+class TestSync(APITestCase):
+
+    def setUp(self) -> None:
+
+        self.project_author = SoftdeskUser.objects.create_user(
+            username="project_author",
+            password="password",
+            age=27,
+        )
+
+        self.project_contributor = SoftdeskUser.objects.create_user(
+            username="project_contributor",
+            password="password",
+            age=27,
+        )
+
+        self.project = Project.objects.create(
+            description="project",
+            type="FRONT",
+            author=self.project_author
+        )
+
+        Contributor.objects.create(
+            project=self.project,
+            user=self.project_contributor
+        )
+
+        self.issue = Issue.objects.create(
+            tag="BUG",
+            title="BUG Issue",
+            project=self.project,
+            author=self.project_author
+        )
+
+        self.comment = Comment.objects.create(
+            issue=self.issue,
+            author=self.project_author,
+            description="comment"
+        )
+
+    def authenticate(self, user):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+
+    def test_full_snapshot(self):
+
+        self.authenticate(self.project_contributor)
+
+        response = self.client.get("/sync/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("cursor", response.json())
+        self.assertEqual(len(response.json()["projects"]), 1)
+        self.assertEqual(len(response.json()["contributors"]), 2)
+        self.assertEqual(len(response.json()["issues"]), 1)
+        self.assertEqual(len(response.json()["comments"]), 1)
+        self.assertEqual(response.json()["deleted"], [])
+
+    @override_settings(SYNC={'CURSOR_OVERLAP': timedelta(0)})
+    def test_incremental_sync(self):
+
+        self.authenticate(self.project_contributor)
+
+        cursor = self.client.get("/sync/").json()["cursor"]
+
+        # nothing changed since the last sync
+        response = self.client.get(f"/sync/?since={cursor}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["issues"], [])
+        self.assertEqual(response.json()["comments"], [])
+
+        self.issue.state = Issue.IssueState.IN_WORK
+        self.issue.save()
+
+        comment_id = self.comment.pk
+        self.comment.delete()
+
+        response = self.client.get(f"/sync/?since={cursor}")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["projects"], [])
+        self.assertEqual([issue["id"] for issue in response.json()["issues"]], [self.issue.pk])
+        self.assertEqual(response.json()["comments"], [])
+        self.assertEqual(len(response.json()["deleted"]), 1)
+        self.assertEqual(response.json()["deleted"][0]["resource"], "COMMENT")
+        self.assertEqual(response.json()["deleted"][0]["resource_id"], comment_id)
+
+    def test_sync_overlap(self):
+
+        # joined long ago: the project is not returned entirely
+        Contributor.objects.update(created_time=timezone.now() - timedelta(days=1))
+
+        self.authenticate(self.project_contributor)
+
+        cursor = self.client.get("/sync/").json()["cursor"]
+
+        # timestamped before the cursor, committed after the sync
+        Issue.objects.filter(pk=self.issue.pk).update(created_time=timezone.now() - timedelta(seconds=5))
+
+        response = self.client.get(f"/sync/?since={cursor}")
+        self.assertEqual([issue["id"] for issue in response.json()["issues"]], [self.issue.pk])
+
+        with self.settings(SYNC={'CURSOR_OVERLAP': timedelta(seconds=1)}):
+            response = self.client.get(f"/sync/?since={cursor}")
+            self.assertEqual(response.json()["issues"], [])
+
+    @override_settings(SYNC={'PAGE_SIZE': 2})
+    def test_snapshot_pages(self):
+
+        self.authenticate(self.project_contributor)
+
+        response = self.client.get("/sync/")
+        cursor = response.json()["cursor"]
+        pages = [response.json()]
+
+        while pages[-1]["next"] is not None:
+            response = self.client.get(pages[-1]["next"])
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.json())
+
+        self.assertEqual(len(pages), 3)
+        self.assertEqual({page["cursor"] for page in pages}, {cursor})
+
+        for resource, count in [("projects", 1), ("contributors", 2), ("issues", 1), ("comments", 1)]:
+            ids = [row["id"] for page in pages for row in page[resource]]
+            self.assertEqual(len(ids), count)
+            self.assertEqual(ids, sorted(set(ids)))
+
+        for page in ["1", f"{cursor}.tasks.0", f"{cursor}.issues.abc"]:
+            response = self.client.get(f"/sync/?page={page}")
+            self.assertEqual(response.status_code, 400)
+
+    def test_sync_deleted_project(self):
+
+        self.authenticate(self.project_contributor)
+
+        cursor = self.client.get("/sync/").json()["cursor"]
+
+        project_id = self.project.pk
+        self.project.delete()
+
+        # cascaded issues and comments are implied by the project tombstone
+        self.assertFalse(Tombstone.objects.filter(resource__in=["ISSUE", "COMMENT"]).exists())
+
+        response = self.client.get(f"/sync/?since={cursor}")
+        deleted = {(item["resource"], item["resource_id"]) for item in response.json()["deleted"]}
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(("PROJECT", project_id), deleted)
+        self.assertIn(("CONTRIBUTOR", 2), deleted)
+
+    def test_sync_joined_project(self):
+
+        new_user = SoftdeskUser.objects.create_user(
+            username="new_user",
+            password="password",
+            age=27,
+        )
+
+        self.authenticate(new_user)
+
+        cursor = self.client.get("/sync/").json()["cursor"]
+
+        Contributor.objects.create(
+            project=self.project,
+            user=new_user
+        )
+
+        # the whole content of a joined project is returned
+        response = self.client.get(f"/sync/?since={cursor}")
+
+        self.assertEqual(len(response.json()["projects"]), 1)
+        self.assertEqual(len(response.json()["issues"]), 1)
+        self.assertEqual(len(response.json()["comments"]), 1)
+
+    def test_sync_invalid_cursor(self):
+
+        self.authenticate(self.project_contributor)
+
+        response = self.client.get("/sync/?since=yesterday")
+        self.assertEqual(response.status_code, 400)
+
+    def test_sync_from_unauthorized(self):
+
+        response = self.client.get("/sync/")
+        self.assertEqual(response.status_code, 401)
+
+
+class TestEventBroker(SimpleTestCase):
+
+    async def test_publish_to_project_subscribers(self):
+
+        broker = Broker(history_size=10)
+
+        subscription, missed = broker.subscribe(user_id=1, project_ids=[1])
+        other_subscription, _ = broker.subscribe(user_id=2, project_ids=[2])
+
+        self.assertEqual(missed, [])
+
+        broker.publish(1, "issue.created", {"id": 1})
+
+        self.assertTrue(await subscription.wait(1))
+
+        events, overflowed = subscription.drain()
+        self.assertEqual([event.name for event in events], ["issue.created"])
+        self.assertFalse(overflowed)
+
+        # the other subscriber does not contribute to the project
+        self.assertEqual(other_subscription.drain(), ([], False))
+
+    async def test_bounded_buffer(self):
+
+        broker = Broker(history_size=10)
+        subscription, _ = broker.subscribe(user_id=1, project_ids=[1], buffer_size=2)
+
+        for i in range(3):
+            broker.publish(1, "comment.created", {"id": i})
+
+        events, overflowed = subscription.drain()
+
+        self.assertEqual(events, [])
+        self.assertTrue(overflowed)
+
+    async def test_resume(self):
+
+        broker = Broker(history_size=3)
+
+        for i in range(3):
+            broker.publish(1, "issue.created", {"id": i})
+
+        last_event_id = f"{broker.token}-2"
+
+        _, missed = broker.subscribe(user_id=1, project_ids=[1], last_event_id=last_event_id)
+        self.assertEqual([event.data for event in missed], [{"id": 2}])
+
+        # events dropped from the history cannot be replayed
+        broker.publish(1, "issue.created", {"id": 3})
+        broker.publish(1, "issue.created", {"id": 4})
+
+        _, missed = broker.subscribe(user_id=1, project_ids=[1], last_event_id=last_event_id)
+        self.assertEqual([event.data for event in missed], [{"id": 2}, {"id": 3}, {"id": 4}])
+
+        _, missed = broker.subscribe(user_id=1, project_ids=[1], last_event_id=f"{broker.token}-1")
+        self.assertIsNone(missed)
+
+        # ids emitted by another process cannot be replayed
+        _, missed = broker.subscribe(user_id=1, project_ids=[1], last_event_id="unknown-1")
+        self.assertIsNone(missed)
+
+    async def test_revoke(self):
+
+        broker = Broker(history_size=10)
+        subscription, _ = broker.subscribe(user_id=1, project_ids=[1])
+
+        broker.revoke(1, 1)
+        broker.publish(1, "issue.created", {"id": 1})
+
+        events, _ = subscription.drain()
+        self.assertEqual([event.name for event in events], ["project.revoked"])
+
+
+class TestEventStream(TestCase):
+
+    def setUp(self) -> None:
+
+        self.user = SoftdeskUser.objects.create_user(
+            username="user",
+            password="password",
+            age=27,
+        )
+
+        self.project = Project.objects.create(
+            description="project",
+            type="FRONT",
+            author=self.user
+        )
+
+    def test_signals_publish_on_commit(self):
+
+        with patch("sync.signals.broker") as broker:
+
+            with self.captureOnCommitCallbacks(execute=True):
+                issue = Issue.objects.create(
+                    tag="BUG",
+                    title="BUG Issue",
+                    project=self.project,
+                    author=self.user
+                )
+
+            broker.publish.assert_called_once()
+            project_id, name, data = broker.publish.call_args.args
+
+            self.assertEqual(project_id, self.project.pk)
+            self.assertEqual(name, "issue.created")
+            self.assertEqual(data["title"], "BUG Issue")
+
+            broker.reset_mock()
+
+            with self.captureOnCommitCallbacks(execute=True):
+                issue.delete()
+
+            broker.publish.assert_called_once_with(self.project.pk, "issue.deleted", {"id": 1})
+
+    async def test_stream(self):
+
+        response = await self.async_client.get("/events/")
+        self.assertEqual(response.status_code, 401)
+
+        response = await self.async_client.get(f"/events/?token={AccessToken.for_user(self.user)}")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+
+        content = aiter(response.streaming_content)
+        self.assertTrue((await anext(content)).startswith(b"retry:"))
+
+        await sync_to_async(broker.publish)(self.project.pk, "issue.created", {"id": 1})
+
+        self.assertIn(b"event: issue.created", await anext(content))
+
+        await content.aclose()
@@ -0,0 +1,245 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Q
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.views import View
+from rest_framework import permissions
+from rest_framework.exceptions import AuthenticationFailed, ValidationError
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from rest_framework.views import APIView
+from projects.models import Project, Contributor
+from projects.serializers import ProjectSerializer, ContributorSerializer
+from issues.models import Issue, Comment
+from issues.serializers import IssueSerializer, CommentSerializer
+from sync.models import Tombstone
+from sync.serializers import TombstoneSerializer
+from sync.broker import broker, get_setting as get_stream_setting
+
+DEFAULTS = {
+    # the rows are timestamped before the commit of their transaction: an incremental sync also returns the
+    # changes of this period before its cursor, committed after the previous sync
+    'CURSOR_OVERLAP': timedelta(seconds=10),
+    # rows of a page, all resources together
+    'PAGE_SIZE': 500,
+}
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+# resources of a sync response, in page order
+RESOURCES = ["projects", "contributors", "issues", "comments", "deleted"]
+
+
+def get_setting(name):
+    return getattr(settings, 'SYNC', {}).get(name, DEFAULTS[name])
+
+
+def to_cursor(moment: datetime) -> str:
+    """
+    Encode a datetime as an opaque cursor (microseconds since epoch)
+    """
+    return str((moment - EPOCH) // timedelta(microseconds=1))
+
+
+def from_cursor(cursor: str) -> datetime:
+
+    try:
+        return EPOCH + timedelta(microseconds=int(cursor))
+
+    except (TypeError, ValueError, OverflowError):
+        raise ValidationError({"since": ["invalid cursor"]})
+
+
+def to_page(cursor: str, resource: str, after: int) -> str:
+    """
+    Encode the position of a page as an opaque token: "<cursor of the first page>.<resource>.<last id>"
+    """
+    return f"{cursor}.{resource}.{after}"
+
+
+def from_page(page: str):
+
+    try:
+        cursor, resource, after = page.split(".")
+        int(cursor)
+        after = int(after)
+    except ValueError:
+        raise ValidationError({"page": ["invalid page"]})
+
+    if resource not in RESOURCES:
+        raise ValidationError({"page": ["invalid page"]})
+
+    return cursor, resource, after
+
+
+class SyncView(APIView):
+    """
+    Return the resources of the user visible projects that were created, changed or deleted since the given cursor.
+
+    A full snapshot is returned when no cursor is given. The projects joined since the cursor are returned
+    entirely. A contributor tombstone which targets the current user means that the project is no longer
+    visible, and that all of its content must be dropped by the client.
+
+    The changes of the last `SYNC['CURSOR_OVERLAP']` before the cursor are returned again, so the client
+    applies the rows by id. The response is paginated by the `next` link, by id within each resource; every page
+    carries the cursor of the first one, to use once the last page is read.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+
+        page = request.GET.get("page")
+
+        if page:
+            cursor, resource, after = from_page(page)
+        else:
+            # taken before any read, so that the concurrent writes are returned by the next sync
+            cursor, resource, after = to_cursor(timezone.now()), RESOURCES[0], 0
+
+        since = request.GET.get("since")
+        since = from_cursor(since) - get_setting('CURSOR_OVERLAP') if since else None
+
+        user_id = request.user.pk
+        user_projects = Contributor.get_user_projects(user_id)
+
+        # the contributors, issues and comments are merged from the shards of the projects, see sharding.query
+        projects = Project.objects.filter(id__in=user_projects)
+        contributors = Contributor.objects.for_projects(user_projects)
+        issues = Issue.objects.for_projects(user_projects)
+        comments = Comment.objects.for_projects(user_projects)
+        tombstones = Tombstone.objects.none()
+
+        if since is not None:
+
+            # read once, the shards can not be joined
+            joined_projects = list(contributors.filter(
+                user_id=user_id,
+                created_time__gte=since
+            ).values_list("project_id", flat=True))
+
+            left_projects = Tombstone.objects.filter(
+                resource=Tombstone.ResourceType.CONTRIBUTOR,
+                user_id=user_id,
+                deleted_time__gte=since
+            ).values_list("project_id", flat=True)
+
+            projects = projects.filter(Q(created_time__gte=since) | Q(id__in=joined_projects))
+            contributors = contributors.filter(Q(created_time__gte=since) | Q(project_id__in=joined_projects))
+            issues = issues.filter(Q(created_time__gte=since) | Q(project_id__in=joined_projects))
+            comments = comments.filter(Q(created_time__gte=since) | Q(project_id__in=joined_projects))
+
+            tombstones = Tombstone.objects.filter(
+                Q(project_id__in=user_projects) | Q(project_id__in=left_projects),
+                deleted_time__gte=since
+            )
+
+        querysets = {
+            "projects": (projects, ProjectSerializer),
+            "contributors": (contributors, ContributorSerializer),
+            "issues": (issues, IssueSerializer),
+            "comments": (comments, CommentSerializer),
+            "deleted": (tombstones, TombstoneSerializer),
+        }
+
+        context = {"request": request}
+        results = {name: [] for name in RESOURCES}
+        remaining = get_setting('PAGE_SIZE')
+        next_url = None
+
+        for name in RESOURCES[RESOURCES.index(resource):]:
+
+            queryset, serializer_class = querysets[name]
+
+            if name == resource:
+                queryset = queryset.filter(id__gt=after)
+
+            rows = list(queryset.order_by("id")[:remaining])
+            results[name] = serializer_class(rows, many=True, context=context).data
+            remaining -= len(rows)
+
+            if remaining == 0:
+                next_url = replace_query_param(request.build_absolute_uri(), "page", to_page(cursor, name, rows[-1].pk))
+                break
+
+        return Response({"cursor": cursor, "next": next_url, **results})
+
+
+class EventStreamView(View):
+    """
+    Server-Sent Events stream of the issue and comment activity of the user projects.
+
+    Must be served through the ASGI application: each client holds a connection, not a worker thread.
+    The access token is read from the Authorization header, or from the `token` query parameter for the
+    clients unable to set headers (EventSource). A reconnecting client resumes from its Last-Event-ID;
+    a `reset` event tells the client that events were lost, and that it must call /sync/ before streaming.
+    """
+
+    async def get(self, request):
+
+        user = await sync_to_async(self.authenticate)(request)
+
+        if user is None:
+            return JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+
+        project_ids = await sync_to_async(Contributor.get_user_projects)(user.pk)
+        last_event_id = request.headers.get("Last-Event-ID") or request.GET.get("last_event_id")
+
+        subscription, missed = broker.subscribe(user.pk, project_ids, last_event_id)
+
+        response = StreamingHttpResponse(self.stream(subscription, missed), content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+
+        return response
+
+    @staticmethod
+    def authenticate(request):
+
+        authentication = JWTAuthentication()
+
+        header = authentication.get_header(request)
+        raw_token = authentication.get_raw_token(header) if header else request.GET.get("token")
+
+        if not raw_token:
+            return None
+
+        try:
+            return authentication.get_user(authentication.get_validated_token(raw_token))
+        except (InvalidToken, AuthenticationFailed):
+            return None
+
+    @staticmethod
+    async def stream(subscription, missed):
+
+        keepalive = get_stream_setting("KEEPALIVE")
+
+        try:
+            yield f"retry: {keepalive * 1000}\n\n"
+
+            if missed is None:
+                yield "event: reset\ndata: {}\n\n"
+            else:
+                for event in missed:
+                    yield event.encode()
+
+            while True:
+
+                if not await subscription.wait(keepalive):
+                    yield ": keepalive\n\n"
+                    continue
+
+                events, overflowed = subscription.drain()
+
+                if overflowed:
+                    yield "event: reset\ndata: {}\n\n"
+
+                for event in events:
+                    yield event.encode()
+
+        finally:
+            subscription.close()
@@ -45,6 +45,23 @@ class TestSoftdeskUser(APITestCase):
         self.assertIn("access", response.json())
         self.assertIn("refresh", response.json())
 
+    def test_register_idempotency(self):
+
+        data = {
+            "username": "new_user",
+            "password": PASSWORD,
+            "age": 25,
+        }
+
+        response = self.client.post("/register/", data=data, HTTP_IDEMPOTENCY_KEY="key")
+        self.assertEqual(response.status_code, 201, response.json())
+
+        # without the key, the retry would fail on the username uniqueness
+        response = self.client.post("/register/", data=data, HTTP_IDEMPOTENCY_KEY="key")
+
+        self.assertEqual(response.status_code, 201, response.json())
+        self.assertEqual(SoftdeskUser.objects.filter(username="new_user").count(), 1)
+
     def register_under_15_years_old(self):
 
         response = self.client.post("/register/", data={
@@ -3,6 +3,11 @@ from rest_framework.generics import CreateAPIView
 from rest_framework.response import Response
 from user.serializers import SoftdeskUserSerializer
 from user.models import SoftdeskUser
+from api.fast_list import FastListMixin
+from api.batch_retrieve import BatchRetrieveMixin
+from api.idempotency import IdempotentCreateMixin
+from deletion.serializers import DeletionJobSerializer
+from deletion.worker import schedule_user_deletion
 
 
 class UserPermission(permissions.BasePermission):
@@ -16,7 +21,7 @@ class UserPermission(permissions.BasePermission):
             return request.user.pk == obj.pk
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(BatchRetrieveMixin, FastListMixin, viewsets.ModelViewSet):
 
     queryset = SoftdeskUser.objects.all()
     serializer_class = SoftdeskUserSerializer
@@ -27,7 +32,8 @@ class UserViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
 
-        queryset = SoftdeskUser.objects.all()
+        # the users being deleted are deactivated first
+        queryset = SoftdeskUser.objects.filter(is_active=True)
 
         username = self.request.GET.get("username", None)
 
@@ -39,8 +45,20 @@ class UserViewSet(viewsets.ModelViewSet):
     def create(self, request, *args, **kwargs):
         return Response(status=status.HTTP_405_METHOD_NOT_ALLOWED)
 
+    def destroy(self, request, *args, **kwargs):
+        """
+        With ?async=true, deactivate the user and delete its content in background instead
+        """
 
-class RegisterView(CreateAPIView):
+        if request.GET.get("async") != "true":
+            return super().destroy(request, *args, **kwargs)
+
+        job = schedule_user_deletion(self.get_object(), request.user)
+
+        return Response(DeletionJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+class RegisterView(IdempotentCreateMixin, CreateAPIView):
 
     serializer_class = SoftdeskUserSerializer
     permission_classes = [permissions.AllowAny]